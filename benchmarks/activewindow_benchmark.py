@@ -0,0 +1,84 @@
+"""
+Benchmark the per-click cost of resolving the active window.
+
+The fake provider looks up the benchmark process with psutil, like the Windows
+provider does for the foreground process, so the uncached resolution pays for a
+real process lookup. Clicks switch between a few windows, as they do in a session.
+
+Usage
+-----
+python benchmarks/activewindow_benchmark.py [CLICKS]
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import os
+import sys
+import time
+
+import psutil
+
+import heatmouse.activewindow as hactivewindow
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% CLICKS
+CLICKS = 20_000
+# %% SWITCH_EVERY
+SWITCH_EVERY = 50
+# %% WINDOWS
+WINDOWS = 4
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% ProcessProvider
+class ProcessProvider(hactivewindow.FakeWindowProvider):
+    """Fake window provider whose process lookups query psutil."""
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% process_name
+    def process_name(self, pid: int) -> str:
+        """Get the executable name of a process."""
+        super().process_name(pid)
+        return psutil.Process(os.getpid()).name()
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% benchmark_window
+def benchmark_window(clicks: int, mode: str) -> tuple[float, dict[str:int]]:
+    """
+    Time resolving the active window once per click.
+
+    Arguments
+    ---------
+    clicks: int
+        Number of clicks.
+    mode: str
+        "uncached", "cached" or "hooked".
+
+    Returns
+    -------
+    tuple[float, dict[str:int]]
+        Time per click in seconds and the provider call counts.
+    """
+    provider = ProcessProvider(hook=mode == "hooked")
+    for window in range(WINDOWS):
+        provider.activate(window + 1, window + 1, f"Document - App{window}", "")
+    active_window = hactivewindow.ActiveWindow(provider)
+    start = time.perf_counter()
+    for click in range(clicks):
+        if click % SWITCH_EVERY == 0:
+            window = (click // SWITCH_EVERY) % WINDOWS + 1
+            provider.activate(window, window)
+        if mode == "uncached":
+            active_window.get_active_window_title()
+        else:
+            active_window.window
+    elapsed = time.perf_counter() - start
+    return elapsed / clicks, dict(provider.calls)
+
+
+# %% --- Main Block --------------------------------------------------------------------
+if __name__ == "__main__":
+    clicks = int(sys.argv[1]) if len(sys.argv) > 1 else CLICKS
+    for mode in ("uncached", "cached", "hooked"):
+        per_click, calls = benchmark_window(clicks, mode)
+        print(f"{mode:>9}: {per_click * 1e6:8.2f} us/click  {calls}")
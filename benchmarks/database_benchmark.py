@@ -0,0 +1,83 @@
+"""
+Benchmark the Heat Mouse database write path.
+
+Usage
+-----
+python benchmarks/database_benchmark.py [CLICKS ...]
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import heatmouse.clickarray as hclickarray
+import heatmouse.database as hdatabase
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% SIZES
+SIZES = (100_000, 1_000_000, 10_000_000)
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% make_session
+def make_session(clicks: int) -> hclickarray.ClickArray:
+    """
+    Generate a random session of clicks.
+
+    Arguments
+    ---------
+    clicks: int
+        Number of clicks in the session.
+
+    Returns
+    -------
+    hclickarray.ClickArray
+        Session click data.
+    """
+    rng = np.random.default_rng(0)
+    data = hclickarray.ClickArray(clicks)
+    data.extend(
+        rng.integers(0, 1920, clicks),
+        rng.integers(0, 1080, clicks),
+        rng.integers(0, 3, clicks),
+    )
+    return data
+
+
+# %% benchmark_store
+def benchmark_store(clicks: int) -> float:
+    """
+    Time a single store of a session into a fresh database.
+
+    Arguments
+    ---------
+    clicks: int
+        Number of clicks in the session.
+
+    Returns
+    -------
+    float
+        Elapsed time in seconds.
+    """
+    data = make_session(clicks)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database = hdatabase.Database(pathlib.Path(tmp_dir).joinpath("benchmark.db"))
+        start = time.perf_counter()
+        database.store_all_data({"Benchmark": data})
+        elapsed = time.perf_counter() - start
+        database.connection.close()
+    return elapsed
+
+
+# %% --- Main Block --------------------------------------------------------------------
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for size in sizes:
+        elapsed = benchmark_store(size)
+        print(
+            f"{size:>12,} clicks: {elapsed:8.3f} s ({size / elapsed:>12,.0f} clicks/s)"
+        )
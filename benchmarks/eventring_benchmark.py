@@ -0,0 +1,123 @@
+"""
+Benchmark the per-event cost of handing click events between threads.
+
+The event ring of the listener is compared with the `queue.Queue` it replaced, once
+with the producer and consumer on one thread, which measures the bare put and get
+costs, and once with a producer thread and a consumer thread, as in the listener.
+
+Usage
+-----
+python benchmarks/eventring_benchmark.py [EVENTS]
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import queue
+import sys
+import threading
+import time
+
+import heatmouse.eventring as heventring
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% EVENTS
+EVENTS = 200_000
+# %% REPEATS
+REPEATS = 3
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% benchmark_queue
+def benchmark_queue(events: int, threaded: bool) -> float:
+    """
+    Time handing events through a queue, one `get` per event.
+
+    Arguments
+    ---------
+    events: int
+        Number of events.
+    threaded: bool
+        Whether the events are put by a second thread.
+
+    Returns
+    -------
+    float
+        Time per event in seconds.
+    """
+    event_queue = queue.Queue()
+
+    def produce():
+        for x in range(events):
+            event_queue.put((x, x, "LeftClick"))
+
+    start = time.perf_counter()
+    if threaded:
+        producer = threading.Thread(target=produce)
+        producer.start()
+    else:
+        produce()
+    received = 0
+    while received < events:
+        try:
+            event_queue.get(block=True, timeout=1)
+        except queue.Empty:
+            continue
+        received += 1
+    elapsed = time.perf_counter() - start
+    if threaded:
+        producer.join()
+    return elapsed / events
+
+
+# %% benchmark_ring
+def benchmark_ring(events: int, threaded: bool) -> tuple[float, int]:
+    """
+    Time handing events through an event ring, draining it in bulk.
+
+    Arguments
+    ---------
+    events: int
+        Number of events.
+    threaded: bool
+        Whether the events are put by a second thread.
+
+    Returns
+    -------
+    tuple[float, int]
+        Time per event in seconds and the number of dropped events.
+    """
+    event_ring = heventring.EventRing()
+
+    def produce():
+        for x in range(events):
+            event_ring.put(x, x, "LeftClick")
+        event_ring.close()
+
+    start = time.perf_counter()
+    if threaded:
+        producer = threading.Thread(target=produce)
+        producer.start()
+    else:
+        event_ring = heventring.EventRing(events)
+        produce()
+    while not (event_ring.closed and event_ring.empty()):
+        if event_ring.wait(timeout=1):
+            event_ring.drain()
+    elapsed = time.perf_counter() - start
+    if threaded:
+        producer.join()
+    return elapsed / events, event_ring.dropped
+
+
+# %% --- Main Block --------------------------------------------------------------------
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    for threaded in (False, True):
+        name = "two threads" if threaded else "one thread"
+        queue_time = min(benchmark_queue(events, threaded) for _ in range(REPEATS))
+        ring_results = [benchmark_ring(events, threaded) for _ in range(REPEATS)]
+        ring_time = min(result[0] for result in ring_results)
+        dropped = max(result[1] for result in ring_results)
+        print(
+            f"{name:>11}: queue {queue_time * 1e9:7.0f} ns/event, "
+            f"ring {ring_time * 1e9:7.0f} ns/event, dropped {dropped}"
+        )
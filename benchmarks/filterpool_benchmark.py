@@ -0,0 +1,90 @@
+"""
+Benchmark GUI frame latency while a large heatmap is filtered in a thread or process.
+
+A timer on the GUI thread ticks at 60 frames per second while a full-resolution
+count grid is filtered by a `FilterWorker`. Late ticks show how long the filter keeps
+the GUI thread from running.
+
+Usage
+-----
+python benchmarks/filterpool_benchmark.py
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import time
+
+import numpy as np
+from PyQt5 import QtCore
+
+import heatmouse
+import heatmouse.filterpool as hfilterpool
+import heatmouse.threadworker as hthreadworker
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% SHAPES
+SHAPES = ((1080, 1920), (2160, 3840))
+# %% FRAME_MS
+FRAME_MS = 16
+# %% REPEATS
+REPEATS = 3
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% measure_latency
+def measure_latency(
+    counts: np.ndarray, pool: hfilterpool.FilterPool = None
+) -> tuple[float, np.ndarray]:
+    """
+    Filter a count grid in a worker and record the GUI frame intervals meanwhile.
+
+    Arguments
+    ---------
+    counts: np.ndarray
+        Click count grid.
+    pool: hfilterpool.FilterPool
+        Filter pool, or None to filter in the worker thread. Defaults to None.
+
+    Returns
+    -------
+    tuple[float, np.ndarray]
+        Result stored as (Filter-Seconds, Frame-Intervals-In-Milliseconds).
+    """
+    threadpool = QtCore.QThreadPool.globalInstance()
+    loop = QtCore.QEventLoop()
+    ticks = []
+    timer = QtCore.QTimer()
+    timer.setTimerType(QtCore.Qt.PreciseTimer)
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    worker = hthreadworker.FilterWorker(counts, pool=pool)
+    worker.signals.finished.connect(loop.quit)
+    timer.start(FRAME_MS)
+    start = time.perf_counter()
+    threadpool.start(worker)
+    loop.exec_()
+    elapsed = time.perf_counter() - start
+    timer.stop()
+    intervals = np.diff([start] + ticks) * 1000
+    return elapsed, intervals
+
+
+# %% --- Main Block --------------------------------------------------------------------
+if __name__ == "__main__":
+    assert heatmouse.qtapp is not None
+    rng = np.random.default_rng(0)
+    pool = hfilterpool.FilterPool(1)
+    # Start the worker process before timing
+    pool.filter(np.zeros((1, 1), dtype=np.int32))
+    for shape in SHAPES:
+        counts = rng.poisson(0.05, shape).astype(np.int32)
+        print(f"grid {shape[1]}x{shape[0]}, {FRAME_MS} ms frames")
+        for name, backend in (("thread", None), ("process", pool)):
+            results = [measure_latency(counts, backend) for _ in range(REPEATS)]
+            elapsed = min(result[0] for result in results)
+            intervals = np.concatenate([result[1] for result in results])
+            print(
+                f"    {name:>8}: filter {elapsed * 1000:8.2f} ms, "
+                f"frame p50 {np.percentile(intervals, 50):7.2f} ms, "
+                f"p95 {np.percentile(intervals, 95):7.2f} ms, "
+                f"max {intervals.max():7.2f} ms"
+            )
+    pool.shutdown(wait=True)
@@ -0,0 +1,186 @@
+"""
+Benchmark the ingest pipeline by replaying a recorded session into the main window.
+
+The session is replayed by the replay capture backend through the listener worker
+into a Heat Mouse main window with a temporary database, at several speeds. For each
+speed the benchmark reports the offered and delivered click rates, and percentiles of
+the latency from a click being reported to the main window having processed it. The
+GUI falls behind at the speed where the delivered rate stays below the offered one
+and the latency grows to seconds.
+
+Without a recording, a synthetic session is generated. Record a real session by
+running Heat Mouse with the HEATMOUSE_RECORD environment variable set to a path.
+
+Usage
+-----
+python benchmarks/replay_benchmark.py [RECORDING [SPEED ...]]
+
+SPEED is a replay speed factor, or "max" to replay as fast as possible.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PyQt5 import QtCore
+
+import heatmouse
+import heatmouse.capture as hcapture
+import heatmouse.database as hdatabase
+import heatmouse.mainwindow as hmainwindow
+import heatmouse.recording as hrecording
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% CLICKS
+CLICKS = 1000
+# %% POLL_MS
+POLL_MS = 20
+# %% RATE
+RATE = 5.0
+# %% SPEEDS
+SPEEDS = (10.0, 100.0, 1000.0, None)
+# %% SWITCH_EVERY
+SWITCH_EVERY = 50
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% BenchmarkWindow
+class BenchmarkWindow(hmainwindow.HeatMouseMainWindow):
+    """Main window with a temporary database, timing each batch it processes."""
+
+    database_path: str = None
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self):
+        super().__init__()
+        self.processed: list[float] = []
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% database
+    @property
+    def database(self) -> hdatabase.Database:
+        """Get the temporary database."""
+        if self._database is None:
+            self._database = hdatabase.Database(self.database_path)
+        return self._database
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _update_batch
+    def _update_batch(self, batch: list[tuple[str, tuple[int, int, str]]]):
+        """Update the click data with a batch and time its processing."""
+        super()._update_batch(batch)
+        self.processed.extend([time.perf_counter()] * len(batch))
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% benchmark_replay
+def benchmark_replay(
+    recording: hrecording.SessionRecording, speed: float
+) -> tuple[float, float, np.ndarray]:
+    """
+    Replay a recording into a main window and time the processing of each click.
+
+    Arguments
+    ---------
+    recording: hrecording.SessionRecording
+        Recorded session.
+    speed: float
+        Replay speed factor, or None to replay as fast as possible.
+
+    Returns
+    -------
+    tuple[float, float, np.ndarray]
+        Result stored as (Offered-Rate, Delivered-Rate, Latencies-In-Milliseconds).
+        Clicks still unprocessed at the deadline are left out of the latencies.
+    """
+    duration = recording.clicks.timestamp[-1] - recording.clicks.timestamp[0]
+    if speed is not None:
+        duration /= speed
+    with tempfile.TemporaryDirectory() as directory:
+        BenchmarkWindow.database_path = str(pathlib.Path(directory, "heatmouse.db"))
+        window = BenchmarkWindow()
+        window._backend = hcapture.ReplayBackend(recording, speed)
+        window.show()
+        loop = QtCore.QEventLoop()
+        deadline = time.perf_counter() + 2 * duration + 10
+
+        def poll():
+            if (len(window.processed) >= len(recording)) or (
+                time.perf_counter() > deadline
+            ):
+                loop.quit()
+
+        timer = QtCore.QTimer()
+        timer.timeout.connect(poll)
+        timer.start(POLL_MS)
+        window.listener_task()
+        loop.exec_()
+        timer.stop()
+        emitted = window.listener_worker.key_listener.mouse_listener.emitted
+        processed = np.array(window.processed)
+        window.close()
+    latency = (processed - emitted[: len(processed)]) * 1000
+    reported = emitted[~np.isnan(emitted)]
+    offered = len(reported) / max(reported[-1] - reported[0], 1e-9)
+    delivered = len(processed) / max(processed[-1] - reported[0], 1e-9)
+    return offered, delivered, latency
+
+
+# %% make_recording
+def make_recording(clicks: int, rate: float) -> hrecording.SessionRecording:
+    """
+    Generate a synthetic session with random delays between clicks.
+
+    Arguments
+    ---------
+    clicks: int
+        Number of clicks in the session.
+    rate: float
+        Mean number of clicks per second.
+
+    Returns
+    -------
+    hrecording.SessionRecording
+        Recorded session.
+    """
+    rng = np.random.default_rng(0)
+    screensize = hcapture.SYNTHETIC_SCREENSIZE
+    applications = np.asarray(hcapture.SYNTHETIC_APPLICATIONS)
+    application = np.arange(clicks) // SWITCH_EVERY % len(applications)
+    return hrecording.SessionRecording.from_columns(
+        screensize,
+        np.cumsum(rng.exponential(1 / rate, clicks)),
+        applications[application],
+        rng.integers(0, screensize[0], clicks),
+        rng.integers(0, screensize[1], clicks),
+        rng.choice(4, clicks, p=hcapture.SYNTHETIC_BUTTON_WEIGHTS),
+    )
+
+
+# %% --- Main Block --------------------------------------------------------------------
+if __name__ == "__main__":
+    assert heatmouse.qtapp is not None
+    if len(sys.argv) > 1:
+        recording = hrecording.SessionRecording.load(sys.argv[1])
+    else:
+        recording = make_recording(CLICKS, RATE)
+    speeds = SPEEDS
+    if len(sys.argv) > 2:
+        speeds = [None if speed == "max" else float(speed) for speed in sys.argv[2:]]
+    print(f"{len(recording)} clicks, {len(recording.applications)} applications")
+    for speed in speeds:
+        offered, delivered, latency = benchmark_replay(recording, speed)
+        name = "max" if speed is None else f"{speed:g}x"
+        print(
+            f"{name:>7}: offered {offered:9.0f} clicks/s, "
+            f"delivered {delivered:9.0f} clicks/s, "
+            f"latency p50 {np.percentile(latency, 50):8.2f} ms, "
+            f"p90 {np.percentile(latency, 90):8.2f} ms, "
+            f"p99 {np.percentile(latency, 99):8.2f} ms, "
+            f"max {latency.max():8.2f} ms, "
+            f"lost {len(recording) - len(latency)}"
+        )
@@ -0,0 +1,145 @@
+"""
+Benchmark the sparse filter engine against the dense one to find their crossover.
+
+Clicks are splatted from their screen positions, like the sparse render path does,
+and compared with filtering the stacked count grid with the automatic dense engine.
+The crossover is reported as splatted kernel values per grid bin, the unit of
+`SPARSE_THRESHOLD`, as the crossover click count grows with the grid size.
+
+Usage
+-----
+python benchmarks/sparse_benchmark.py
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import time
+
+import numpy as np
+
+import heatmouse.filterengine as hfilterengine
+import heatmouse.histogram as hhistogram
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% SCREENSIZE
+SCREENSIZE = (1920, 1080)
+# %% BIN_SIZES
+BIN_SIZES = (2, 3, 4, 8)
+# %% SIGMAS
+SIGMAS = (0.5, 1, 2, 4)
+# %% REPEATS
+REPEATS = 3
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% best_time
+def best_time(function, *args) -> float:
+    """
+    Time the best of several calls of a function.
+
+    Arguments
+    ---------
+    function
+        Function to call.
+    *args
+        Arguments of the function.
+
+    Returns
+    -------
+    float
+        Elapsed seconds.
+    """
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# %% splat_clicks
+def splat_clicks(
+    engine: hfilterengine.SparseEngine,
+    x: np.ndarray,
+    y: np.ndarray,
+    buttons: np.ndarray,
+    bin_size: int,
+) -> np.ndarray:
+    """
+    Filter clicks with the sparse engine, binning them on the way.
+
+    Arguments
+    ---------
+    engine: hfilterengine.SparseEngine
+        The sparse filter engine.
+    x: np.ndarray
+        The X-positions on the screen.
+    y: np.ndarray
+        The Y-positions on the screen.
+    buttons: np.ndarray
+        Button codes of the clicks.
+    bin_size: int
+        Width and height of a bin in screen pixels.
+
+    Returns
+    -------
+    np.ndarray
+        Filtered stacked grid.
+    """
+    index = hhistogram.bin_clicks(x, y, buttons, SCREENSIZE, bin_size)
+    return engine.splat(index, hhistogram.stack_shape(SCREENSIZE, bin_size))
+
+
+# %% find_crossover
+def find_crossover(bin_size: int, sigma: float, rng: np.random.Generator) -> int:
+    """
+    Find the smallest power-of-two click count the dense engine filters faster.
+
+    Arguments
+    ---------
+    bin_size: int
+        Width and height of a bin in screen pixels.
+    sigma: float
+        Standard deviation of the Gaussian filter in bins.
+    rng: np.random.Generator
+        Random generator of the click positions.
+
+    Returns
+    -------
+    int
+        Crossover click count.
+    """
+    sparse = hfilterengine.get_engine("sparse", sigma)
+    dense = hfilterengine.get_engine("auto", sigma)
+    clicks = 16
+    while True:
+        x = rng.integers(0, SCREENSIZE[0], clicks)
+        y = rng.integers(0, SCREENSIZE[1], clicks)
+        buttons = rng.integers(0, 3, clicks)
+        grid = hhistogram.CountGrid.from_clicks(x, y, SCREENSIZE, bin_size, buttons)
+        sparse_time = best_time(splat_clicks, sparse, x, y, buttons, bin_size)
+        dense_time = best_time(dense.filter, grid.layers)
+        if sparse_time >= dense_time:
+            return clicks
+        clicks *= 2
+
+
+# %% --- Main Block --------------------------------------------------------------------
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    ratios = []
+    print(
+        f"screen {SCREENSIZE[0]}x{SCREENSIZE[1]} (dense: {hfilterengine.get_engine().name})"
+    )
+    for bin_size in BIN_SIZES:
+        _, rows, cols = hhistogram.stack_shape(SCREENSIZE, bin_size)
+        for sigma in SIGMAS:
+            clicks = find_crossover(bin_size, sigma, rng)
+            # Every click is splat into the layer of all clicks and its button layer
+            ratio = 2 * clicks * hfilterengine.get_kernel(sigma).size / (rows * cols)
+            ratios.append(ratio)
+            print(
+                f"    grid {cols:>4}x{rows:<4} sigma {sigma:>4}: crossover at "
+                f"{clicks:>7} clicks, {ratio:6.2f} kernel values per bin"
+            )
+    print(f"median crossover: {np.median(ratios):.2f} kernel values per bin")
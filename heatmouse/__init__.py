@@ -5,6 +5,7 @@ Initialize the Heat Mouse package.
 # %% --- Imports -----------------------------------------------------------------------
 import ctypes
 import importlib.metadata as _md
+import multiprocessing
 import pathlib
 import sys
 
@@ -14,10 +15,15 @@ from PyQt5 import QtWidgets
 # %% __version__
 __version__ = _md.version(__name__)
 # %% qtapp
-qtapp = QtWidgets.QApplication(sys.argv)
+# Filter pool worker processes import the package too, but have no GUI
+if multiprocessing.parent_process() is None:
+    qtapp = QtWidgets.QApplication(sys.argv)
+else:
+    qtapp = None
 # %% myappid
 myappid = "heatmouse.main"
-ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
+if sys.platform == "win32":
+    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 # %% THIS_DIR
 THIS_DIR: pathlib.Path = pathlib.Path(__file__).parent.absolute()
 # %% PARENT_DIR
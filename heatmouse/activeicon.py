@@ -5,16 +5,35 @@ Functions
 -------
 get_active_window_icon
     Get the icon from the active window on the user monitor.
+get_x11_window_icon
+    Get the icon from the active window of an X11 desktop.
 """
 
 # %% --- Imports -----------------------------------------------------------------------
-import win32con
-import win32gui
-import win32ui
+import numpy as np
 from PIL import Image
 
 import heatmouse
 
+# pywin32 only exists on Windows
+try:
+    import win32con
+    import win32gui
+    import win32ui
+except ImportError:
+    win32con = win32gui = win32ui = None
+# python-xlib is only used on X11 desktops
+try:
+    from Xlib import X, Xatom
+    from Xlib import display as xdisplay
+    from Xlib.error import XError
+except ImportError:
+    xdisplay = None
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% ICON_SIZE
+ICON_SIZE = 32
+
 
 # %% --- Functions ---------------------------------------------------------------------
 # %% get_active_window_icon
@@ -107,3 +126,69 @@ def get_active_window_icon(active_window: str) -> str:
         except Exception as e:
             print(f"Error during cleanup: {str(e)}")
     return output_path
+
+
+# %% get_x11_window_icon
+def get_x11_window_icon(active_window: str, display_name: str = None) -> str:
+    """
+    Get the icon from the active window of an X11 desktop.
+
+    The icon is read from the `_NET_WM_ICON` property of the window, which lists
+    ARGB images as (Width, Height, Pixels...). The smallest image of at least
+    `ICON_SIZE` pixels is used, or the largest one if all are smaller.
+
+    Arguments
+    ---------
+    active_window: str
+        The active window on the user monitor.
+    display_name: str
+        X11 display name, or None for the DISPLAY environment variable. Defaults to
+        None.
+
+    Returns
+    -------
+    str
+        The locally saved icon path, or None if the window has no icon.
+    """
+    display = xdisplay.Display(display_name)
+    try:
+        root = display.screen().root
+        active = root.get_full_property(
+            display.intern_atom("_NET_ACTIVE_WINDOW"), X.AnyPropertyType
+        )
+        if (active is None) or (len(active.value) == 0) or (not active.value[0]):
+            return None
+        window = display.create_resource_object("window", int(active.value[0]))
+        icon = window.get_full_property(
+            display.intern_atom("_NET_WM_ICON"), Xatom.CARDINAL
+        )
+    except XError:
+        return None
+    finally:
+        display.close()
+    if icon is None:
+        return None
+    values = np.asarray(icon.value, dtype=np.uint32)
+    images = []
+    start = 0
+    while start + 2 <= len(values):
+        width, height = int(values[start]), int(values[start + 1])
+        end = start + 2 + width * height
+        if (width == 0) or (height == 0) or (end > len(values)):
+            break
+        images.append((width, height, values[start + 2 : end]))
+        start = end
+    if not images:
+        return None
+    large = [image for image in images if image[0] >= ICON_SIZE]
+    if large:
+        width, height, pixels = min(large, key=lambda image: image[0])
+    else:
+        width, height, pixels = max(images, key=lambda image: image[0])
+    # Little-endian ARGB words are BGRA bytes
+    img = Image.frombuffer(
+        "RGBA", (width, height), pixels.astype("<u4").tobytes(), "raw", "BGRA", 0, 1
+    )
+    output_path = str(heatmouse.PARENT_DIR.joinpath("database", f"{active_window}.png"))
+    img.resize((ICON_SIZE, ICON_SIZE)).save(output_path)
+    return output_path
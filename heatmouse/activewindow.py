@@ -5,26 +5,161 @@ Classes
 -------
 ActiveWindow
     Monitors the active window on the user monitor.
+FakeWindowProvider
+    Scripted window provider for tests and benchmarks.
+Win32WindowProvider
+    Window provider backed by the Windows API.
+WindowProvider
+    Base class of the providers of foreground window data.
+X11WindowProvider
+    Window provider backed by the EWMH properties of an X11 desktop.
+
+Functions
+---------
+app_name
+    Get the application name of a window.
 """
 
 # %% --- Imports -----------------------------------------------------------------------
+import abc
+import collections
 import ctypes
+import functools
+import select
+import threading
+import time
 from ctypes import wintypes
+from typing import Callable
 
 import psutil
-import win32gui
+
+# pywin32 only exists on Windows
+try:
+    import win32gui
+except ImportError:
+    win32gui = None
+# python-xlib is only used on X11 desktops
+try:
+    from Xlib import X, Xatom
+    from Xlib import display as xdisplay
+    from Xlib.error import XError
+except ImportError:
+    xdisplay = None
 
 # %% --- Constants ---------------------------------------------------------------------
 # %% APP_DICT
 APP_DICT = {"explorer.exe": "File Explorer", "Photos.exe": "Photos"}
+# %% EVENT_SYSTEM_FOREGROUND
+EVENT_SYSTEM_FOREGROUND = 0x0003
+# %% HOOK_POLL
+HOOK_POLL = 0.5
+# %% MAX_WINDOWS
+MAX_WINDOWS = 256
+# %% WINDOW_TTL
+WINDOW_TTL = 2.0
 
 
 # %% --- Classes -----------------------------------------------------------------------
+# %% WindowProvider
+class WindowProvider(abc.ABC):
+    """
+    Base class of the providers of foreground window data.
+
+    A window is identified by its (Handle, Process-Id) pair.
+
+    Methods
+    -------
+    foreground
+        Get the foreground window.
+    process_name
+        Get the executable name of a process.
+    set_foreground_hook
+        Call a function whenever the foreground window changes.
+    title
+        Get the title of a window.
+    """
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% foreground
+    @abc.abstractmethod
+    def foreground(self) -> tuple[int, int]:
+        """
+        Get the foreground window.
+
+        Returns
+        -------
+        tuple[int, int]
+            Foreground window stored as (Handle, Process-Id).
+        """
+
+    # %% process_name
+    @abc.abstractmethod
+    def process_name(self, pid: int) -> str:
+        """
+        Get the executable name of a process.
+
+        Arguments
+        ---------
+        pid: int
+            Process id.
+
+        Returns
+        -------
+        str
+            Process name.
+        """
+
+    # %% set_foreground_hook
+    def set_foreground_hook(self, callback: Callable[[], None]) -> bool:
+        """
+        Call a function whenever the foreground window changes.
+
+        The function may be called from another thread. Providers without change
+        events keep the default, which installs nothing.
+
+        Arguments
+        ---------
+        callback: Callable[[], None]
+            Function to call, or None to remove the hook.
+
+        Returns
+        -------
+        bool
+            True if the hook is installed.
+        """
+        return False
+
+    # %% title
+    @abc.abstractmethod
+    def title(self, hwnd: int) -> str:
+        """
+        Get the title of a window.
+
+        Arguments
+        ---------
+        hwnd: int
+            Window handle.
+
+        Returns
+        -------
+        str
+            Window title.
+        """
+
+
 # %% ActiveWindow
 class ActiveWindow:
     """
     Monitors the active window on the user monitor.
 
+    Resolved application names are cached per (Handle, Process-Id) window, so the
+    process of a window is only looked up the first time it comes to the
+    foreground. An entry older than `ttl` seconds reads the window title again, as
+    the application name is taken from the title. If the provider reports
+    foreground changes, the foreground window itself is only queried after a change.
+    Change events bump a counter, and the queried window is stored with the count
+    read before the query, so a change during the query makes it stale at once.
+
     Properties
     ----------
     active_process: str
@@ -34,13 +169,38 @@ class ActiveWindow:
 
     Methods
     -------
+    close
+        Remove the foreground hook of the provider.
     get_active_window_title: str
         Returns the title of the currently active window.
+    invalidate
+        Drop every cached window.
+
+    Protected Methods
+    -----------------
+    _foreground_changed
+        Forget the foreground window after a foreground change event.
     """
 
     # %% --- Dunder Methods ------------------------------------------------------------
-    def __init__(self):
+    # %% __init__
+    def __init__(
+        self,
+        provider: WindowProvider = None,
+        ttl: float = WINDOW_TTL,
+        hook: bool = True,
+    ):
+        if provider is None:
+            provider = Win32WindowProvider()
+        self._provider = provider
+        self._ttl = ttl
         self._window = None
+        self._changes = 0
+        self._foreground: tuple[int, tuple[int, int]] = None
+        self._windows: collections.OrderedDict[tuple[int, int] : list] = (
+            collections.OrderedDict()
+        )
+        self._hooked = hook and provider.set_foreground_hook(self._foreground_changed)
 
     # %% --- Properties ----------------------------------------------------------------
     # %% active_process
@@ -54,11 +214,7 @@ class ActiveWindow:
         str
             Active process name.
         """
-        user32 = ctypes.windll.user32
-        h_wnd = user32.GetForegroundWindow()
-        pid = wintypes.DWORD()
-        user32.GetWindowThreadProcessId(h_wnd, ctypes.byref(pid))
-        return psutil.Process(pid.value).name()
+        return self._provider.process_name(self._provider.foreground()[1])
 
     # %% window
     @property
@@ -71,28 +227,399 @@ class ActiveWindow:
         str
             Active window name.
         """
-        active_window = self.get_active_window_title()
-        if self._window != active_window:
-            self._window = active_window
+        changes = self._changes
+        foreground = self._foreground
+        if (foreground is not None) and (foreground[0] == changes):
+            key = foreground[1]
+        else:
+            key = self._provider.foreground()
+            if self._hooked:
+                self._foreground = (changes, key)
+        now = time.monotonic()
+        entry = self._windows.get(key)
+        if entry is None:
+            process = self._provider.process_name(key[1])
+            title = self._provider.title(key[0])
+            entry = [app_name(process, title), process, title, now]
+            self._windows[key] = entry
+            if len(self._windows) > MAX_WINDOWS:
+                self._windows.popitem(last=False)
+        elif now - entry[3] >= self._ttl:
+            title = self._provider.title(key[0])
+            entry[0], entry[2], entry[3] = app_name(entry[1], title), title, now
+        self._window = entry[0]
         return self._window
 
     # %% --- Methods -------------------------------------------------------------------
+    # %% close
+    def close(self):
+        """Remove the foreground hook of the provider."""
+        if self._hooked:
+            self._provider.set_foreground_hook(None)
+            self._hooked = False
+        self._foreground = None
+
     # %% get_active_window_title
     def get_active_window_title(self) -> str:
         """
         Returns the title of the currently active window.
 
+        Always queries the provider, bypassing the cache.
+
         Returns
         -------
         str
             Active window name.
         """
-        active_window = win32gui.GetWindowText(win32gui.GetForegroundWindow())
-        if self.active_process in APP_DICT.keys():
-            active_window = APP_DICT[self.active_process]
-        else:
-            try:
-                active_window = active_window.rsplit(" - ", 1)[1]
-            except IndexError:
-                pass
-        return active_window
+        hwnd, pid = self._provider.foreground()
+        return app_name(self._provider.process_name(pid), self._provider.title(hwnd))
+
+    # %% invalidate
+    def invalidate(self):
+        """Drop every cached window."""
+        self._foreground = None
+        self._windows.clear()
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _foreground_changed
+    def _foreground_changed(self):
+        """Forget the foreground window after a foreground change event."""
+        self._changes += 1
+
+
+# %% FakeWindowProvider
+class FakeWindowProvider(WindowProvider):
+    """
+    Scripted window provider for tests and benchmarks.
+
+    Windows are brought to the foreground with `activate`, and every provider call
+    is counted in `calls`.
+
+    Methods
+    -------
+    activate
+        Bring a window to the foreground.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, hook: bool = False):
+        self.calls: collections.Counter[str:int] = collections.Counter()
+        self.current: tuple[int, int] = (0, 0)
+        self.processes: dict[int:str] = {0: ""}
+        self.titles: dict[int:str] = {0: ""}
+        self._callback: Callable[[], None] = None
+        self._hook = hook
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% activate
+    def activate(self, hwnd: int, pid: int, title: str = None, process: str = None):
+        """
+        Bring a window to the foreground.
+
+        Arguments
+        ---------
+        hwnd: int
+            Window handle.
+        pid: int
+            Process id.
+        title: str
+            New window title, or None to keep the current one. Defaults to None.
+        process: str
+            New process name, or None to keep the current one. Defaults to None.
+        """
+        if title is not None:
+            self.titles[hwnd] = title
+        if process is not None:
+            self.processes[pid] = process
+        changed = self.current != (hwnd, pid)
+        self.current = (hwnd, pid)
+        if changed and (self._callback is not None):
+            self._callback()
+
+    # %% foreground
+    def foreground(self) -> tuple[int, int]:
+        """Get the foreground window."""
+        self.calls["foreground"] += 1
+        return self.current
+
+    # %% process_name
+    def process_name(self, pid: int) -> str:
+        """Get the executable name of a process."""
+        self.calls["process_name"] += 1
+        return self.processes[pid]
+
+    # %% set_foreground_hook
+    def set_foreground_hook(self, callback: Callable[[], None]) -> bool:
+        """Call a function whenever the foreground window changes."""
+        self._callback = callback if self._hook else None
+        return self._hook and (callback is not None)
+
+    # %% title
+    def title(self, hwnd: int) -> str:
+        """Get the title of a window."""
+        self.calls["title"] += 1
+        return self.titles[hwnd]
+
+
+# %% Win32WindowProvider
+class Win32WindowProvider(WindowProvider):
+    """
+    Window provider backed by the Windows API.
+
+    The foreground hook is a `SetWinEventHook` on foreground changes, serviced by a
+    message loop on its own thread.
+
+    Protected Methods
+    -----------------
+    _run_hook
+        Install the foreground event hook and run its message loop.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self):
+        self._hook_thread: threading.Thread = None
+        self._hook_thread_id: int = None
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% foreground
+    def foreground(self) -> tuple[int, int]:
+        """Get the foreground window."""
+        user32 = ctypes.windll.user32
+        hwnd = user32.GetForegroundWindow()
+        pid = wintypes.DWORD()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        return hwnd, pid.value
+
+    # %% process_name
+    def process_name(self, pid: int) -> str:
+        """Get the executable name of a process."""
+        try:
+            return psutil.Process(pid).name()
+        except psutil.Error:
+            return ""
+
+    # %% set_foreground_hook
+    def set_foreground_hook(self, callback: Callable[[], None]) -> bool:
+        """Call a function whenever the foreground window changes."""
+        if self._hook_thread is not None:
+            ctypes.windll.user32.PostThreadMessageW(
+                self._hook_thread_id, 0x0012, 0, 0  # WM_QUIT
+            )
+            self._hook_thread.join()
+            self._hook_thread = None
+        if callback is None:
+            return False
+        ready = threading.Event()
+        installed = []
+        self._hook_thread = threading.Thread(
+            target=self._run_hook, args=(callback, ready, installed), daemon=True
+        )
+        self._hook_thread.start()
+        ready.wait()
+        if not installed:
+            self._hook_thread = None
+        return bool(installed)
+
+    # %% title
+    def title(self, hwnd: int) -> str:
+        """Get the title of a window."""
+        return win32gui.GetWindowText(hwnd)
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _run_hook
+    def _run_hook(
+        self,
+        callback: Callable[[], None],
+        ready: threading.Event,
+        installed: list,
+    ):
+        """
+        Install the foreground event hook and run its message loop.
+
+        Arguments
+        ---------
+        callback: Callable[[], None]
+            Function to call on every foreground change.
+        ready: threading.Event
+            Event set once the hook is installed or failed.
+        installed: list
+            List receiving True if the hook was installed.
+        """
+        user32 = ctypes.windll.user32
+        procedure = ctypes.WINFUNCTYPE(
+            None,
+            wintypes.HANDLE,
+            wintypes.DWORD,
+            wintypes.HWND,
+            wintypes.LONG,
+            wintypes.LONG,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )(lambda *args: callback())
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        hook = user32.SetWinEventHook(
+            EVENT_SYSTEM_FOREGROUND,
+            EVENT_SYSTEM_FOREGROUND,
+            None,
+            procedure,
+            0,
+            0,
+            0,  # WINEVENT_OUTOFCONTEXT
+        )
+        self._hook_thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        if hook:
+            installed.append(True)
+        ready.set()
+        if not hook:
+            return
+        message = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(message), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(message))
+            user32.DispatchMessageW(ctypes.byref(message))
+        user32.UnhookWinEvent(hook)
+
+
+# %% X11WindowProvider
+class X11WindowProvider(WindowProvider):
+    """
+    Window provider backed by the EWMH properties of an X11 desktop.
+
+    The foreground window is the `_NET_ACTIVE_WINDOW` of the root window and its
+    process is the `_NET_WM_PID` of the window. The foreground hook listens for
+    changes of `_NET_ACTIVE_WINDOW` on a second display connection, as a display
+    connection must not be shared between threads.
+
+    Protected Methods
+    -----------------
+    _run_hook
+        Listen for foreground changes until the hook is removed.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, display_name: str = None):
+        self._display = xdisplay.Display(display_name)
+        self._root = self._display.screen().root
+        self._atoms = {
+            name: self._display.intern_atom(name)
+            for name in ("_NET_ACTIVE_WINDOW", "_NET_WM_NAME", "_NET_WM_PID")
+        }
+        self._utf8 = self._display.intern_atom("UTF8_STRING")
+        self._hook_stop: threading.Event = None
+        self._hook_thread: threading.Thread = None
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% foreground
+    def foreground(self) -> tuple[int, int]:
+        """Get the foreground window."""
+        active = self._root.get_full_property(
+            self._atoms["_NET_ACTIVE_WINDOW"], X.AnyPropertyType
+        )
+        if (active is None) or (len(active.value) == 0) or (not active.value[0]):
+            return 0, 0
+        hwnd = int(active.value[0])
+        try:
+            pid = self._display.create_resource_object(
+                "window", hwnd
+            ).get_full_property(self._atoms["_NET_WM_PID"], Xatom.CARDINAL)
+        except XError:
+            pid = None
+        return hwnd, 0 if pid is None else int(pid.value[0])
+
+    # %% process_name
+    def process_name(self, pid: int) -> str:
+        """Get the executable name of a process."""
+        try:
+            return psutil.Process(pid).name() if pid else ""
+        except psutil.Error:
+            return ""
+
+    # %% set_foreground_hook
+    def set_foreground_hook(self, callback: Callable[[], None]) -> bool:
+        """Call a function whenever the foreground window changes."""
+        if self._hook_thread is not None:
+            self._hook_stop.set()
+            self._hook_thread.join()
+            self._hook_thread = None
+        if callback is None:
+            return False
+        self._hook_stop = threading.Event()
+        self._hook_thread = threading.Thread(
+            target=self._run_hook, args=(callback, self._hook_stop), daemon=True
+        )
+        self._hook_thread.start()
+        return True
+
+    # %% title
+    def title(self, hwnd: int) -> str:
+        """Get the title of a window."""
+        if not hwnd:
+            return ""
+        window = self._display.create_resource_object("window", hwnd)
+        try:
+            name = window.get_full_property(self._atoms["_NET_WM_NAME"], self._utf8)
+            if name is None:
+                return window.get_wm_name() or ""
+        except XError:
+            return ""
+        if isinstance(name.value, bytes):
+            return name.value.decode("utf-8", "replace")
+        return str(name.value)
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _run_hook
+    def _run_hook(self, callback: Callable[[], None], stop: threading.Event):
+        """
+        Listen for foreground changes until the hook is removed.
+
+        Arguments
+        ---------
+        callback: Callable[[], None]
+            Function to call on every foreground change.
+        stop: threading.Event
+            Event set when the hook is removed.
+        """
+        display = xdisplay.Display(self._display.get_display_name())
+        try:
+            display.screen().root.change_attributes(event_mask=X.PropertyChangeMask)
+            active = display.intern_atom("_NET_ACTIVE_WINDOW")
+            while not stop.is_set():
+                select.select([display], [], [], HOOK_POLL)
+                while display.pending_events():
+                    event = display.next_event()
+                    if (event.type == X.PropertyNotify) and (event.atom == active):
+                        callback()
+        finally:
+            display.close()
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% app_name
+@functools.lru_cache(maxsize=1024)
+def app_name(process: str, title: str) -> str:
+    """
+    Get the application name of a window.
+
+    Known processes map through `APP_DICT`. Otherwise the name is the part of the
+    title after its last " - ", or the whole title.
+
+    Arguments
+    ---------
+    process: str
+        Process name of the window.
+    title: str
+        Window title.
+
+    Returns
+    -------
+    str
+        Application name.
+    """
+    if process in APP_DICT:
+        return APP_DICT[process]
+    try:
+        return title.rsplit(" - ", 1)[1]
+    except IndexError:
+        return title
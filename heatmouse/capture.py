@@ -0,0 +1,588 @@
+"""
+The capture backends used by Heat Mouse to observe the desktop.
+
+A capture backend provides everything Heat Mouse reads from the desktop: the
+foreground application, its icon, the screen geometry and the stream of mouse clicks.
+Click sources report each click to a callback as (X, Y, Button, Pressed), with the
+button names of `hclickarray.BUTTONS`, and have the `start`, `stop` and `join`
+methods of a thread.
+
+Classes
+-------
+CaptureBackend
+    Base class of the capture backends.
+ReplayBackend
+    Capture backend replaying a recorded session.
+ReplayClickSource
+    Thread replaying the clicks of a recording.
+ReplayWindowProvider
+    Fake window provider bringing the recorded application of each click forward.
+SyntheticBackend
+    Deterministic desktop for headless runs, profiling and load tests.
+SyntheticClickSource
+    Thread generating a deterministic stream of clicks.
+SyntheticWindowProvider
+    Fake window provider bringing windows to the foreground in turn.
+WindowsBackend
+    Capture backend for the Windows desktop.
+X11Backend
+    Capture backend for X11 desktops.
+
+Functions
+---------
+get_backend
+    Get a capture backend by name, or choose the one of the running desktop.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import abc
+import ctypes
+import os
+import sys
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+import heatmouse.activeicon as hactiveicon
+import heatmouse.activewindow as hactivewindow
+import heatmouse.clickarray as hclickarray
+import heatmouse.recording as hrecording
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% BACKEND_VARIABLE
+BACKEND_VARIABLE = "HEATMOUSE_BACKEND"
+# %% REPLAY_VARIABLE
+REPLAY_VARIABLE = "HEATMOUSE_REPLAY"
+# %% SYNTHETIC_APPLICATIONS
+SYNTHETIC_APPLICATIONS = ("Editor", "Browser", "Terminal")
+# %% SYNTHETIC_BUTTON_WEIGHTS
+SYNTHETIC_BUTTON_WEIGHTS = (0.8, 0.15, 0.05, 0.0)
+# %% SYNTHETIC_CHUNK
+SYNTHETIC_CHUNK = 1024
+# %% SYNTHETIC_RATE
+SYNTHETIC_RATE = 10.0
+# %% SYNTHETIC_SCREENSIZE
+SYNTHETIC_SCREENSIZE = (1920, 1080)
+# %% SYNTHETIC_SWITCH
+SYNTHETIC_SWITCH = 50
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% CaptureBackend
+class CaptureBackend(abc.ABC):
+    """
+    Base class of the capture backends.
+
+    Methods
+    -------
+    click_source
+        Create a click source reporting to a callback.
+    screensize
+        Get the screen size.
+    window_icon
+        Save the icon of the foreground window.
+    window_provider
+        Create the provider of foreground window data.
+    """
+
+    name = None
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% click_source
+    @abc.abstractmethod
+    def click_source(self, on_click: Callable[[int, int, str, bool], None]):
+        """
+        Create a click source reporting to a callback.
+
+        Arguments
+        ---------
+        on_click: Callable[[int, int, str, bool], None]
+            Function called with (X, Y, Button, Pressed) for every mouse event.
+
+        Returns
+        -------
+        Click source, not started yet.
+        """
+
+    # %% screensize
+    @abc.abstractmethod
+    def screensize(self) -> tuple[int, int]:
+        """
+        Get the screen size.
+
+        Returns
+        -------
+        tuple[int, int]
+            Screensize tuple stored as (X, Y).
+        """
+
+    # %% window_icon
+    def window_icon(self, application: str) -> str:
+        """
+        Save the icon of the foreground window.
+
+        Arguments
+        ---------
+        application: str
+            Application name of the foreground window.
+
+        Returns
+        -------
+        str
+            The locally saved icon path, or None if there is no icon.
+        """
+        return None
+
+    # %% window_provider
+    @abc.abstractmethod
+    def window_provider(self) -> hactivewindow.WindowProvider:
+        """
+        Create the provider of foreground window data.
+
+        Called on the thread that uses the provider.
+
+        Returns
+        -------
+        hactivewindow.WindowProvider
+            Window provider.
+        """
+
+
+# %% ReplayBackend
+class ReplayBackend(CaptureBackend):
+    """
+    Capture backend replaying a recorded session.
+
+    Clicks are replayed with their recorded delays divided by `speed`, or as fast as
+    possible if `speed` is None. Each click is reported in the application it was
+    recorded in. The recording may also be given as a file path, and is otherwise
+    loaded from the path in the HEATMOUSE_REPLAY environment variable.
+    """
+
+    name = "replay"
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(
+        self, recording: hrecording.SessionRecording = None, speed: float = 1.0
+    ):
+        if recording is None:
+            recording = os.environ.get(REPLAY_VARIABLE)
+            if recording is None:
+                raise ValueError(
+                    f"The replay capture backend requires {REPLAY_VARIABLE} to be set."
+                )
+        if not isinstance(recording, hrecording.SessionRecording):
+            recording = hrecording.SessionRecording.load(recording)
+        self.recording = recording
+        self.speed = speed
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% click_source
+    def click_source(
+        self, on_click: Callable[[int, int, str, bool], None]
+    ) -> "ReplayClickSource":
+        """Create a click source reporting to a callback."""
+        return ReplayClickSource(on_click, self.recording, self.speed)
+
+    # %% screensize
+    def screensize(self) -> tuple[int, int]:
+        """Get the screen size."""
+        return self.recording.screensize
+
+    # %% window_provider
+    def window_provider(self) -> "ReplayWindowProvider":
+        """Create the provider of foreground window data."""
+        return ReplayWindowProvider(
+            self.recording.applications, self.recording.application
+        )
+
+
+# %% ReplayClickSource
+class ReplayClickSource(threading.Thread):
+    """
+    Thread replaying the clicks of a recording.
+
+    Each click is reported as a press and a release, like a mouse listener does. The
+    `perf_counter` time at which each click was reported is kept in `emitted`, so the
+    latency of the clicks downstream can be measured. The thread ends after the last
+    click.
+
+    Methods
+    -------
+    run
+        Replay the clicks.
+    stop
+        Stop replaying clicks.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(
+        self,
+        on_click: Callable[[int, int, str, bool], None],
+        recording: hrecording.SessionRecording,
+        speed: float,
+    ):
+        super().__init__(daemon=True)
+        self.on_click = on_click
+        self.recording = recording
+        self.speed = speed
+        self.emitted = np.full(len(recording), np.nan)
+        self._stopped = threading.Event()
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% run
+    def run(self):
+        """Replay the clicks."""
+        clicks = self.recording.clicks
+        if len(clicks) == 0:
+            return
+        offset = (clicks.timestamp - clicks.timestamp[0]).tolist()
+        events = zip(offset, clicks.x.tolist(), clicks.y.tolist(), clicks.buttons)
+        start = time.perf_counter()
+        for index, (offset, x_position, y_position, button) in enumerate(events):
+            if self.speed is not None:
+                delay = start + offset / self.speed - time.perf_counter()
+                if (delay > 0) and self._stopped.wait(delay):
+                    return
+            elif self._stopped.is_set():
+                return
+            self.emitted[index] = time.perf_counter()
+            self.on_click(x_position, y_position, button, True)
+            self.on_click(x_position, y_position, button, False)
+
+    # %% stop
+    def stop(self):
+        """Stop replaying clicks."""
+        self._stopped.set()
+
+
+# %% ReplayWindowProvider
+class ReplayWindowProvider(hactivewindow.FakeWindowProvider):
+    """
+    Fake window provider bringing the recorded application of each click forward.
+
+    Like `SyntheticWindowProvider`, the foreground changes with the number of lookups
+    rather than on a clock: lookup N returns the window of the application of click
+    N. Each application has a window titled with its name.
+
+    Methods
+    -------
+    foreground
+        Get the foreground window and count the lookup.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, applications: list[str], application: np.ndarray):
+        super().__init__()
+        for window, name in enumerate(applications, start=1):
+            self.titles[window] = name
+            self.processes[window] = ""
+        self.application = application
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% foreground
+    def foreground(self) -> tuple[int, int]:
+        """Get the foreground window and count the lookup."""
+        lookup = self.calls["foreground"]
+        if lookup < len(self.application):
+            window = int(self.application[lookup]) + 1
+            self.current = (window, window)
+        return super().foreground()
+
+
+# %% SyntheticBackend
+class SyntheticBackend(CaptureBackend):
+    """
+    Deterministic desktop for headless runs, profiling and load tests.
+
+    The desktop has one window per application, brought to the foreground in turn
+    every `switch_every` clicks. The click source draws click positions and buttons
+    from a seeded random generator, so a seed always gives the same stream.
+    """
+
+    name = "synthetic"
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(
+        self,
+        screensize: tuple[int, int] = SYNTHETIC_SCREENSIZE,
+        applications: tuple[str, ...] = SYNTHETIC_APPLICATIONS,
+        rate: float = SYNTHETIC_RATE,
+        clicks: int = None,
+        seed: int = 0,
+        switch_every: int = SYNTHETIC_SWITCH,
+    ):
+        self._screensize = tuple(screensize)
+        self._applications = tuple(applications)
+        self._rate = rate
+        self._clicks = clicks
+        self._seed = seed
+        self._switch_every = switch_every
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% click_source
+    def click_source(
+        self, on_click: Callable[[int, int, str, bool], None]
+    ) -> "SyntheticClickSource":
+        """Create a click source reporting to a callback."""
+        return SyntheticClickSource(
+            on_click, self._screensize, self._rate, self._clicks, self._seed
+        )
+
+    # %% screensize
+    def screensize(self) -> tuple[int, int]:
+        """Get the screen size."""
+        return self._screensize
+
+    # %% window_provider
+    def window_provider(self) -> "SyntheticWindowProvider":
+        """Create the provider of foreground window data."""
+        return SyntheticWindowProvider(self._applications, self._switch_every)
+
+
+# %% SyntheticClickSource
+class SyntheticClickSource(threading.Thread):
+    """
+    Thread generating a deterministic stream of clicks.
+
+    Each click is reported as a press and a release, like a mouse listener does.
+    Clicks are paced at `rate` clicks per second, or generated as fast as possible if
+    `rate` is None. The thread ends after `clicks` clicks, or runs until stopped if
+    `clicks` is None.
+
+    Methods
+    -------
+    run
+        Generate the clicks.
+    stop
+        Stop generating clicks.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(
+        self,
+        on_click: Callable[[int, int, str, bool], None],
+        screensize: tuple[int, int],
+        rate: float,
+        clicks: int,
+        seed: int,
+    ):
+        super().__init__(daemon=True)
+        self.on_click = on_click
+        self.screensize = screensize
+        self.rate = rate
+        self.clicks = clicks
+        self.seed = seed
+        self._stopped = threading.Event()
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% run
+    def run(self):
+        """Generate the clicks."""
+        rng = np.random.default_rng(self.seed)
+        start = time.perf_counter()
+        count = 0
+        while not self._stopped.is_set():
+            size = SYNTHETIC_CHUNK
+            if self.clicks is not None:
+                size = min(size, self.clicks - count)
+            if size <= 0:
+                return
+            x = rng.integers(0, self.screensize[0], size).tolist()
+            y = rng.integers(0, self.screensize[1], size).tolist()
+            buttons = rng.choice(
+                len(hclickarray.BUTTONS), size, p=SYNTHETIC_BUTTON_WEIGHTS
+            ).tolist()
+            for x_position, y_position, button in zip(x, y, buttons):
+                if self.rate is not None:
+                    delay = start + count / self.rate - time.perf_counter()
+                    if (delay > 0) and self._stopped.wait(delay):
+                        return
+                elif self._stopped.is_set():
+                    return
+                button = hclickarray.BUTTONS[button]
+                self.on_click(x_position, y_position, button, True)
+                self.on_click(x_position, y_position, button, False)
+                count += 1
+
+    # %% stop
+    def stop(self):
+        """Stop generating clicks."""
+        self._stopped.set()
+
+
+# %% SyntheticWindowProvider
+class SyntheticWindowProvider(hactivewindow.FakeWindowProvider):
+    """
+    Fake window provider bringing windows to the foreground in turn.
+
+    The foreground changes every `switch_every` lookups rather than on a clock. The
+    listener looks the foreground up once per click, so the application of every
+    click is the same however fast the clicks are generated and drained.
+
+    Methods
+    -------
+    foreground
+        Get the foreground window and count the lookup.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, applications: tuple[str, ...], switch_every: int):
+        super().__init__()
+        for window, application in enumerate(applications, start=1):
+            self.titles[window] = f"Synthetic - {application}"
+            self.processes[window] = f"{application.lower()}.exe"
+        self.switch_every = switch_every
+        self.windows = len(applications)
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% foreground
+    def foreground(self) -> tuple[int, int]:
+        """Get the foreground window and count the lookup."""
+        window = (self.calls["foreground"] // self.switch_every) % self.windows + 1
+        self.current = (window, window)
+        return super().foreground()
+
+
+# %% WindowsBackend
+class WindowsBackend(CaptureBackend):
+    """Capture backend for the Windows desktop."""
+
+    name = "windows"
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% click_source
+    def click_source(self, on_click: Callable[[int, int, str, bool], None]):
+        """Create a click source reporting to a callback."""
+        return _pynput_listener(on_click)
+
+    # %% screensize
+    def screensize(self) -> tuple[int, int]:
+        """Get the screen size."""
+        user32 = ctypes.windll.user32
+        user32.SetProcessDPIAware()
+        return (user32.GetSystemMetrics(0), user32.GetSystemMetrics(1))
+
+    # %% window_icon
+    def window_icon(self, application: str) -> str:
+        """Save the icon of the foreground window."""
+        return hactiveicon.get_active_window_icon(application)
+
+    # %% window_provider
+    def window_provider(self) -> hactivewindow.Win32WindowProvider:
+        """Create the provider of foreground window data."""
+        return hactivewindow.Win32WindowProvider()
+
+
+# %% X11Backend
+class X11Backend(CaptureBackend):
+    """Capture backend for X11 desktops, through python-xlib and pynput."""
+
+    name = "x11"
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% click_source
+    def click_source(self, on_click: Callable[[int, int, str, bool], None]):
+        """Create a click source reporting to a callback."""
+        return _pynput_listener(on_click)
+
+    # %% screensize
+    def screensize(self) -> tuple[int, int]:
+        """Get the screen size."""
+        display = hactivewindow.xdisplay.Display()
+        try:
+            screen = display.screen()
+            return (screen.width_in_pixels, screen.height_in_pixels)
+        finally:
+            display.close()
+
+    # %% window_icon
+    def window_icon(self, application: str) -> str:
+        """Save the icon of the foreground window."""
+        return hactiveicon.get_x11_window_icon(application)
+
+    # %% window_provider
+    def window_provider(self) -> hactivewindow.X11WindowProvider:
+        """Create the provider of foreground window data."""
+        return hactivewindow.X11WindowProvider()
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% get_backend
+def get_backend(name: str = "auto") -> CaptureBackend:
+    """
+    Get a capture backend by name, or choose the one of the running desktop.
+
+    The automatic choice can be overridden with the HEATMOUSE_BACKEND environment
+    variable. Otherwise it is the Windows backend on Windows and the X11 backend when
+    an X11 display is set. The synthetic and replay backends feed made-up clicks into
+    the database, so they are never chosen automatically.
+
+    Arguments
+    ---------
+    name: str
+        Backend name, or "auto". Defaults to "auto".
+
+    Returns
+    -------
+    CaptureBackend
+        The capture backend.
+    """
+    if name == "auto":
+        name = os.environ.get(BACKEND_VARIABLE, "auto")
+    if name == "auto":
+        if sys.platform == "win32":
+            name = WindowsBackend.name
+        elif os.environ.get("DISPLAY"):
+            name = X11Backend.name
+        else:
+            raise RuntimeError(
+                "No capture backend supports this desktop. Set "
+                f"{BACKEND_VARIABLE} to choose one."
+            )
+    backend_types = {
+        backend.name: backend for backend in CaptureBackend.__subclasses__()
+    }
+    if name not in backend_types:
+        raise ValueError(f'Unknown capture backend: "{name}"')
+    if (name == X11Backend.name) and (hactivewindow.xdisplay is None):
+        raise ImportError("The x11 capture backend requires python-xlib.")
+    return backend_types[name]()
+
+
+# %% _pynput_listener
+def _pynput_listener(on_click: Callable[[int, int, str, bool], None]):
+    """
+    Create a pynput mouse listener reporting button names to a callback.
+
+    Arguments
+    ---------
+    on_click: Callable[[int, int, str, bool], None]
+        Function called with (X, Y, Button, Pressed) for every mouse event.
+
+    Returns
+    -------
+    pynput.mouse.Listener
+        Mouse listener, not started yet.
+    """
+    # pynput connects to the desktop on import, so it is only imported when used
+    from pynput import mouse
+
+    names = {
+        mouse.Button.left: "LeftClick",
+        mouse.Button.right: "RightClick",
+        mouse.Button.middle: "MiddleClick",
+    }
+
+    def handle(x: int, y: int, button: mouse.Button, pressed: bool):
+        on_click(x, y, names.get(button, "OtherClick"), pressed)
+
+    return mouse.Listener(on_click=handle)
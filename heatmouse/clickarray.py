@@ -0,0 +1,353 @@
+"""
+The click array class used by Heat Mouse to store click data compactly.
+
+Classes
+-------
+ClickArray
+    Growable, NumPy-backed container of mouse clicks.
+
+Functions
+---------
+decode_buttons
+    Convert button codes to button names.
+encode_buttons
+    Convert button names to button codes.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+from typing import Iterable
+
+import numpy as np
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% BUTTONS
+BUTTONS = ("LeftClick", "RightClick", "MiddleClick", "OtherClick")
+# %% BUTTON_CODES
+BUTTON_CODES = {button: code for code, button in enumerate(BUTTONS)}
+# %% OTHER_CODE
+OTHER_CODE = BUTTON_CODES["OtherClick"]
+# %% COORD_DTYPE
+COORD_DTYPE = np.int32
+# %% BUTTON_DTYPE
+BUTTON_DTYPE = np.uint8
+# %% TIME_DTYPE
+TIME_DTYPE = np.float64
+# %% MIN_CAPACITY
+MIN_CAPACITY = 1024
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% decode_buttons
+def decode_buttons(codes: np.ndarray) -> list[str]:
+    """
+    Convert button codes to button names.
+
+    Arguments
+    ---------
+    codes: np.ndarray
+        Button codes.
+
+    Returns
+    -------
+    list[str]
+        Button names.
+    """
+    return np.asarray(BUTTONS, dtype=object)[codes].tolist()
+
+
+# %% encode_buttons
+def encode_buttons(buttons: Iterable[str]) -> np.ndarray:
+    """
+    Convert button names to button codes.
+
+    Unknown button names are stored as "OtherClick".
+
+    Arguments
+    ---------
+    buttons: Iterable[str]
+        Button names.
+
+    Returns
+    -------
+    np.ndarray
+        Button codes.
+    """
+    buttons = np.asarray(list(buttons), dtype=object)
+    if buttons.size == 0:
+        return np.empty(0, dtype=BUTTON_DTYPE)
+    names, inverse = np.unique(buttons.astype(str), return_inverse=True)
+    codes = np.array(
+        [BUTTON_CODES.get(name, OTHER_CODE) for name in names], dtype=BUTTON_DTYPE
+    )
+    return codes[inverse.ravel()]
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% ClickArray
+class ClickArray:
+    """
+    Growable, NumPy-backed container of mouse clicks.
+
+    Each column is stored in a preallocated typed array that doubles in size when
+    full, so appends are amortized O(1). The column properties return zero-copy
+    views of the filled part of each array. A view stays valid after further
+    appends, since a reallocation leaves the old buffer untouched.
+
+    Properties
+    ----------
+    button : np.ndarray
+        Get the button codes of the stored clicks.
+    buttons : list[str]
+        Get the button names of the stored clicks.
+    has_timestamps : bool
+        Get whether timestamps are stored.
+    timestamp : np.ndarray
+        Get the timestamps of the stored clicks.
+    x : np.ndarray
+        Get the X-positions of the stored clicks.
+    y : np.ndarray
+        Get the Y-positions of the stored clicks.
+
+    Methods
+    -------
+    append
+        Add a click to the array.
+    clear
+        Remove every click from the array.
+    extend
+        Add several clicks to the array.
+    from_columns
+        Create a click array from column data.
+
+    Protected Methods
+    -----------------
+    _reserve
+        Grow the column arrays so they can hold at least `size` clicks.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, capacity: int = MIN_CAPACITY, timestamps: bool = False):
+        capacity = max(int(capacity), MIN_CAPACITY)
+        self._size = 0
+        self._x = np.empty(capacity, dtype=COORD_DTYPE)
+        self._y = np.empty(capacity, dtype=COORD_DTYPE)
+        self._button = np.empty(capacity, dtype=BUTTON_DTYPE)
+        self._timestamp = np.empty(capacity, dtype=TIME_DTYPE) if timestamps else None
+
+    # %% __len__
+    def __len__(self) -> int:
+        return self._size
+
+    # %% __repr__
+    def __repr__(self) -> str:
+        return f"ClickArray(size={self._size}, capacity={len(self._x)})"
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% button
+    @property
+    def button(self) -> np.ndarray:
+        """
+        Get the button codes of the stored clicks.
+
+        Returns
+        -------
+        np.ndarray
+            Zero-copy view of the button codes.
+        """
+        return self._button[: self._size]
+
+    # %% buttons
+    @property
+    def buttons(self) -> list[str]:
+        """
+        Get the button names of the stored clicks.
+
+        Returns
+        -------
+        list[str]
+            Button names.
+        """
+        return decode_buttons(self.button)
+
+    # %% has_timestamps
+    @property
+    def has_timestamps(self) -> bool:
+        """
+        Get whether timestamps are stored.
+
+        Returns
+        -------
+        bool
+            True if the array has a timestamp column.
+        """
+        return self._timestamp is not None
+
+    # %% timestamp
+    @property
+    def timestamp(self) -> np.ndarray:
+        """
+        Get the timestamps of the stored clicks.
+
+        Returns
+        -------
+        np.ndarray
+            Zero-copy view of the timestamps, or None if timestamps are not stored.
+        """
+        if self._timestamp is None:
+            return None
+        return self._timestamp[: self._size]
+
+    # %% x
+    @property
+    def x(self) -> np.ndarray:
+        """
+        Get the X-positions of the stored clicks.
+
+        Returns
+        -------
+        np.ndarray
+            Zero-copy view of the X-positions.
+        """
+        return self._x[: self._size]
+
+    # %% y
+    @property
+    def y(self) -> np.ndarray:
+        """
+        Get the Y-positions of the stored clicks.
+
+        Returns
+        -------
+        np.ndarray
+            Zero-copy view of the Y-positions.
+        """
+        return self._y[: self._size]
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% append
+    def append(self, x: int, y: int, button: str, timestamp: float = None):
+        """
+        Add a click to the array.
+
+        Arguments
+        ---------
+        x: int
+            The X-position on the screen.
+        y: int
+            The Y-position on the screen.
+        button: str
+            The button pressed on the mouse.
+        timestamp: float
+            The time of the click. Ignored if timestamps are not stored.
+        """
+        if self._size == len(self._x):
+            self._reserve(self._size + 1)
+        index = self._size
+        self._x[index] = x
+        self._y[index] = y
+        self._button[index] = BUTTON_CODES.get(button, OTHER_CODE)
+        if self._timestamp is not None:
+            self._timestamp[index] = np.nan if timestamp is None else timestamp
+        self._size += 1
+
+    # %% clear
+    def clear(self):
+        """
+        Remove every click from the array.
+
+        New buffers are allocated so that views handed out earlier are not overwritten.
+        """
+        self.__init__(timestamps=self.has_timestamps)
+
+    # %% extend
+    def extend(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        button: np.ndarray,
+        timestamp: np.ndarray = None,
+    ):
+        """
+        Add several clicks to the array.
+
+        Arguments
+        ---------
+        x: np.ndarray
+            The X-positions on the screen.
+        y: np.ndarray
+            The Y-positions on the screen.
+        button: np.ndarray
+            The button codes.
+        timestamp: np.ndarray
+            The times of the clicks. Ignored if timestamps are not stored.
+        """
+        count = len(x)
+        if count == 0:
+            return
+        self._reserve(self._size + count)
+        new = slice(self._size, self._size + count)
+        self._x[new] = x
+        self._y[new] = y
+        self._button[new] = button
+        if self._timestamp is not None:
+            self._timestamp[new] = np.nan if timestamp is None else timestamp
+        self._size += count
+
+    # %% from_columns
+    @classmethod
+    def from_columns(
+        cls,
+        x: Iterable[int],
+        y: Iterable[int],
+        buttons: Iterable[str],
+        timestamps: bool = False,
+    ) -> "ClickArray":
+        """
+        Create a click array from column data.
+
+        Arguments
+        ---------
+        x: Iterable[int]
+            The X-positions on the screen.
+        y: Iterable[int]
+            The Y-positions on the screen.
+        buttons: Iterable[str]
+            The button names.
+        timestamps: bool
+            Whether the new array stores timestamps. Defaults to False.
+
+        Returns
+        -------
+        ClickArray
+            The new click array.
+        """
+        x = np.asarray(x, dtype=COORD_DTYPE)
+        clicks = cls(len(x), timestamps=timestamps)
+        clicks.extend(x, np.asarray(y, dtype=COORD_DTYPE), encode_buttons(buttons))
+        return clicks
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _reserve
+    def _reserve(self, size: int):
+        """
+        Grow the column arrays so they can hold at least `size` clicks.
+
+        Arguments
+        ---------
+        size: int
+            Required capacity.
+        """
+        capacity = len(self._x)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        columns = ["_x", "_y", "_button"]
+        if self._timestamp is not None:
+            columns.append("_timestamp")
+        for column in columns:
+            old = getattr(self, column)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, column, new)
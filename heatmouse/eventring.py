@@ -0,0 +1,243 @@
+"""
+The event ring class used by Heat Mouse to hand click events between threads.
+
+Classes
+-------
+EventRing
+    Preallocated single-producer, single-consumer ring buffer of click events.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import threading
+
+import numpy as np
+
+import heatmouse.clickarray as hclickarray
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% RING_CAPACITY
+RING_CAPACITY = 65536
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% EventRing
+class EventRing:
+    """
+    Preallocated single-producer, single-consumer ring buffer of click events.
+
+    Events are stored as (X, Y, Button-Code) in typed column arrays, indexed by a
+    write counter only the producer moves and a read counter only the consumer
+    moves, so neither side takes a lock. When the ring is full, new events are
+    dropped and counted in `dropped` instead of growing the buffer. A consumer
+    waiting in `wait` is woken by the next event or by `close`; the producer only
+    signals it while it waits, so events written to a busy consumer cost no
+    signal at all.
+
+    Only one thread may put events and only one thread may get them.
+
+    Properties
+    ----------
+    capacity : int
+        Get the number of events the ring holds.
+    closed : bool
+        Get whether the producer closed the ring.
+
+    Methods
+    -------
+    close
+        Close the ring and wake the consumer.
+    drain
+        Remove the oldest events from the ring at once.
+    empty
+        Check whether the ring holds no events.
+    get
+        Remove the oldest event from the ring.
+    put
+        Add an event to the ring, or drop it if the ring is full.
+    wait
+        Wait until the ring holds events or is closed.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, capacity: int = RING_CAPACITY):
+        capacity = 1 << max(int(capacity) - 1, 1).bit_length()
+        self._mask = capacity - 1
+        self._x = np.empty(capacity, dtype=hclickarray.COORD_DTYPE)
+        self._y = np.empty(capacity, dtype=hclickarray.COORD_DTYPE)
+        self._button = np.empty(capacity, dtype=hclickarray.BUTTON_DTYPE)
+        self._head = 0
+        self._tail = 0
+        self._closed = False
+        self._waiting = False
+        self._data = threading.Event()
+        self.dropped = 0
+
+    # %% __len__
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+    # %% __repr__
+    def __repr__(self) -> str:
+        return (
+            f"EventRing(size={len(self)}, capacity={self.capacity}, "
+            f"dropped={self.dropped})"
+        )
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% capacity
+    @property
+    def capacity(self) -> int:
+        """
+        Get the number of events the ring holds.
+
+        Returns
+        -------
+        int
+            Ring capacity, a power of two.
+        """
+        return self._mask + 1
+
+    # %% closed
+    @property
+    def closed(self) -> bool:
+        """
+        Get whether the producer closed the ring.
+
+        Returns
+        -------
+        bool
+            True if no more events will be put.
+        """
+        return self._closed
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% close
+    def close(self):
+        """Close the ring and wake the consumer."""
+        self._closed = True
+        self._data.set()
+
+    # %% drain
+    def drain(self, limit: int = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Remove the oldest events from the ring at once.
+
+        Arguments
+        ---------
+        limit: int
+            Maximum number of events to remove, or None for all. Defaults to None.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, np.ndarray]
+            Events stored as (X-Positions, Y-Positions, Button-Codes).
+        """
+        head = self._head
+        count = self._tail - head
+        if limit is not None:
+            count = min(count, limit)
+        index = np.arange(head, head + count) & self._mask
+        events = self._x[index], self._y[index], self._button[index]
+        self._head = head + count
+        return events
+
+    # %% empty
+    def empty(self) -> bool:
+        """
+        Check whether the ring holds no events.
+
+        Returns
+        -------
+        bool
+            True if the ring is empty.
+        """
+        return self._tail == self._head
+
+    # %% get
+    def get(self, timeout: float = None) -> tuple[int, int, str]:
+        """
+        Remove the oldest event from the ring.
+
+        Arguments
+        ---------
+        timeout: float
+            Time in seconds to wait for an event, or None to wait until one arrives
+            or the ring is closed. Defaults to None.
+
+        Returns
+        -------
+        tuple[int, int, str]
+            The event stored as (X, Y, Button), or None if no event arrived in time.
+        """
+        if not self.wait(timeout):
+            return None
+        index = self._head & self._mask
+        event = (
+            int(self._x[index]),
+            int(self._y[index]),
+            hclickarray.BUTTONS[self._button[index]],
+        )
+        self._head += 1
+        return event
+
+    # %% put
+    def put(self, x: int, y: int, button: str) -> bool:
+        """
+        Add an event to the ring, or drop it if the ring is full.
+
+        Arguments
+        ---------
+        x: int
+            The X-position on the screen.
+        y: int
+            The Y-position on the screen.
+        button: str
+            The name of the button pressed on the mouse.
+
+        Returns
+        -------
+        bool
+            True if the event was added, False if it was dropped.
+        """
+        tail = self._tail
+        if tail - self._head > self._mask:
+            self.dropped += 1
+            return False
+        index = tail & self._mask
+        self._x[index] = x
+        self._y[index] = y
+        self._button[index] = hclickarray.BUTTON_CODES.get(
+            button, hclickarray.OTHER_CODE
+        )
+        self._tail = tail + 1
+        if self._waiting:
+            self._data.set()
+        return True
+
+    # %% wait
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait until the ring holds events or is closed.
+
+        Arguments
+        ---------
+        timeout: float
+            Time in seconds to wait, or None to wait without limit. Defaults to None.
+
+        Returns
+        -------
+        bool
+            True if the ring holds events.
+        """
+        if self._tail != self._head:
+            return True
+        if self._closed:
+            return False
+        self._data.clear()
+        self._waiting = True
+        # An event put before the flag was raised did not signal
+        if (self._tail == self._head) and (not self._closed):
+            self._data.wait(timeout)
+        self._waiting = False
+        return self._tail != self._head
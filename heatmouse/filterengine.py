@@ -0,0 +1,527 @@
+"""
+The filter engines used by Heat Mouse to apply the Gaussian filter.
+
+Each engine convolves a count grid with the filter kernel using a zero-filled
+boundary, giving the same result as `astropy.convolution.convolve` on count data.
+Stacked count grids with leading axes, like the per-button layers of a histogram,
+are filtered along their last two axes in one batched convolution.
+
+Classes
+-------
+AstropyEngine
+    Direct convolution with astropy, kept as the reference implementation.
+FFTEngine
+    Convolution through real FFTs, with kernel transforms cached per grid shape.
+FilterEngine
+    Base class of the filter engines.
+NdimageEngine
+    Separable convolution with SciPy `ndimage`.
+SeparableEngine
+    Separable convolution with shifted NumPy multiply-adds.
+SparseEngine
+    Splats one scaled copy of the kernel per click or non-empty bin.
+
+Functions
+---------
+filter_counts
+    Filter a count grid into a heatmap array.
+get_engine
+    Get a filter engine by name, or choose the fastest available one.
+get_kernel
+    Get the Gaussian filter kernel for a standard deviation.
+prefer_sparse
+    Check whether splatting clicks is expected to beat a dense filter.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import abc
+
+import numpy as np
+from astropy.convolution import convolve
+from astropy.convolution.kernels import Gaussian2DKernel
+
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% FILTER_SIGMA
+FILTER_SIGMA = 2
+# %% FILTER_KERNEL
+FILTER_KERNEL = Gaussian2DKernel(FILTER_SIGMA, FILTER_SIGMA)
+# %% SPARSE_THRESHOLD
+# Splatted kernel values per grid bin below which the sparse engine is faster. The
+# crossover of `benchmarks/sparse_benchmark.py` was 6 to 37 for grids from 240x135 to
+# 960x540, with a median of 20.
+SPARSE_THRESHOLD = 20
+# %% _ENGINES
+_ENGINES: dict = {}
+# %% _KERNELS
+_KERNELS: dict = {}
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% FilterEngine
+class FilterEngine(abc.ABC):
+    """
+    Base class of the filter engines.
+
+    Properties
+    ----------
+    kernel : np.ndarray
+        Get the normalized filter kernel.
+
+    Methods
+    -------
+    filter
+        Convolve a count grid with the filter kernel.
+    """
+
+    name = None
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, kernel: np.ndarray = FILTER_KERNEL.array):
+        kernel = np.asarray(kernel, dtype=float)
+        self._kernel = kernel / kernel.sum()
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% kernel
+    @property
+    def kernel(self) -> np.ndarray:
+        """
+        Get the normalized filter kernel.
+
+        Returns
+        -------
+        np.ndarray
+            Filter kernel with a sum of one.
+        """
+        return self._kernel
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% filter
+    @abc.abstractmethod
+    def filter(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Convolve a count grid with the filter kernel.
+
+        Arguments
+        ---------
+        counts: np.ndarray
+            Click count grid, or a stack of grids along the leading axes.
+
+        Returns
+        -------
+        np.ndarray
+            Filtered grid with the same shape as `counts`.
+        """
+
+
+# %% AstropyEngine
+class AstropyEngine(FilterEngine):
+    """Direct convolution with astropy, kept as the reference implementation."""
+
+    name = "astropy"
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% filter
+    def filter(self, counts: np.ndarray) -> np.ndarray:
+        """Convolve a count grid with the filter kernel."""
+        counts = counts.astype(float)
+        if counts.ndim == 2:
+            return convolve(counts, self.kernel)
+        result = np.empty_like(counts)
+        for index in np.ndindex(counts.shape[:-2]):
+            result[index] = convolve(counts[index], self.kernel)
+        return result
+
+
+# %% FFTEngine
+class FFTEngine(FilterEngine):
+    """
+    Convolution through real FFTs, with kernel transforms cached per grid shape.
+
+    The grid is zero-padded to a fast FFT length so the circular convolution has no
+    wrap-around, which reproduces the zero-filled boundary.
+    """
+
+    name = "fft"
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, kernel: np.ndarray = FILTER_KERNEL.array):
+        super().__init__(kernel)
+        self._plans: dict[tuple[int, int] : tuple[tuple[int, int], np.ndarray]] = {}
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% filter
+    def filter(self, counts: np.ndarray) -> np.ndarray:
+        """Convolve a count grid with the filter kernel."""
+        rows, cols = counts.shape[-2:]
+        shape, kernel_fft = self._get_plan((rows, cols))
+        result = np.fft.irfft2(np.fft.rfft2(counts, shape) * kernel_fft, shape)
+        row = self.kernel.shape[0] // 2
+        col = self.kernel.shape[1] // 2
+        return result[..., row : row + rows, col : col + cols]
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _get_plan
+    def _get_plan(self, shape: tuple[int, int]) -> tuple[tuple[int, int], np.ndarray]:
+        """
+        Get the padded FFT shape and kernel transform for a grid shape.
+
+        Arguments
+        ---------
+        shape: tuple[int, int]
+            Count grid shape.
+
+        Returns
+        -------
+        tuple[tuple[int, int], np.ndarray]
+            Plan stored as (Padded-Shape, Kernel-Transform).
+        """
+        plan = self._plans.get(shape)
+        if plan is None:
+            padded = tuple(
+                _next_fast_length(size + kernel_size - 1)
+                for size, kernel_size in zip(shape, self.kernel.shape)
+            )
+            plan = (padded, np.fft.rfft2(self.kernel, padded))
+            self._plans[shape] = plan
+        return plan
+
+
+# %% NdimageEngine
+class NdimageEngine(FilterEngine):
+    """Separable convolution with SciPy `ndimage`."""
+
+    name = "ndimage"
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, kernel: np.ndarray = FILTER_KERNEL.array):
+        super().__init__(kernel)
+        self._rows, self._cols = _separate(self.kernel)
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% filter
+    def filter(self, counts: np.ndarray) -> np.ndarray:
+        """Convolve a count grid with the filter kernel."""
+        result = ndimage.convolve1d(
+            counts.astype(float), self._rows, axis=-2, mode="constant"
+        )
+        return ndimage.convolve1d(result, self._cols, axis=-1, mode="constant")
+
+
+# %% SeparableEngine
+class SeparableEngine(FilterEngine):
+    """
+    Separable convolution with shifted NumPy multiply-adds.
+
+    Needs no optional dependencies. Each axis costs one multiply-add over the grid
+    per kernel tap.
+    """
+
+    name = "separable"
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, kernel: np.ndarray = FILTER_KERNEL.array):
+        super().__init__(kernel)
+        self._rows, self._cols = _separate(self.kernel)
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% filter
+    def filter(self, counts: np.ndarray) -> np.ndarray:
+        """Convolve a count grid with the filter kernel."""
+        result = _convolve_axis(counts.astype(float), self._rows, -2)
+        return _convolve_axis(result, self._cols, -1)
+
+
+# %% SparseEngine
+class SparseEngine(FilterEngine):
+    """
+    Splats one scaled copy of the kernel per click or non-empty bin.
+
+    Costs O(clicks x kernel size) plus one pass to allocate the result, instead of
+    O(grid size x kernel width). It needs no float copy of the grid or FFT buffers,
+    so it beats the dense engines on grids with few clicks. Splats are accumulated in
+    one `np.bincount` into a grid padded by the kernel radius, and the padding is
+    cropped away, which matches a zero-filled boundary.
+
+    Methods
+    -------
+    splat
+        Add one scaled copy of the kernel per entry of a flat grid index.
+    """
+
+    name = "sparse"
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% filter
+    def filter(self, counts: np.ndarray) -> np.ndarray:
+        """Convolve a count grid with the filter kernel."""
+        index = np.flatnonzero(counts)
+        return self.splat(index, counts.shape, counts.reshape(-1)[index])
+
+    # %% splat
+    def splat(
+        self, index: np.ndarray, shape: tuple[int, ...], weights: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Add one scaled copy of the kernel per entry of a flat grid index.
+
+        Arguments
+        ---------
+        index: np.ndarray
+            Flat indices into a grid of `shape`, repeated entries are added up.
+        shape: tuple[int, ...]
+            Grid shape, with the rows and columns along the last two axes.
+        weights: np.ndarray
+            Weight of every entry, or None to weigh each entry as one click.
+            Defaults to None.
+
+        Returns
+        -------
+        np.ndarray
+            Filtered grid of `shape`.
+        """
+        *layers, rows, cols = shape
+        kernel_rows, kernel_cols = self.kernel.shape
+        padded_rows = rows + kernel_rows - 1
+        padded_cols = cols + kernel_cols - 1
+        layer, position = np.divmod(np.asarray(index, dtype=np.intp), rows * cols)
+        row, col = np.divmod(position, cols)
+        # Top-left corner of each splat in the padded grid
+        corner = (layer * padded_rows + row) * padded_cols + col
+        offsets = np.arange(kernel_rows)[:, None] * padded_cols + np.arange(kernel_cols)
+        kernel = self.kernel.reshape(-1)
+        if weights is None:
+            values = np.tile(kernel, len(corner))
+        else:
+            values = (np.asarray(weights, dtype=float)[:, None] * kernel).reshape(-1)
+        padded = np.bincount(
+            (corner[:, None] + offsets.reshape(-1)).reshape(-1),
+            values,
+            minlength=int(np.prod(layers, dtype=np.intp)) * padded_rows * padded_cols,
+        )
+        # Without any clicks, np.bincount returns integers despite the weights
+        padded = padded.astype(float, copy=False).reshape(
+            *layers, padded_rows, padded_cols
+        )
+        half_rows, half_cols = kernel_rows // 2, kernel_cols // 2
+        return np.ascontiguousarray(
+            padded[..., half_rows : half_rows + rows, half_cols : half_cols + cols]
+        )
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% filter_counts
+def filter_counts(
+    counts: np.ndarray, name: str = "auto", sigma: float = FILTER_SIGMA
+) -> np.ndarray:
+    """
+    Filter a count grid into a heatmap array.
+
+    This is the compute step of the filter stage. It only uses NumPy arrays, so it can
+    run in several threads at once, or in a process pool. Showing the heatmap is left
+    to the GUI thread.
+
+    Arguments
+    ---------
+    counts: np.ndarray
+        Click count grid, or a stack of grids along the leading axes.
+    name: str
+        Engine name, or "auto". Defaults to "auto".
+    sigma: float
+        Standard deviation of the Gaussian filter in bins. Defaults to FILTER_SIGMA.
+
+    Returns
+    -------
+    np.ndarray
+        Filtered grid with the same shape as `counts`.
+    """
+    return get_engine(name, sigma).filter(counts)
+
+
+# %% get_engine
+def get_engine(name: str = "auto", sigma: float = FILTER_SIGMA) -> FilterEngine:
+    """
+    Get a filter engine by name, or choose the fastest available one.
+
+    Engines are created once per kernel and shared, so their cached FFT plans are
+    reused between calls. The automatic choice uses the SciPy engine when SciPy is
+    installed and the FFT engine otherwise, as they were the fastest engines at every
+    grid size from 19x11 to 3840x2160 (see `benchmarks/filterengine_benchmark.py`).
+
+    Arguments
+    ---------
+    name: str
+        Engine name, or "auto". Defaults to "auto".
+    sigma: float
+        Standard deviation of the Gaussian filter in bins. Defaults to FILTER_SIGMA.
+
+    Returns
+    -------
+    FilterEngine
+        The filter engine.
+    """
+    if name == "auto":
+        if ndimage is not None:
+            name = NdimageEngine.name
+        else:
+            name = FFTEngine.name
+    sigma = round(float(sigma), 3)
+    engine = _ENGINES.get((name, sigma))
+    if engine is None:
+        engine_types = {engine.name: engine for engine in FilterEngine.__subclasses__()}
+        if name not in engine_types:
+            raise ValueError(f'Unknown filter engine: "{name}"')
+        if (name == NdimageEngine.name) and (ndimage is None):
+            raise ImportError("The ndimage filter engine requires SciPy.")
+        engine = engine_types[name](get_kernel(sigma))
+        _ENGINES[(name, sigma)] = engine
+    return engine
+
+
+# %% get_kernel
+def get_kernel(sigma: float = FILTER_SIGMA) -> np.ndarray:
+    """
+    Get the Gaussian filter kernel for a standard deviation.
+
+    Arguments
+    ---------
+    sigma: float
+        Standard deviation of the Gaussian filter in bins. Defaults to FILTER_SIGMA.
+
+    Returns
+    -------
+    np.ndarray
+        Filter kernel with odd side lengths.
+    """
+    sigma = round(float(sigma), 3)
+    kernel = _KERNELS.get(sigma)
+    if kernel is None:
+        kernel = _KERNELS[sigma] = Gaussian2DKernel(sigma, sigma).array
+    return kernel
+
+
+# %% prefer_sparse
+def prefer_sparse(
+    clicks: int,
+    shape: tuple[int, ...],
+    sigma: float = FILTER_SIGMA,
+    threshold: float = SPARSE_THRESHOLD,
+) -> bool:
+    """
+    Check whether splatting clicks is expected to beat a dense filter.
+
+    The sparse engine costs one kernel per click and layer, and every click is splat
+    into two layers, the layer of all clicks and the layer of its button. The dense
+    engines cost a fixed amount per grid bin, so the choice depends on the splatted
+    kernel values per bin.
+
+    Arguments
+    ---------
+    clicks: int
+        Number of clicks to splat.
+    shape: tuple[int, ...]
+        Grid shape, with the rows and columns along the last two axes.
+    sigma: float
+        Standard deviation of the Gaussian filter in bins. Defaults to FILTER_SIGMA.
+    threshold: float
+        Splatted kernel values per grid bin below which the sparse engine is used.
+        Defaults to SPARSE_THRESHOLD.
+
+    Returns
+    -------
+    bool
+        True if the sparse engine should be used.
+    """
+    return 2 * clicks * get_kernel(sigma).size <= threshold * shape[-2] * shape[-1]
+
+
+# %% _convolve_axis
+def _convolve_axis(array: np.ndarray, kernel: np.ndarray, axis: int) -> np.ndarray:
+    """
+    Convolve an array with a symmetric 1D kernel along one axis, zero-filled.
+
+    Arguments
+    ---------
+    array: np.ndarray
+        Array with at least one dimension.
+    kernel: np.ndarray
+        Symmetric 1D kernel with an odd length.
+    axis: int
+        Axis to convolve along.
+
+    Returns
+    -------
+    np.ndarray
+        Convolved array.
+    """
+    half = len(kernel) // 2
+    size = array.shape[axis]
+    result = array * kernel[half]
+    for offset in range(1, half + 1):
+        if offset >= size:
+            break
+        head = [slice(None)] * array.ndim
+        tail = [slice(None)] * array.ndim
+        head[axis] = slice(offset, None)
+        tail[axis] = slice(None, -offset)
+        head = tuple(head)
+        tail = tuple(tail)
+        result[head] += kernel[half + offset] * array[tail]
+        result[tail] += kernel[half - offset] * array[head]
+    return result
+
+
+# %% _next_fast_length
+def _next_fast_length(size: int) -> int:
+    """
+    Get the smallest length of at least `size` with no prime factor above 5.
+
+    Arguments
+    ---------
+    size: int
+        Minimum length.
+
+    Returns
+    -------
+    int
+        Fast FFT length.
+    """
+    length = size
+    while True:
+        remainder = length
+        for prime in (2, 3, 5):
+            while remainder % prime == 0:
+                remainder //= prime
+        if remainder == 1:
+            return length
+        length += 1
+
+
+# %% _separate
+def _separate(kernel: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Split a separable 2D kernel into its row and column 1D kernels.
+
+    Arguments
+    ---------
+    kernel: np.ndarray
+        Separable 2D kernel with a sum of one.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        1D kernels stored as (Rows, Columns).
+    """
+    rows = kernel.sum(axis=1)
+    cols = kernel.sum(axis=0)
+    if not np.allclose(np.outer(rows, cols), kernel):
+        raise ValueError("Filter kernel is not separable.")
+    return rows, cols
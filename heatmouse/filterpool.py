@@ -0,0 +1,183 @@
+"""
+The filter pool class used by Heat Mouse to filter heatmaps in worker processes.
+
+Classes
+-------
+FilterPool
+    Process pool that filters count grids passed through shared memory.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import concurrent.futures
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import heatmouse.filterengine as hfilterengine
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% HEATMAP_DTYPE
+HEATMAP_DTYPE = np.float64
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% FilterPool
+class FilterPool:
+    """
+    Process pool that filters count grids passed through shared memory.
+
+    Filtering in a worker process keeps the convolution off the GIL of the GUI
+    process. The count grid is written once into a shared memory block and the worker
+    writes the filtered heatmap into a second one, so neither array is pickled. The
+    worker processes are spawned rather than forked, as the GUI process runs threads.
+
+    Properties
+    ----------
+    engine : str
+        Get the name of the filter engine used by the worker processes.
+    processes : int
+        Get the maximum number of worker processes.
+
+    Methods
+    -------
+    filter
+        Filter a count grid in a worker process and wait for the heatmap.
+    shutdown
+        Shut down the worker processes.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, processes: int = None, engine: str = "auto"):
+        self._engine = engine
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._processes = self._executor._max_workers
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% engine
+    @property
+    def engine(self) -> str:
+        """
+        Get the name of the filter engine used by the worker processes.
+
+        Returns
+        -------
+        str
+            Engine name, or "auto".
+        """
+        return self._engine
+
+    # %% processes
+    @property
+    def processes(self) -> int:
+        """
+        Get the maximum number of worker processes.
+
+        Returns
+        -------
+        int
+            Number of worker processes.
+        """
+        return self._processes
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% filter
+    def filter(
+        self, counts: np.ndarray, sigma: float = hfilterengine.FILTER_SIGMA
+    ) -> np.ndarray:
+        """
+        Filter a count grid in a worker process and wait for the heatmap.
+
+        Blocks the calling thread without holding the GIL, so it is meant to be called
+        from a worker thread.
+
+        Arguments
+        ---------
+        counts: np.ndarray
+            Click count grid.
+        sigma: float
+            Standard deviation of the Gaussian filter in bins. Defaults to
+            FILTER_SIGMA.
+
+        Returns
+        -------
+        np.ndarray
+            Filtered grid with the same shape as `counts`.
+        """
+        counts = np.ascontiguousarray(counts)
+        heatmap_nbytes = counts.size * np.dtype(HEATMAP_DTYPE).itemsize
+        source = shared_memory.SharedMemory(create=True, size=max(counts.nbytes, 1))
+        target = shared_memory.SharedMemory(create=True, size=max(heatmap_nbytes, 1))
+        try:
+            np.ndarray(counts.shape, counts.dtype, buffer=source.buf)[...] = counts
+            future = self._executor.submit(
+                _filter_shared,
+                source.name,
+                target.name,
+                counts.shape,
+                counts.dtype.str,
+                self._engine,
+                sigma,
+            )
+            future.result()
+            return np.ndarray(counts.shape, HEATMAP_DTYPE, buffer=target.buf).copy()
+        finally:
+            for block in (source, target):
+                block.close()
+                block.unlink()
+
+    # %% shutdown
+    def shutdown(self, wait: bool = False):
+        """
+        Shut down the worker processes.
+
+        Arguments
+        ---------
+        wait: bool
+            Wait for running filters to finish. Defaults to False.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% _filter_shared
+def _filter_shared(
+    source_name: str,
+    target_name: str,
+    shape: tuple[int, int],
+    dtype: str,
+    engine: str,
+    sigma: float,
+):
+    """
+    Filter a count grid from shared memory into shared memory, in a worker process.
+
+    Arguments
+    ---------
+    source_name: str
+        Name of the shared memory block holding the count grid.
+    target_name: str
+        Name of the shared memory block receiving the heatmap.
+    shape: tuple[int, int]
+        Count grid shape.
+    dtype: str
+        Count grid data type.
+    engine: str
+        Filter engine name, or "auto".
+    sigma: float
+        Standard deviation of the Gaussian filter in bins.
+    """
+    source = shared_memory.SharedMemory(name=source_name)
+    target = shared_memory.SharedMemory(name=target_name)
+    try:
+        counts = np.ndarray(shape, dtype, buffer=source.buf)
+        heatmap = np.ndarray(shape, HEATMAP_DTYPE, buffer=target.buf)
+        heatmap[...] = hfilterengine.filter_counts(counts, engine, sigma)
+        # Release the buffer views before closing the blocks
+        del counts, heatmap
+    finally:
+        source.close()
+        target.close()
@@ -0,0 +1,249 @@
+"""
+The heatmap cache class used by Heat Mouse to reuse filtered heatmaps.
+
+Classes
+-------
+HeatmapCache
+    Memory-bounded LRU cache of filtered heatmap arrays.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import collections
+import threading
+
+import numpy as np
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% DEFAULT_MAX_BYTES
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% HeatmapCache
+class HeatmapCache:
+    """
+    Memory-bounded LRU cache of filtered heatmap arrays.
+
+    Heatmaps are keyed by (Application, Filter-Factor, Bin-Size, Data-Version), so a
+    heatmap is only reused while the click data it was filtered from is unchanged.
+    When the stored arrays exceed `max_bytes`, the least recently used heatmaps are
+    evicted. The cache may be used from several threads.
+
+    Other objects with an `nbytes` size may be cached too, such as count pyramids.
+    They are not made read-only, and their size is taken when they are put, so an
+    object that grew is put again to update it.
+
+    Properties
+    ----------
+    evictions : int
+        Get the number of evicted heatmaps.
+    hits : int
+        Get the number of cache hits.
+    max_bytes : int
+        Get or set the memory limit of the cache in bytes.
+    misses : int
+        Get the number of cache misses.
+    nbytes : int
+        Get the memory used by the cached heatmaps in bytes.
+
+    Methods
+    -------
+    clear
+        Remove every heatmap from the cache.
+    get
+        Get a cached heatmap.
+    put
+        Add a heatmap to the cache.
+    stats
+        Get the cache statistics.
+
+    Protected Methods
+    -----------------
+    _evict
+        Evict the least recently used heatmaps until the cache fits its limit.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self._entries: collections.OrderedDict[tuple : np.ndarray] = (
+            collections.OrderedDict()
+        )
+        self._sizes: dict[tuple:int] = {}
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self._nbytes = 0
+        self._evictions = 0
+        self._hits = 0
+        self._misses = 0
+
+    # %% __contains__
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._entries
+
+    # %% __len__
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% evictions
+    @property
+    def evictions(self) -> int:
+        """
+        Get the number of evicted heatmaps.
+
+        Returns
+        -------
+        int
+            Number of evictions.
+        """
+        return self._evictions
+
+    # %% hits
+    @property
+    def hits(self) -> int:
+        """
+        Get the number of cache hits.
+
+        Returns
+        -------
+        int
+            Number of hits.
+        """
+        return self._hits
+
+    # %% max_bytes
+    @property
+    def max_bytes(self) -> int:
+        """
+        Get or set the memory limit of the cache in bytes.
+
+        Returns
+        -------
+        int
+            Memory limit in bytes.
+        """
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    # %% misses
+    @property
+    def misses(self) -> int:
+        """
+        Get the number of cache misses.
+
+        Returns
+        -------
+        int
+            Number of misses.
+        """
+        return self._misses
+
+    # %% nbytes
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the memory used by the cached heatmaps in bytes.
+
+        Returns
+        -------
+        int
+            Memory used in bytes.
+        """
+        return self._nbytes
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% clear
+    def clear(self):
+        """Remove every heatmap from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+
+    # %% get
+    def get(self, key: tuple) -> np.ndarray:
+        """
+        Get a cached heatmap.
+
+        Arguments
+        ---------
+        key: tuple
+            Key stored as (Application, Filter-Factor, Bin-Size, Data-Version).
+
+        Returns
+        -------
+        np.ndarray
+            The read-only heatmap, or None on a cache miss.
+        """
+        with self._lock:
+            heatmap = self._entries.get(key)
+            if heatmap is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return heatmap
+
+    # %% put
+    def put(self, key: tuple, heatmap: np.ndarray):
+        """
+        Add a heatmap to the cache.
+
+        The heatmap is marked read-only, so it must not be modified afterwards. A
+        heatmap larger than the whole cache is not stored, and any older heatmap of
+        the key is removed.
+
+        Arguments
+        ---------
+        key: tuple
+            Key stored as (Application, Filter-Factor, Bin-Size, Data-Version).
+        heatmap: np.ndarray
+            Filtered heatmap.
+        """
+        nbytes = heatmap.nbytes
+        if isinstance(heatmap, np.ndarray):
+            heatmap.flags.writeable = False
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+                self._nbytes -= self._sizes.pop(key)
+            if nbytes > self._max_bytes:
+                return
+            self._entries[key] = heatmap
+            self._sizes[key] = nbytes
+            self._nbytes += nbytes
+            self._evict()
+
+    # %% stats
+    def stats(self) -> dict[str:int]:
+        """
+        Get the cache statistics.
+
+        Returns
+        -------
+        dict[str: int]
+            Statistics stored as {Name: Value}.
+        """
+        return {
+            "entries": len(self._entries),
+            "nbytes": self._nbytes,
+            "max_bytes": self._max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _evict
+    def _evict(self):
+        """Evict the least recently used heatmaps until the cache fits its limit."""
+        while self._nbytes > self._max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            self._nbytes -= self._sizes.pop(key)
+            self._evictions += 1
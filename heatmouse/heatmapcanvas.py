@@ -0,0 +1,581 @@
+"""
+The heatmap canvas widget used by Heat Mouse to paint filtered heatmaps.
+
+Classes
+-------
+HeatmapCanvas
+    Widget that paints a filtered heatmap through a colormap lookup table.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import numpy as np
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% COLORMAP_SIZE
+COLORMAP_SIZE = 256
+# %% MAX_ZOOM
+MAX_ZOOM = 64
+# %% SIZE_HINT
+SIZE_HINT = (640, 480)
+# %% ZOOM_STEP
+ZOOM_STEP = 1.25
+# %% VIRIDIS
+# The 256 RGB colors of the matplotlib viridis colormap, as 8-bit hex triplets
+VIRIDIS = bytes.fromhex(
+    "44015444025544035745055845065a45085b46095c460b5e460c5f460e61470f62471163"
+    "47126547146647156747166947186a48196b481a6c481c6e481d6f481e70482071482172"
+    "482273482374472575472676472777472878472a79472b7a472c7b462d7c462f7c46307d"
+    "46317e45327f45347f453580453681443781443982433a83433b83433c84423d84423e85"
+    "4240854141864142864043874044873f45873f47883e48883e49893d4a893d4b893d4c89"
+    "3c4d8a3c4e8a3b508a3b518a3a528b3a538b39548b39558b38568b38578c37588c37598c"
+    "365a8c365b8c355c8c355d8c345e8d345f8d33608d33618d32628d32638d31648d31658d"
+    "31668d30678d30688d2f698d2f6a8d2e6b8e2e6c8e2e6d8e2d6e8e2d6f8e2c708e2c718e"
+    "2c728e2b738e2b748e2a758e2a768e2a778e29788e29798e287a8e287a8e287b8e277c8e"
+    "277d8e277e8e267f8e26808e26818e25828e25838d24848d24858d24868d23878d23888d"
+    "23898d22898d228a8d228b8d218c8d218d8c218e8c208f8c20908c20918c1f928c1f938b"
+    "1f948b1f958b1f968b1e978a1e988a1e998a1e998a1e9a891e9b891e9c891e9d881e9e88"
+    "1e9f881ea0871fa1871fa2861fa38620a48520a58521a68521a78422a78423a88323a982"
+    "24aa8225ab8126ac8127ad8028ae7f29af7f2ab07e2bb17d2cb17d2eb27c2fb37b30b47a"
+    "32b57a33b67935b77836b87738b97639b9763bba753dbb743ebc7340bd7242be7144be70"
+    "45bf6f47c06e49c16d4bc26c4dc26b4fc36951c46853c56755c66657c66559c7645bc862"
+    "5ec96160c96062ca5f64cb5d67cc5c69cc5b6bcd596dce5870ce5672cf5574d05477d052"
+    "79d1517cd24f7ed24e81d34c83d34b86d44988d5478bd5468dd64490d64392d74195d73f"
+    "97d83e9ad83c9dd93a9fd938a2da37a5da35a7db33aadb32addc30afdc2eb2dd2cb5dd2b"
+    "b7dd29bade27bdde26bfdf24c2df22c5df21c7e01fcae01ecde01dcfe11cd2e11bd4e11a"
+    "d7e219dae218dce218dfe318e1e318e4e318e7e419e9e419ece41aeee51bf1e51cf3e51e"
+    "f6e61ff8e621fae622fde724"
+)
+# %% VIRIDIS_LUT
+VIRIDIS_LUT = np.frombuffer(VIRIDIS, dtype=np.uint8).reshape(COLORMAP_SIZE, 3)
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% HeatmapCanvas
+class HeatmapCanvas(QtWidgets.QWidget):
+    """
+    Widget that paints a filtered heatmap through a colormap lookup table.
+
+    Heatmap values are scaled linearly between the minimum and maximum of the last
+    full heatmap, like `imshow` does, and mapped through a 256-entry lookup table of
+    32-bit pixels into one reused image buffer. The buffer is painted with `QPainter`,
+    keeping the aspect ratio of the heatmap. Partial updates remap only the changed
+    region and keep the color scale.
+
+    The canvas works in screen pixels. The mouse wheel zooms the view around the
+    cursor, dragging pans it and a double click resets it. While zoomed, finer tiles
+    set with `set_tile` are painted over the full heatmap. Their values are rescaled
+    to the bin area of the full heatmap, so both share one color scale.
+
+    Properties
+    ----------
+    image : QtGui.QImage
+        Get the image painted on the canvas.
+    levels : tuple[float, float]
+        Get the heatmap values mapped to the first and last color.
+    view : QtCore.QRectF
+        Get the shown region of the heatmap in screen pixels.
+    zoom : float
+        Get the zoom factor of the view.
+
+    Methods
+    -------
+    clear_tiles
+        Remove tiles from the canvas.
+    mouseDoubleClickEvent
+        Override mouseDoubleClickEvent to reset the view.
+    mouseMoveEvent
+        Override mouseMoveEvent to pan the view.
+    mousePressEvent
+        Override mousePressEvent to start panning the view.
+    mouseReleaseEvent
+        Override mouseReleaseEvent to stop panning the view.
+    paintEvent
+        Override paintEvent to paint the heatmap image and tiles.
+    reset_view
+        Show the whole heatmap.
+    resizeEvent
+        Override resizeEvent to emit the resized signal.
+    set_heatmap
+        Show a full heatmap and rescale the colors to its range.
+    set_tile
+        Show a finer heatmap tile over the full heatmap.
+    sizeHint
+        Override sizeHint to give the canvas a default size.
+    update_region
+        Remap a changed region of the shown heatmap.
+    wheelEvent
+        Override wheelEvent to zoom the view around the cursor.
+
+    Protected Methods
+    -----------------
+    _map
+        Map heatmap values to pixels through the lookup table.
+    _set_view
+        Move the view inside the heatmap and repaint.
+    _target_rect
+        Get the widget rectangle the view is painted in.
+    _to_screen
+        Map a widget position to screen pixels.
+    _to_widget
+        Map a rectangle in screen pixels to the widget.
+    """
+
+    resized = QtCore.pyqtSignal()
+    view_changed = QtCore.pyqtSignal()
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, parent: QtWidgets.QWidget = None, lut: np.ndarray = VIRIDIS_LUT):
+        super().__init__(parent)
+        lut = np.asarray(lut, dtype=np.uint32)
+        self._lut = 0xFF000000 | (lut[:, 0] << 16) | (lut[:, 1] << 8) | lut[:, 2]
+        self._bin_size = 1
+        self._buffer: np.ndarray = None
+        self._drag: tuple[QtCore.QPoint, QtCore.QRectF] = None
+        self._extent = QtCore.QRectF()
+        self._image: QtGui.QImage = None
+        self._index: np.ndarray = None
+        self._levels: tuple[float, float] = (0.0, 1.0)
+        self._scratch: np.ndarray = None
+        self._tiles: dict[tuple : tuple[QtCore.QRectF, np.ndarray, QtGui.QImage]] = {}
+        self._view: QtCore.QRectF = None
+        self.setAttribute(QtCore.Qt.WA_OpaquePaintEvent, True)
+        self.setSizePolicy(
+            QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding
+        )
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% image
+    @property
+    def image(self) -> QtGui.QImage:
+        """
+        Get the image painted on the canvas.
+
+        Returns
+        -------
+        QtGui.QImage
+            Heatmap image sharing the image buffer, or None if no heatmap is shown.
+        """
+        return self._image
+
+    # %% levels
+    @property
+    def levels(self) -> tuple[float, float]:
+        """
+        Get the heatmap values mapped to the first and last color.
+
+        Returns
+        -------
+        tuple[float, float]
+            Color scale stored as (Minimum, Maximum).
+        """
+        return self._levels
+
+    # %% view
+    @property
+    def view(self) -> QtCore.QRectF:
+        """
+        Get the shown region of the heatmap in screen pixels.
+
+        Returns
+        -------
+        QtCore.QRectF
+            Shown region, which is the whole heatmap unless zoomed.
+        """
+        return QtCore.QRectF(self._extent if self._view is None else self._view)
+
+    # %% zoom
+    @property
+    def zoom(self) -> float:
+        """
+        Get the zoom factor of the view.
+
+        Returns
+        -------
+        float
+            Heatmap width divided by view width, one when not zoomed.
+        """
+        if self._view is None:
+            return 1.0
+        return self._extent.width() / self._view.width()
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% clear_tiles
+    def clear_tiles(self, keep: set = None):
+        """
+        Remove tiles from the canvas.
+
+        Arguments
+        ---------
+        keep: set
+            Keys of the tiles to keep, or None to remove every tile. Defaults to None.
+        """
+        keep = set() if keep is None else keep
+        for key in [key for key in self._tiles if key not in keep]:
+            del self._tiles[key]
+        self.update()
+
+    # %% mouseDoubleClickEvent
+    def mouseDoubleClickEvent(self, event: QtGui.QMouseEvent):
+        """
+        Override mouseDoubleClickEvent to reset the view.
+
+        Arguments
+        ---------
+        event: QtGui.QMouseEvent
+            The mouse event.
+        """
+        self.reset_view()
+
+    # %% mouseMoveEvent
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent):
+        """
+        Override mouseMoveEvent to pan the view.
+
+        Arguments
+        ---------
+        event: QtGui.QMouseEvent
+            The mouse event.
+        """
+        if self._drag is None:
+            return
+        start, view = self._drag
+        scale = view.width() / self._target_rect().width()
+        delta = event.pos() - start
+        self._set_view(view.translated(-delta.x() * scale, -delta.y() * scale))
+
+    # %% mousePressEvent
+    def mousePressEvent(self, event: QtGui.QMouseEvent):
+        """
+        Override mousePressEvent to start panning the view.
+
+        Arguments
+        ---------
+        event: QtGui.QMouseEvent
+            The mouse event.
+        """
+        if (event.button() == QtCore.Qt.LeftButton) and (self._view is not None):
+            self._drag = (event.pos(), self.view)
+
+    # %% mouseReleaseEvent
+    def mouseReleaseEvent(self, event: QtGui.QMouseEvent):
+        """
+        Override mouseReleaseEvent to stop panning the view.
+
+        Arguments
+        ---------
+        event: QtGui.QMouseEvent
+            The mouse event.
+        """
+        self._drag = None
+
+    # %% paintEvent
+    def paintEvent(self, event: QtGui.QPaintEvent):
+        """
+        Override paintEvent to paint the heatmap image and tiles.
+
+        Arguments
+        ---------
+        event: QtGui.QPaintEvent
+            The widget paint event.
+        """
+        painter = QtGui.QPainter(self)
+        painter.fillRect(event.rect(), QtCore.Qt.white)
+        if self._image is not None:
+            target = self._target_rect()
+            view = self.view
+            source = QtCore.QRectF(
+                view.x() / self._bin_size,
+                view.y() / self._bin_size,
+                view.width() / self._bin_size,
+                view.height() / self._bin_size,
+            )
+            painter.setClipRect(target)
+            painter.drawImage(target, self._image, source)
+            for rect, _, image in self._tiles.values():
+                painter.drawImage(self._to_widget(rect), image)
+        painter.end()
+
+    # %% reset_view
+    def reset_view(self):
+        """Show the whole heatmap."""
+        self._set_view(QtCore.QRectF(self._extent))
+
+    # %% resizeEvent
+    def resizeEvent(self, event: QtGui.QResizeEvent):
+        """
+        Override resizeEvent to emit the resized signal.
+
+        Arguments
+        ---------
+        event: QtGui.QResizeEvent
+            The widget resize event.
+        """
+        super().resizeEvent(event)
+        self.resized.emit()
+
+    # %% set_heatmap
+    def set_heatmap(self, heatmap: np.ndarray, bin_size: int = 1):
+        """
+        Show a full heatmap and rescale the colors to its range.
+
+        Arguments
+        ---------
+        heatmap: np.ndarray
+            Filtered heatmap.
+        bin_size: int
+            Width and height of a heatmap bin in screen pixels. Defaults to 1.
+        """
+        rows, cols = heatmap.shape
+        if (self._buffer is None) or (self._buffer.shape != heatmap.shape):
+            self._buffer = np.empty((rows, cols), dtype=np.uint32)
+            self._index = np.empty((rows, cols), dtype=np.uint8)
+            self._scratch = np.empty((rows, cols), dtype=float)
+            self._image = QtGui.QImage(
+                self._buffer.data, cols, rows, 4 * cols, QtGui.QImage.Format_RGB32
+            )
+        self._bin_size = bin_size
+        self._extent = QtCore.QRectF(0, 0, cols * bin_size, rows * bin_size)
+        if self._view is not None:
+            self._set_view(self._view)
+        self._levels = (float(heatmap.min()), float(heatmap.max()))
+        self._map(heatmap, self._buffer, 1.0, self._scratch, self._index)
+        self.update()
+
+    # %% set_tile
+    def set_tile(
+        self, key: tuple, tile: np.ndarray, left: int, top: int, bin_size: int
+    ):
+        """
+        Show a finer heatmap tile over the full heatmap.
+
+        Arguments
+        ---------
+        key: tuple
+            Tile key, replacing the tile shown under the same key.
+        tile: np.ndarray
+            Filtered heatmap tile.
+        left: int
+            Left edge of the tile in screen pixels.
+        top: int
+            Top edge of the tile in screen pixels.
+        bin_size: int
+            Width and height of a tile bin in screen pixels.
+        """
+        rows, cols = tile.shape
+        buffer = np.empty((rows, cols), dtype=np.uint32)
+        # Rescale to the bin area of the full heatmap to share its color scale
+        self._map(tile, buffer, (self._bin_size / bin_size) ** 2)
+        image = QtGui.QImage(
+            buffer.data, cols, rows, 4 * cols, QtGui.QImage.Format_RGB32
+        )
+        rect = QtCore.QRectF(left, top, cols * bin_size, rows * bin_size)
+        self._tiles[key] = (rect, buffer, image)
+        self.update(self._to_widget(rect).toAlignedRect())
+
+    # %% sizeHint
+    def sizeHint(self) -> QtCore.QSize:
+        """
+        Override sizeHint to give the canvas a default size.
+
+        Returns
+        -------
+        QtCore.QSize
+            Preferred canvas size.
+        """
+        return QtCore.QSize(*SIZE_HINT)
+
+    # %% update_region
+    def update_region(self, heatmap: np.ndarray, rows: slice, cols: slice):
+        """
+        Remap a changed region of the shown heatmap.
+
+        Arguments
+        ---------
+        heatmap: np.ndarray
+            Filtered heatmap with the shape of the shown heatmap.
+        rows: slice
+            Changed rows.
+        cols: slice
+            Changed columns.
+        """
+        if (self._buffer is None) or (self._buffer.shape != heatmap.shape):
+            self.set_heatmap(heatmap, self._bin_size)
+            return
+        self._map(
+            heatmap[rows, cols],
+            self._buffer[rows, cols],
+            1.0,
+            self._scratch[rows, cols],
+            self._index[rows, cols],
+        )
+        row0, row1, _ = rows.indices(heatmap.shape[0])
+        col0, col1, _ = cols.indices(heatmap.shape[1])
+        region = QtCore.QRectF(
+            col0 * self._bin_size,
+            row0 * self._bin_size,
+            (col1 - col0) * self._bin_size,
+            (row1 - row0) * self._bin_size,
+        )
+        self.update(self._to_widget(region).toAlignedRect().adjusted(-1, -1, 1, 1))
+
+    # %% wheelEvent
+    def wheelEvent(self, event: QtGui.QWheelEvent):
+        """
+        Override wheelEvent to zoom the view around the cursor.
+
+        Arguments
+        ---------
+        event: QtGui.QWheelEvent
+            The mouse wheel event.
+        """
+        steps = event.angleDelta().y() / 120
+        if (steps == 0) or (self._image is None):
+            return
+        view = self.view
+        width = view.width() / ZOOM_STEP**steps
+        width = min(max(width, self._extent.width() / MAX_ZOOM), self._extent.width())
+        scale = width / view.width()
+        anchor = self._to_screen(event.pos())
+        self._set_view(
+            QtCore.QRectF(
+                anchor.x() - (anchor.x() - view.x()) * scale,
+                anchor.y() - (anchor.y() - view.y()) * scale,
+                width,
+                view.height() * scale,
+            )
+        )
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _map
+    def _map(
+        self,
+        values: np.ndarray,
+        out: np.ndarray,
+        scale: float = 1.0,
+        scratch: np.ndarray = None,
+        index: np.ndarray = None,
+    ):
+        """
+        Map heatmap values to pixels through the lookup table.
+
+        Arguments
+        ---------
+        values: np.ndarray
+            Heatmap values.
+        out: np.ndarray
+            Pixel buffer with the shape of `values`.
+        scale: float
+            Factor applied to the values before the color scale. Defaults to 1.
+        scratch: np.ndarray
+            Reused float buffer, or None to allocate one. Defaults to None.
+        index: np.ndarray
+            Reused lookup index buffer, or None to allocate one. Defaults to None.
+        """
+        if scratch is None:
+            scratch = np.empty(values.shape, dtype=float)
+            index = np.empty(values.shape, dtype=np.uint8)
+        minimum, maximum = self._levels
+        factor = COLORMAP_SIZE / (maximum - minimum) if maximum > minimum else 0.0
+        np.subtract(values, minimum / scale, out=scratch)
+        np.multiply(scratch, factor * scale, out=scratch)
+        np.clip(scratch, 0, COLORMAP_SIZE - 1, out=scratch)
+        np.copyto(index, scratch, casting="unsafe")
+        np.take(self._lut, index, out=out, mode="clip")
+
+    # %% _set_view
+    def _set_view(self, view: QtCore.QRectF):
+        """
+        Move the view inside the heatmap and repaint.
+
+        Arguments
+        ---------
+        view: QtCore.QRectF
+            Requested view in screen pixels.
+        """
+        if view.width() >= self._extent.width():
+            view = None
+        else:
+            view = QtCore.QRectF(view)
+            view.moveLeft(min(max(view.x(), 0), self._extent.width() - view.width()))
+            view.moveTop(min(max(view.y(), 0), self._extent.height() - view.height()))
+        if view == self._view:
+            return
+        self._view = view
+        self.update()
+        self.view_changed.emit()
+
+    # %% _target_rect
+    def _target_rect(self) -> QtCore.QRectF:
+        """
+        Get the widget rectangle the view is painted in.
+
+        The view is scaled to fit the widget and centred, keeping its aspect ratio.
+
+        Returns
+        -------
+        QtCore.QRectF
+            Target rectangle in widget coordinates.
+        """
+        view = self.view
+        if view.isEmpty():
+            return QtCore.QRectF(self.rect())
+        width, height = self.width(), self.height()
+        scale = min(width / view.width(), height / view.height())
+        target_width = view.width() * scale
+        target_height = view.height() * scale
+        return QtCore.QRectF(
+            (width - target_width) / 2,
+            (height - target_height) / 2,
+            target_width,
+            target_height,
+        )
+
+    # %% _to_screen
+    def _to_screen(self, position: QtCore.QPoint) -> QtCore.QPointF:
+        """
+        Map a widget position to screen pixels.
+
+        Arguments
+        ---------
+        position: QtCore.QPoint
+            Position in widget coordinates.
+
+        Returns
+        -------
+        QtCore.QPointF
+            Position in screen pixels.
+        """
+        target = self._target_rect()
+        view = self.view
+        scale = view.width() / target.width()
+        return QtCore.QPointF(
+            view.x() + (position.x() - target.x()) * scale,
+            view.y() + (position.y() - target.y()) * scale,
+        )
+
+    # %% _to_widget
+    def _to_widget(self, rect: QtCore.QRectF) -> QtCore.QRectF:
+        """
+        Map a rectangle in screen pixels to the widget.
+
+        Arguments
+        ---------
+        rect: QtCore.QRectF
+            Rectangle in screen pixels.
+
+        Returns
+        -------
+        QtCore.QRectF
+            Rectangle in widget coordinates.
+        """
+        target = self._target_rect()
+        view = self.view
+        scale = target.width() / view.width()
+        return QtCore.QRectF(
+            target.x() + (rect.x() - view.x()) * scale,
+            target.y() + (rect.y() - view.y()) * scale,
+            rect.width() * scale,
+            rect.height() * scale,
+        )
@@ -0,0 +1,679 @@
+"""
+The histogram classes used by Heat Mouse to keep running click counts.
+
+Classes
+-------
+CountGrid
+    Integer click count grid of an application, updated one click at a time.
+CountPyramid
+    Full-resolution click count grid of an application, with coarser grids on demand.
+
+Functions
+---------
+bin_clicks
+    Get the flat indices of clicks into a stacked count grid.
+stack_shape
+    Get the shape of a stacked count grid.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import collections
+import threading
+
+import numpy as np
+
+import heatmouse.clickarray as hclickarray
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% ALL_LAYER
+ALL_LAYER = 0
+# %% COUNT_DTYPE
+COUNT_DTYPE = np.int32
+# %% LAYERS
+LAYERS = ("AllClicks", *hclickarray.BUTTONS)
+# %% MAX_DERIVED
+MAX_DERIVED = 4
+# %% SPARSE_ADD_RATIO
+SPARSE_ADD_RATIO = 64
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% CountGrid
+class CountGrid:
+    """
+    Integer click count grid of an application, updated one click at a time.
+
+    Clicks are binned with uniform integer bins of `bin_size` screen pixels, so a
+    click at (x, y) falls in row `y // bin_size` and column `x // bin_size`. Clicks
+    outside of the screen are ignored.
+
+    The grid is a stack with one layer per entry of `LAYERS`: the first layer counts
+    every click and the others count the clicks of one button each.
+
+    Properties
+    ----------
+    bin_size : int
+        Get the width and height of a bin in screen pixels.
+    counts : np.ndarray
+        Get the click count grid of all buttons.
+    layers : np.ndarray
+        Get the stacked click count grids of all layers.
+    shape : tuple[int, int]
+        Get the grid shape stored as (Rows, Columns).
+    total : int
+        Get the number of clicks in the grid.
+
+    Methods
+    -------
+    add
+        Add a click to the grid.
+    add_many
+        Add several clicks to the grid.
+    from_clicks
+        Create a count grid from click data.
+    from_sparse
+        Create a count grid from the non-empty bins of its button layers.
+    to_sparse
+        Get the non-empty bins of the button layers.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, screensize: tuple[int, int], bin_size: int = 1):
+        self._bin_size = int(bin_size)
+        self._shape = stack_shape(screensize, self._bin_size)[1:]
+        self._counts = np.zeros((len(LAYERS), *self._shape), dtype=COUNT_DTYPE)
+        self._total = 0
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% bin_size
+    @property
+    def bin_size(self) -> int:
+        """
+        Get the width and height of a bin in screen pixels.
+
+        Returns
+        -------
+        int
+            Bin size.
+        """
+        return self._bin_size
+
+    # %% counts
+    @property
+    def counts(self) -> np.ndarray:
+        """
+        Get the click count grid of all buttons.
+
+        Returns
+        -------
+        np.ndarray
+            Count grid with one row per Y-bin and one column per X-bin.
+        """
+        return self._counts[ALL_LAYER]
+
+    # %% layers
+    @property
+    def layers(self) -> np.ndarray:
+        """
+        Get the stacked click count grids of all layers.
+
+        Returns
+        -------
+        np.ndarray
+            Count grids stored as (Layer, Row, Column), in the order of `LAYERS`.
+        """
+        return self._counts
+
+    # %% shape
+    @property
+    def shape(self) -> tuple[int, int]:
+        """
+        Get the grid shape stored as (Rows, Columns).
+
+        Returns
+        -------
+        tuple[int, int]
+            Grid shape.
+        """
+        return self._shape
+
+    # %% total
+    @property
+    def total(self) -> int:
+        """
+        Get the number of clicks in the grid.
+
+        Returns
+        -------
+        int
+            Number of clicks.
+        """
+        return self._total
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% add
+    def add(self, x: int, y: int, button: int = hclickarray.OTHER_CODE):
+        """
+        Add a click to the grid.
+
+        Arguments
+        ---------
+        x: int
+            The X-position on the screen.
+        y: int
+            The Y-position on the screen.
+        button: int
+            Button code of the click. Defaults to the "OtherClick" code.
+        """
+        row = y // self._bin_size
+        col = x // self._bin_size
+        if (0 <= row < self._shape[0]) and (0 <= col < self._shape[1]):
+            self._counts[(ALL_LAYER, button + 1), row, col] += 1
+            self._total += 1
+
+    # %% add_many
+    def add_many(self, x: np.ndarray, y: np.ndarray, buttons: np.ndarray = None):
+        """
+        Add several clicks to the grid.
+
+        All button layers are counted in one pass, and the first layer is their sum.
+        Fewer than one click per `SPARSE_ADD_RATIO` bins are added to their bins one
+        by one instead, so small batches cost no pass over the grid.
+
+        Arguments
+        ---------
+        x: np.ndarray
+            The X-positions on the screen.
+        y: np.ndarray
+            The Y-positions on the screen.
+        buttons: np.ndarray
+            Button codes of the clicks, or None to count them as "OtherClick".
+            Defaults to None.
+        """
+        rows = np.asarray(y) // self._bin_size
+        cols = np.asarray(x) // self._bin_size
+        if buttons is None:
+            buttons = np.full(rows.shape, hclickarray.OTHER_CODE)
+        inside = (rows >= 0) & (rows < self._shape[0])
+        inside &= (cols >= 0) & (cols < self._shape[1])
+        flat = np.asarray(buttons)[inside].astype(np.intp) * self._shape[0]
+        flat += rows[inside]
+        flat *= self._shape[1]
+        flat += cols[inside]
+        plane = self._shape[0] * self._shape[1]
+        size = len(hclickarray.BUTTONS) * plane
+        if len(flat) * SPARSE_ADD_RATIO < size:
+            # Few clicks, so only touch their bins instead of the whole stack
+            np.add.at(self._counts.reshape(-1), flat + plane, 1)
+            np.add.at(self._counts[ALL_LAYER].reshape(-1), flat % plane, 1)
+        else:
+            counts = np.bincount(flat, minlength=size).reshape(-1, *self._shape)
+            self._counts[1:] += counts.astype(COUNT_DTYPE, copy=False)
+            self._counts[ALL_LAYER] = self._counts[1:].sum(axis=0, dtype=COUNT_DTYPE)
+        self._total += len(flat)
+
+    # %% from_clicks
+    @classmethod
+    def from_clicks(
+        cls,
+        x: np.ndarray,
+        y: np.ndarray,
+        screensize: tuple[int, int],
+        bin_size: int = 1,
+        buttons: np.ndarray = None,
+    ) -> "CountGrid":
+        """
+        Create a count grid from click data.
+
+        Arguments
+        ---------
+        x: np.ndarray
+            The X-positions on the screen.
+        y: np.ndarray
+            The Y-positions on the screen.
+        screensize: tuple[int, int]
+            Screensize tuple stored as (X, Y).
+        bin_size: int
+            Width and height of a bin in screen pixels. Defaults to 1.
+        buttons: np.ndarray
+            Button codes of the clicks, or None to count them as "OtherClick".
+            Defaults to None.
+
+        Returns
+        -------
+        CountGrid
+            The new count grid.
+        """
+        grid = cls(screensize, bin_size)
+        grid.add_many(x, y, buttons)
+        return grid
+
+    # %% from_sparse
+    @classmethod
+    def from_sparse(
+        cls,
+        index: np.ndarray,
+        counts: np.ndarray,
+        screensize: tuple[int, int],
+        bin_size: int = 1,
+    ) -> "CountGrid":
+        """
+        Create a count grid from the non-empty bins of its button layers.
+
+        This is the inverse of `to_sparse`. The layer of all clicks is rebuilt as the
+        sum of the button layers.
+
+        Arguments
+        ---------
+        index: np.ndarray
+            Flat indices of the bins into a grid of `stack_shape(screensize,
+            bin_size)`, all outside of the layer of all clicks.
+        counts: np.ndarray
+            Click count of each bin.
+        screensize: tuple[int, int]
+            Screensize tuple stored as (X, Y).
+        bin_size: int
+            Width and height of a bin in screen pixels. Defaults to 1.
+
+        Returns
+        -------
+        CountGrid
+            The new count grid.
+        """
+        grid = cls(screensize, bin_size)
+        grid._counts.reshape(-1)[index] = counts
+        grid._counts[ALL_LAYER] = grid._counts[1:].sum(axis=0, dtype=COUNT_DTYPE)
+        grid._total = int(np.sum(counts))
+        return grid
+
+    # %% to_sparse
+    def to_sparse(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the non-empty bins of the button layers.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            Sorted flat indices into `layers` and the click count of each bin, stored
+            as (Index, Counts).
+        """
+        size = self._shape[0] * self._shape[1]
+        index = np.flatnonzero(self._counts.reshape(-1)[size:]) + size
+        return index, self._counts.reshape(-1)[index]
+
+
+# %% CountPyramid
+class CountPyramid:
+    """
+    Full-resolution click count grid of an application, with coarser grids on demand.
+
+    The base grid has one bin per screen pixel. A grid for any bin size is derived by
+    block-summing a finer grid, never by re-binning raw clicks. Power-of-two levels
+    are built lazily from each other and kept. Other bin sizes are derived from the
+    coarsest kept grid whose bin size divides them, and the last `MAX_DERIVED` of
+    them are kept. Every kept grid is updated on each added click. Grids are stacked
+    per layer like the `CountGrid` layers, so all layers are derived in one pass.
+    Grids are added and derived under a lock, so worker threads may copy them while
+    clicks are added.
+
+    Properties
+    ----------
+    base : CountGrid
+        Get the full-resolution count grid.
+    nbytes : int
+        Get the memory used by the kept grids in bytes.
+    total : int
+        Get the number of clicks in the pyramid.
+
+    Methods
+    -------
+    add
+        Add a click to every kept grid.
+    add_many
+        Add several clicks to every kept grid.
+    copy_layers
+        Get a copy of the stacked click count grids of all layers for a bin size.
+    counts
+        Get the click count grid of all buttons for a bin size.
+    from_clicks
+        Create a count pyramid from click data.
+    from_grid
+        Create a count pyramid on top of a full-resolution count grid.
+    layers
+        Get the stacked click count grids of all layers for a bin size.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, screensize: tuple[int, int]):
+        self._base = CountGrid(screensize, 1)
+        self._levels: dict[int : np.ndarray] = {}
+        self._derived: collections.OrderedDict[int : np.ndarray] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.RLock()
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% base
+    @property
+    def base(self) -> CountGrid:
+        """
+        Get the full-resolution count grid.
+
+        Returns
+        -------
+        CountGrid
+            Count grid with a bin size of one pixel.
+        """
+        return self._base
+
+    # %% nbytes
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the memory used by the kept grids in bytes.
+
+        Returns
+        -------
+        int
+            Memory used in bytes.
+        """
+        with self._lock:
+            grids = [*self._levels.values(), *self._derived.values()]
+        return self._base.layers.nbytes + sum(grid.nbytes for grid in grids)
+
+    # %% total
+    @property
+    def total(self) -> int:
+        """
+        Get the number of clicks in the pyramid.
+
+        Returns
+        -------
+        int
+            Number of clicks.
+        """
+        return self._base.total
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% add
+    def add(self, x: int, y: int, button: int = hclickarray.OTHER_CODE):
+        """
+        Add a click to every kept grid.
+
+        Arguments
+        ---------
+        x: int
+            The X-position on the screen.
+        y: int
+            The Y-position on the screen.
+        button: int
+            Button code of the click. Defaults to the "OtherClick" code.
+        """
+        with self._lock:
+            total = self._base.total
+            self._base.add(x, y, button)
+            if self._base.total == total:
+                return
+            for grids in (self._levels, self._derived):
+                for bin_size, counts in grids.items():
+                    counts[(ALL_LAYER, button + 1), y // bin_size, x // bin_size] += 1
+
+    # %% add_many
+    def add_many(self, x: np.ndarray, y: np.ndarray, buttons: np.ndarray = None):
+        """
+        Add several clicks to every kept grid.
+
+        Arguments
+        ---------
+        x: np.ndarray
+            The X-positions on the screen.
+        y: np.ndarray
+            The Y-positions on the screen.
+        buttons: np.ndarray
+            Button codes of the clicks, or None to count them as "OtherClick".
+            Defaults to None.
+        """
+        if buttons is None:
+            buttons = np.full(np.shape(x), hclickarray.OTHER_CODE)
+        with self._lock:
+            total = self._base.total
+            self._base.add_many(x, y, buttons)
+            if self._base.total == total:
+                return
+            screensize = (self._base.shape[1], self._base.shape[0])
+            for grids in (self._levels, self._derived):
+                for bin_size, counts in grids.items():
+                    index = bin_clicks(x, y, buttons, screensize, bin_size)
+                    np.add.at(counts.reshape(-1), index, 1)
+
+    # %% copy_layers
+    def copy_layers(self, bin_size: int) -> np.ndarray:
+        """
+        Get a copy of the stacked click count grids of all layers for a bin size.
+
+        Unlike `layers`, the copy is safe to use while other threads add clicks.
+
+        Arguments
+        ---------
+        bin_size: int
+            Width and height of a bin in screen pixels.
+
+        Returns
+        -------
+        np.ndarray
+            Count grids stored as (Layer, Row, Column), in the order of `LAYERS`.
+        """
+        with self._lock:
+            return self.layers(bin_size).copy()
+
+    # %% counts
+    def counts(self, bin_size: int) -> np.ndarray:
+        """
+        Get the click count grid of all buttons for a bin size.
+
+        Arguments
+        ---------
+        bin_size: int
+            Width and height of a bin in screen pixels.
+
+        Returns
+        -------
+        np.ndarray
+            Count grid with one row per Y-bin and one column per X-bin.
+        """
+        return self.layers(bin_size)[ALL_LAYER]
+
+    # %% from_clicks
+    @classmethod
+    def from_clicks(
+        cls,
+        x: np.ndarray,
+        y: np.ndarray,
+        screensize: tuple[int, int],
+        buttons: np.ndarray = None,
+    ) -> "CountPyramid":
+        """
+        Create a count pyramid from click data.
+
+        Arguments
+        ---------
+        x: np.ndarray
+            The X-positions on the screen.
+        y: np.ndarray
+            The Y-positions on the screen.
+        screensize: tuple[int, int]
+            Screensize tuple stored as (X, Y).
+        buttons: np.ndarray
+            Button codes of the clicks, or None to count them as "OtherClick".
+            Defaults to None.
+
+        Returns
+        -------
+        CountPyramid
+            The new count pyramid.
+        """
+        pyramid = cls(screensize)
+        pyramid.base.add_many(x, y, buttons)
+        return pyramid
+
+    # %% from_grid
+    @classmethod
+    def from_grid(cls, grid: CountGrid) -> "CountPyramid":
+        """
+        Create a count pyramid on top of a full-resolution count grid.
+
+        The grid is used as the base grid without copying it.
+
+        Arguments
+        ---------
+        grid: CountGrid
+            Count grid with a bin size of one pixel.
+
+        Returns
+        -------
+        CountPyramid
+            The new count pyramid.
+        """
+        if grid.bin_size != 1:
+            raise ValueError("The base grid of a count pyramid needs a bin size of 1.")
+        pyramid = cls((grid.shape[1], grid.shape[0]))
+        pyramid._base = grid
+        return pyramid
+
+    # %% layers
+    def layers(self, bin_size: int) -> np.ndarray:
+        """
+        Get the stacked click count grids of all layers for a bin size.
+
+        Arguments
+        ---------
+        bin_size: int
+            Width and height of a bin in screen pixels.
+
+        Returns
+        -------
+        np.ndarray
+            Count grids stored as (Layer, Row, Column), in the order of `LAYERS`.
+        """
+        bin_size = int(bin_size)
+        with self._lock:
+            if bin_size == 1:
+                return self._base.layers
+            counts = self._levels.get(bin_size)
+            if counts is not None:
+                return counts
+            counts = self._derived.get(bin_size)
+            if counts is not None:
+                self._derived.move_to_end(bin_size)
+                return counts
+            # Derive from the coarsest kept grid whose bin size divides bin_size
+            source = bin_size & -bin_size
+            if source == bin_size:
+                source //= 2
+            for kept in self._derived:
+                if (bin_size % kept == 0) and (kept > source):
+                    source = kept
+            counts = _block_sum(self.layers(source), bin_size // source)
+            if source * 2 == bin_size:
+                self._levels[bin_size] = counts
+            else:
+                self._derived[bin_size] = counts
+                if len(self._derived) > MAX_DERIVED:
+                    self._derived.popitem(last=False)
+            return counts
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% bin_clicks
+def bin_clicks(
+    x: np.ndarray,
+    y: np.ndarray,
+    buttons: np.ndarray,
+    screensize: tuple[int, int],
+    bin_size: int,
+) -> np.ndarray:
+    """
+    Get the flat indices of clicks into a stacked count grid.
+
+    This is the sparse form of `CountGrid.layers`: every click on the screen is
+    listed once in the layer of all clicks and once in the layer of its button, and
+    clicks in the same bin are repeated.
+
+    Arguments
+    ---------
+    x: np.ndarray
+        The X-positions on the screen.
+    y: np.ndarray
+        The Y-positions on the screen.
+    buttons: np.ndarray
+        Button codes of the clicks.
+    screensize: tuple[int, int]
+        Screensize tuple stored as (X, Y).
+    bin_size: int
+        Width and height of a bin in screen pixels.
+
+    Returns
+    -------
+    np.ndarray
+        Flat indices into a grid of `stack_shape(screensize, bin_size)`.
+    """
+    _, rows, cols = stack_shape(screensize, bin_size)
+    row = np.asarray(y, dtype=np.intp) // bin_size
+    col = np.asarray(x, dtype=np.intp) // bin_size
+    inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+    position = row[inside] * cols + col[inside]
+    layer = np.asarray(buttons, dtype=np.intp)[inside] + 1
+    return np.concatenate(
+        (position + ALL_LAYER * rows * cols, position + layer * rows * cols)
+    )
+
+
+# %% stack_shape
+def stack_shape(screensize: tuple[int, int], bin_size: int) -> tuple[int, int, int]:
+    """
+    Get the shape of a stacked count grid.
+
+    Arguments
+    ---------
+    screensize: tuple[int, int]
+        Screensize tuple stored as (X, Y).
+    bin_size: int
+        Width and height of a bin in screen pixels.
+
+    Returns
+    -------
+    tuple[int, int, int]
+        Shape stored as (Layers, Rows, Columns).
+    """
+    return (len(LAYERS), -(-screensize[1] // bin_size), -(-screensize[0] // bin_size))
+
+
+# %% _block_sum
+def _block_sum(counts: np.ndarray, block: int) -> np.ndarray:
+    """
+    Sum the layers of a count grid over square blocks, padding the edges with zeros.
+
+    Arguments
+    ---------
+    counts: np.ndarray
+        Count grids stored as (Layer, Row, Column).
+    block: int
+        Width and height of a block in bins.
+
+    Returns
+    -------
+    np.ndarray
+        Count grids with `block` times fewer bins per axis, rounded up.
+    """
+    layers, rows, cols = counts.shape
+    padded_rows = -(-rows // block)
+    padded_cols = -(-cols // block)
+    padded = np.zeros(
+        (layers, padded_rows * block, padded_cols * block), dtype=COUNT_DTYPE
+    )
+    padded[:, :rows, :cols] = counts
+    return padded.reshape(layers, padded_rows, block, padded_cols, block).sum(
+        axis=(2, 4), dtype=COUNT_DTYPE
+    )
@@ -8,9 +8,8 @@ KeyListener
 """
 
 # %% --- Imports -----------------------------------------------------------------------
-import queue
-
-from pynput import mouse
+import heatmouse.capture as hcapture
+import heatmouse.eventring as heventring
 
 
 # %% --- Classes -----------------------------------------------------------------------
@@ -19,12 +18,16 @@ class KeyListener:
     """
     Generates several event threads used to listen and report data to the main thread.
 
+    Clicks come from the click source of a capture backend, and are handed to the
+    consumer thread through a ring buffer of `ring_capacity` events. Clicks arriving
+    while the ring is full are dropped and counted by the ring.
+
     Methods
     -------
     get_next_event
-        Retrieve the next even from the event queue.
+        Retrieve the next even from the event ring.
     on_click
-        Add mouse event to the event queue.
+        Add mouse event to the event ring.
     run
         Run the mouse listener.
     start
@@ -35,15 +38,21 @@ class KeyListener:
 
     # %% --- Dunder Methods ------------------------------------------------------------
     # %% __init__
-    def __init__(self):
-        self.event_queue = queue.Queue()
-        self.mouse_listener = mouse.Listener(on_click=self.on_click)
+    def __init__(
+        self,
+        backend: hcapture.CaptureBackend = None,
+        ring_capacity: int = heventring.RING_CAPACITY,
+    ):
+        if backend is None:
+            backend = hcapture.get_backend()
+        self.event_ring = heventring.EventRing(ring_capacity)
+        self.mouse_listener = backend.click_source(self.on_click)
 
     # %% --- Methods -------------------------------------------------------------------
     # %% get_next_event
     def get_next_event(self, timeout: int = None):
         """
-        Retrieve the next event from the event queue.
+        Retrieve the next event from the event ring.
 
         Arguments
         ---------
@@ -53,17 +62,14 @@ class KeyListener:
         Returns
         -------
         tuple
-            The event data.
+            The event data, or None if no event arrived in time.
         """
-        try:
-            return self.event_queue.get(block=True, timeout=timeout)
-        except queue.Empty:
-            return None
+        return self.event_ring.get(timeout=timeout)
 
     # %% on_click
-    def on_click(self, x: int, y: int, button: mouse.Button, pressed: bool):
+    def on_click(self, x: int, y: int, button: str, pressed: bool):
         """
-        Add mouse event to the event queue.
+        Add mouse event to the event ring.
 
         Arguments
         ---------
@@ -71,26 +77,25 @@ class KeyListener:
             The X-position on the screen.
         y: int
             The Y-position on the screen.
-        button: mouse.Button
-            The button pressed on the mouse.
+        button: str
+            The name of the button pressed on the mouse.
         pressed: bool
             Validity bit to check if button was pressed.
         """
         if pressed:
-            if button == mouse.Button.left:
-                button = "LeftClick"
-            elif button == mouse.Button.right:
-                button = "RightClick"
-            elif button == mouse.Button.middle:
-                button = "MiddleClick"
-            self.event_queue.put((x, y, button))
+            self.event_ring.put(x, y, button)
 
     # %% run
     def run(self):
         """Run the mouse listener."""
-        self.start()
-        self.mouse_listener.join()
-        self.stop()
+        try:
+            self.start()
+            self.mouse_listener.join()
+            self.stop()
+        finally:
+            self.event_ring.close()
+        if self.event_ring.dropped:
+            print(f"Listener dropped {self.event_ring.dropped} events")
         print("Listener stopped")
 
     # %% start
@@ -0,0 +1,182 @@
+"""
+The live filter class used by Heat Mouse to update filtered heatmaps incrementally.
+
+Classes
+-------
+LiveFilter
+    Maintains a filtered heatmap and updates it one click at a time.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import numpy as np
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% LiveFilter
+class LiveFilter:
+    """
+    Maintains a filtered heatmap and updates it one click at a time.
+
+    The Gaussian filter is linear, so adding a click to the count grid changes the
+    filtered image by one copy of the kernel centred on the click. Adding that patch
+    costs O(kernel size) instead of a full convolution of the grid. The patch is
+    clipped at the image edges, which matches a zero-filled boundary. The image may be
+    a stack of layers, in which case each click is added to the layers it belongs to.
+
+    Properties
+    ----------
+    image : np.ndarray
+        Get the maintained filtered image.
+    kernel : np.ndarray
+        Get the normalized filter kernel.
+    key : tuple
+        Get the key identifying the data the image was filtered from.
+
+    Methods
+    -------
+    add
+        Add the kernel patch of a click to the filtered image.
+    invalidate
+        Drop the maintained image so the next update needs a full filter.
+    is_valid
+        Check whether the maintained image belongs to the given key.
+    reset
+        Replace the maintained image with a fully filtered image.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, kernel: np.ndarray):
+        self._kernel = np.asarray(kernel, dtype=float) / np.sum(kernel)
+        self._image: np.ndarray = None
+        self._key: tuple = None
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% image
+    @property
+    def image(self) -> np.ndarray:
+        """
+        Get the maintained filtered image.
+
+        Returns
+        -------
+        np.ndarray
+            Filtered image, or None if no image is maintained.
+        """
+        return self._image
+
+    # %% kernel
+    @property
+    def kernel(self) -> np.ndarray:
+        """
+        Get the normalized filter kernel.
+
+        Returns
+        -------
+        np.ndarray
+            Filter kernel with a sum of one.
+        """
+        return self._kernel
+
+    # %% key
+    @property
+    def key(self) -> tuple:
+        """
+        Get the key identifying the data the image was filtered from.
+
+        Returns
+        -------
+        tuple
+            Key stored as (Application, Filter-Factor, Bin-Size).
+        """
+        return self._key
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% add
+    def add(
+        self, row: int, col: int, layers: tuple[int, ...] = None
+    ) -> tuple[slice, slice]:
+        """
+        Add the kernel patch of a click to the filtered image.
+
+        Clicks outside of the image are ignored, like they are by the count grid.
+
+        Arguments
+        ---------
+        row: int
+            Count grid row of the click.
+        col: int
+            Count grid column of the click.
+        layers: tuple[int, ...]
+            Layers of a stacked image the click belongs to, or None to add it to the
+            whole image. Defaults to None.
+
+        Returns
+        -------
+        tuple[slice, slice]
+            Dirty region of the image stored as (Rows, Columns), or None if the image
+            was not changed.
+        """
+        if self._image is None:
+            return None
+        rows, cols = self._image.shape[-2:]
+        if not ((0 <= row < rows) and (0 <= col < cols)):
+            return None
+        half_rows = self._kernel.shape[0] // 2
+        half_cols = self._kernel.shape[1] // 2
+        row0, row1 = max(row - half_rows, 0), min(row + half_rows + 1, rows)
+        col0, col1 = max(col - half_cols, 0), min(col + half_cols + 1, cols)
+        k_row = row0 - (row - half_rows)
+        k_col = col0 - (col - half_cols)
+        index = (..., slice(row0, row1), slice(col0, col1))
+        if layers is not None:
+            index = (list(layers), *index[1:])
+        self._image[index] += self._kernel[
+            k_row : k_row + row1 - row0, k_col : k_col + col1 - col0
+        ]
+        return (slice(row0, row1), slice(col0, col1))
+
+    # %% invalidate
+    def invalidate(self):
+        """Drop the maintained image so the next update needs a full filter."""
+        self._image = None
+        self._key = None
+
+    # %% is_valid
+    def is_valid(self, key: tuple) -> bool:
+        """
+        Check whether the maintained image belongs to the given key.
+
+        Arguments
+        ---------
+        key: tuple
+            Key stored as (Application, Filter-Factor, Bin-Size).
+
+        Returns
+        -------
+        bool
+            True if the image can be updated incrementally.
+        """
+        return (self._image is not None) and (self._key == key)
+
+    # %% reset
+    def reset(self, image: np.ndarray, key: tuple, kernel: np.ndarray = None):
+        """
+        Replace the maintained image with a fully filtered image.
+
+        The image is updated in place by `add`.
+
+        Arguments
+        ---------
+        image: np.ndarray
+            Fully filtered image.
+        key: tuple
+            Key stored as (Application, Filter-Factor, Bin-Size).
+        kernel: np.ndarray
+            Filter kernel the image was filtered with, or None to keep the current
+            kernel. Defaults to None.
+        """
+        if kernel is not None:
+            self._kernel = np.asarray(kernel, dtype=float) / np.sum(kernel)
+        self._image = image
+        self._key = key
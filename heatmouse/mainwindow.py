@@ -8,27 +8,45 @@ HeatMouseMainWindow
 """
 
 # %% --- Imports -----------------------------------------------------------------------
-import copy
-import ctypes
-from collections import Counter
+import functools
+import itertools
+import math
+import os
 from operator import itemgetter
 
-import matplotlib
-import matplotlib.axes as maxes
-import matplotlib.backends.backend_qt5agg as mqt5agg
-import matplotlib.figure as mfigure
 import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets, uic
 
 import heatmouse
-import heatmouse.activeicon as hactiveicon
+import heatmouse.capture as hcapture
+import heatmouse.clickarray as hclickarray
 import heatmouse.database as hdatabase
+import heatmouse.filterengine as hfilterengine
+import heatmouse.filterpool as hfilterpool
+import heatmouse.heatmapcache as hheatmapcache
+import heatmouse.heatmapcanvas as hheatmapcanvas
+import heatmouse.histogram as hhistogram
 import heatmouse.listitemdelegate as hlistitemdelegate
+import heatmouse.livefilter as hlivefilter
+import heatmouse.recording as hrecording
+import heatmouse.renderscheduler as hrenderscheduler
+import heatmouse.sessionbuffer as hsessionbuffer
 import heatmouse.threadworker as hthreadworker
+import heatmouse.tiling as htiling
 
 # %% --- Constants ---------------------------------------------------------------------
 # %% DESC_ROLE
 DESC_ROLE = QtCore.Qt.UserRole + 1
+# %% FILTER_BACKENDS
+FILTER_BACKENDS = ("thread", "process")
+# %% PRERENDER_COUNT
+PRERENDER_COUNT = 3
+# %% PREVIEW_BINS
+PREVIEW_BINS = 64
+# %% PYRAMID_CACHE_BYTES
+PYRAMID_CACHE_BYTES = 512 * 2**20
+# %% TILE_CACHE_BYTES
+TILE_CACHE_BYTES = 64 * 2**20
 
 
 # %% --- Classes -----------------------------------------------------------------------
@@ -41,23 +59,33 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
     ----------
     active_window : str
         Get the active window name.
-    bins : tuple[np.array, np.array]
-        Get the histogram bin sizes, based on the chosen Gaussian filter factor.
-    canvas : mqt5agg.FigureCanvasQTAgg
-        Get the canvas for the figure.
-    data : tuple[list, list, list]
-        Get the Heat Mouse click data for a specific application.
+    backend : hcapture.CaptureBackend
+        Get the capture backend observing the desktop.
+    bin_size : int
+        Get the histogram bin size, from the filter factor and the canvas resolution.
+    bins : int
+        Get the Gaussian filter factor, the smallest histogram bin size.
+    canvas : hheatmapcanvas.HeatmapCanvas
+        Get the canvas the heatmap is painted on.
+    catalog : dict[str : tuple[int, str]]
+        Get the click count and icon of every application, loaded once from the Heat
+        Mouse database and updated with new click data.
     database : hdatabase.Database
         Get the Heat Mouse database class object.
-    db_data : dict[str : tuple[list, list, list]]
-        Get the stored data from the Heat Mouse database. Used to update the data
-        property and compare against new click data.
-    figure : mfigure.Figure
-        Get the main window figure for drawing.
+    filter_backend : str
+        Get or set where heatmaps are filtered, "thread" or "process".
+    heatmap_key : tuple
+        Get the key of the heatmap to show for the selection.
+    layer : int
+        Get or set the index of the shown click layer in `hhistogram.LAYERS`.
     screensize : tuple[int, int]
         Get the active monitor screen size.
     selection : str
         Get the selected application to display data.
+    sigma : float
+        Get the standard deviation of the Gaussian filter in bins.
+    sparse_threshold : float
+        Get or set the splatted kernel values per bin below which clicks are splat.
 
     Methods
     -------
@@ -66,7 +94,11 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
     draw
         Draw updated heatmap on the canvas.
     filter_task
-        Init a worker thread to filter data and prepare it for plotting.
+        Filter data and prepare it for plotting, as scheduled by the render scheduler.
+    get_count_pyramid
+        Get the running click count pyramid of an application.
+    get_clicks
+        Get the raw clicks of an application.
     listener_stop
         Stop the listener thread.
     listener_task
@@ -77,33 +109,55 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         Connect the listWidget_Apps widget to click events.
     on_listWidget_ActiveApp
         Connect the on_listWidget_ActiveApp widget to click events.
+    prerender
+        Filter the heatmaps of several applications in parallel into the cache.
     resizeEvent
         Override the resizeEvent to update the listWidget sizes.
     update_filter
         Update the filter on Gaussian filter factor changes.
+    update_layer
+        Show another click layer of the filtered heatmap.
 
     Protected Methods
     -----------------
-    _check_filter_queue
-        Check if filter task has a request in the queue.
-    _init_axes
-        Initialize the axes.
-    _init_figure
-        Initialize the figure.
+    _cache_live_heatmap
+        Store the live filtered heatmap in the heatmap cache.
+    _canvas_resized
+        Filter the heatmap again when a canvas resize changes the bin size.
+    _click_count
+        Get the click count of an application without reading its click data.
+    _draw_clicks
+        Add clicks to the live filtered heatmap and request a redraw.
+    _draw_heatmap
+        Show a filtered heatmap and make it the live heatmap.
+    _draw_preview
+        Show a coarse heatmap of a progressive render job and refine it.
+    _draw_tile
+        Show a filtered tile if it is still visible.
+    _filter_level
+        Start filtering the next level of a progressive render job.
+    _filter_worker
+        Create the worker filtering the heatmap of an application into the cache.
     _init_gui
         Initialize the GUI at the end of `__init__` method.
     _load_ui
         Load the ui file for the GUI.
     _populate_applist
         Populate the list widgets with application data.
+    _prefer_sparse
+        Check whether the heatmap of an application is splat from its clicks.
+    _redraw
+        Redraw the dirty region of the live heatmap and update the tiles.
+    _request_tiles
+        Show the tiles the zoomed view needs, filtering the missing ones.
     _show_error_message
         Displays an error message in a pop-up dialog.
     _store_data
-        Separate new data from existing data and store it in the database.
+        Store the click data captured since the last flush in the database.
     _update_activeapp
         Update the data points value for the active application.
-    _update_data
-        Update the data property with new click data.
+    _update_batch
+        Update the click counts and heatmaps with a batch of new click data.
     _window_change
         Update the data, GUI, and plot window upon active window change.
     """
@@ -112,22 +166,41 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
     # %% __init__
     def __init__(self):
         self._active_window: str = None
-        self._bins: tuple[np.array, np.array] = None
-        self._canvas: mqt5agg.FigureCanvasQTAgg = None
-        self._data: dict[str : tuple[list, list, list]] = None
+        self._backend: hcapture.CaptureBackend = None
+        self._bins: int = 1
+        self._canvas: hheatmapcanvas.HeatmapCanvas = None
+        self._catalog: dict[str : tuple[int, str]] = None
+        self._count_pyramids: hheatmapcache.HeatmapCache = hheatmapcache.HeatmapCache(
+            PYRAMID_CACHE_BYTES
+        )
         self._database: hdatabase.Database = None
-        self._db_data: dict[str : tuple[list, list, list]] = None
-        self._figure: mfigure.Figure = None
+        self._drawn_key: tuple = None
+        self._filter_pool: hfilterpool.FilterPool = None
+        self._layer: int = hhistogram.ALL_LAYER
+        self._pending_prerender: list[str] = None
         self._screensize: tuple[int, int] = None
         self._selection: str = None
-        self.awaiting_filter: bool = False
-        self.axes: maxes.Axes = None
-        self.background: matplotlib.backends._backend_agg.BufferRegion = None
+        self._shown_tiles: dict[tuple:tuple] = {}
+        self._sparse_threshold: float = hfilterengine.SPARSE_THRESHOLD
+        self._tile_jobs: set[tuple] = set()
+        self._visible_tiles: set[tuple] = set()
+        self.dirty_region: tuple[slice, slice] = None
         self.filter_worker: hthreadworker.FilterWorker = None
-        self.filter_worker_active: bool = False
-        self.heatmap: np.histogram2d = None
+        self.heatmap_cache: hheatmapcache.HeatmapCache = hheatmapcache.HeatmapCache()
         self.listener_worker: hthreadworker.ListenerWorker = None
+        self.render_scheduler: hrenderscheduler.RenderScheduler = (
+            hrenderscheduler.RenderScheduler(self.filter_task, self._redraw)
+        )
+        self.live_filter: hlivefilter.LiveFilter = hlivefilter.LiveFilter(
+            hfilterengine.FILTER_KERNEL.array
+        )
+        self.session_buffer: hsessionbuffer.SessionBuffer = (
+            hsessionbuffer.SessionBuffer()
+        )
         self.threadpool: QtCore.QThreadPool = QtCore.QThreadPool()
+        self.tile_cache: hheatmapcache.HeatmapCache = hheatmapcache.HeatmapCache(
+            TILE_CACHE_BYTES
+        )
         super().__init__()
 
         self._init_gui()
@@ -152,63 +225,91 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
             self._active_window = window.replace("'", "")
             self._window_change()
 
+    # %% backend
+    @property
+    def backend(self) -> hcapture.CaptureBackend:
+        """
+        Get the capture backend observing the desktop.
+
+        Returns
+        -------
+        hcapture.CaptureBackend
+            Capture backend of the running desktop.
+        """
+        if self._backend is None:
+            self._backend = hcapture.get_backend()
+        return self._backend
+
+    # %% bin_size
+    @property
+    def bin_size(self) -> int:
+        """
+        Get the histogram bin size, from the filter factor and the canvas resolution.
+
+        Bins are never smaller than a device pixel of the canvas, so no more bins are
+        filtered than the canvas can show. The filter factor is the smallest bin size.
+
+        Returns
+        -------
+        int
+            Width and height of a bin in screen pixels.
+        """
+        ratio = self.canvas.devicePixelRatioF()
+        width = max(self.canvas.width() * ratio, 1)
+        height = max(self.canvas.height() * ratio, 1)
+        fit = math.ceil(max(self.screensize[0] / width, self.screensize[1] / height))
+        return max(self.bins, fit)
+
     # %% bins
     @property
-    def bins(self) -> tuple[np.array, np.array]:
+    def bins(self) -> int:
         """
-        Get the histogram bin sizes, based on the chosen Gaussian filter factor.
+        Get the Gaussian filter factor, the smallest histogram bin size.
 
         Returns
         -------
-        tuple[np.array, np.array]
-            2D bin stored as (X, Y).
+        int
+            Width and height of the smallest bin in screen pixels.
         """
-        if self._bins is None:
-            xbins = np.linspace(0, self.screensize[0], self.screensize[0])
-            ybins = np.linspace(0, self.screensize[1], self.screensize[1])
-            self._bins = (ybins, xbins)
         return self._bins
 
     @bins.setter
     def bins(self, value):
-        xbins = np.linspace(0, self.screensize[0], int(self.screensize[0] / value))
-        ybins = np.linspace(0, self.screensize[1], int(self.screensize[1] / value))
-        self._bins = (ybins, xbins)
+        self._bins = value
 
     # %% canvas
     @property
-    def canvas(self) -> mqt5agg.FigureCanvasQTAgg:
+    def canvas(self) -> hheatmapcanvas.HeatmapCanvas:
         """
-        Get the canvas for the figure.
+        Get the canvas the heatmap is painted on.
 
         Returns
         -------
-        mqt5agg.FigureCanvasQTAgg
-            Canvas for the figure.
+        hheatmapcanvas.HeatmapCanvas
+            Heatmap canvas widget.
         """
         if self._canvas is None:
-            self._canvas = mqt5agg.FigureCanvasQTAgg(self.figure)
+            self._canvas = hheatmapcanvas.HeatmapCanvas()
         return self._canvas
 
-    # %% data
+    # %% catalog
     @property
-    def data(self) -> tuple[list, list, list]:
-        """Get the Heat Mouse click data for a specific application.
+    def catalog(self) -> dict[str : tuple[int, str]]:
+        """
+        Get the click count and icon of every application.
+
+        Loaded once from the Heat Mouse database without reading any click data, and
+        updated in place with new clicks and applications. Click data is only read
+        for the selected application, through its count pyramid.
 
         Returns
         -------
-        tuple[list, list, list]
-            Tuple stored as (X-Position, Y-Position, Button).
+        dict[str : tuple[int, str]]
+            Catalog stored as {Application: (Click-Count, Icon-Path)}.
         """
-        if self._data is None:
-            self._data = copy.deepcopy(self.db_data)
-        try:
-            return self._data[self.active_window]
-        except KeyError:
-            if self.active_window is None:
-                return None
-            self._data[self.active_window] = ([], [], [])
-            return self._data[self.active_window]
+        if self._catalog is None:
+            self._catalog = self.database.get_catalog(self.screensize)
+        return self._catalog
 
     # %% database
     @property
@@ -225,37 +326,64 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
             self._database = hdatabase.Database()
         return self._database
 
-    # %% db_data
+    # %% filter_backend
     @property
-    def db_data(self) -> dict[str : tuple[list, list, list]]:
+    def filter_backend(self) -> str:
         """
-        Get the stored data from the Heat Mouse database.
+        Get or set where heatmaps are filtered, "thread" or "process".
 
-        Used to update the data property and compare against new click data.
+        The "thread" backend filters in the thread pool. The "process" backend hands
+        the filter to a process pool, which keeps large filters from competing with
+        the GUI thread for the GIL.
 
         Returns
         -------
-        dict[str : tuple[list, list, list]]
-            Dictionary stored as: {Application-Name: (X-Position, Y-Position, Button)}
+        str
+            Filter backend name.
         """
-        if self._db_data is None:
-            self._db_data = self.database.get_all_data()
-        return self._db_data
+        return "thread" if self._filter_pool is None else "process"
 
-    # %% figure
+    @filter_backend.setter
+    def filter_backend(self, value):
+        if value not in FILTER_BACKENDS:
+            raise ValueError(f'Unknown filter backend: "{value}"')
+        if value == self.filter_backend:
+            return
+        if value == "process":
+            self._filter_pool = hfilterpool.FilterPool()
+        else:
+            self._filter_pool.shutdown()
+            self._filter_pool = None
+
+    # %% heatmap_key
     @property
-    def figure(self) -> mfigure.Figure:
+    def heatmap_key(self) -> tuple:
         """
-        Get the main window figure for drawing.
+        Get the key of the heatmap to show for the selection.
 
         Returns
         -------
-        mfigure.Figure
-            Main window figure.
+        tuple
+            Key stored as (Application, Filter-Factor, Bin-Size).
+        """
+        return (self.selection, self.bins, self.bin_size)
+
+    # %% layer
+    @property
+    def layer(self) -> int:
         """
-        if self._figure is None:
-            self._figure = mfigure.Figure()
-        return self._figure
+        Get or set the index of the shown click layer in `hhistogram.LAYERS`.
+
+        Returns
+        -------
+        int
+            Layer index.
+        """
+        return self._layer
+
+    @layer.setter
+    def layer(self, value):
+        self._layer = value
 
     # %% screensize
     @property
@@ -269,12 +397,7 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
             Screensize tuple stored as (X, Y).
         """
         if self._screensize is None:
-            user32 = ctypes.windll.user32
-            user32.SetProcessDPIAware()
-            self._screensize = (
-                user32.GetSystemMetrics(0),
-                user32.GetSystemMetrics(1),
-            )
+            self._screensize = self.backend.screensize()
         return self._screensize
 
     # %% selection
@@ -295,7 +418,45 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         if (window != self._selection) and (window is not None) and (window != ""):
             self._selection = window
             self._window_change()
-            self.filter_task()
+            self.render_scheduler.invalidate()
+            self.render_scheduler.request()
+
+    # %% sigma
+    @property
+    def sigma(self) -> float:
+        """
+        Get the standard deviation of the Gaussian filter in bins.
+
+        Scaled with the bin size, so the smoothing in screen pixels only depends on
+        the filter factor.
+
+        Returns
+        -------
+        float
+            Standard deviation in bins.
+        """
+        return hfilterengine.FILTER_SIGMA * self.bins / self.bin_size
+
+    # %% sparse_threshold
+    @property
+    def sparse_threshold(self) -> float:
+        """
+        Get or set the splatted kernel values per bin below which clicks are splat.
+
+        Applications with few clicks are filtered by splatting the kernel at every
+        click instead of filtering a dense count grid. Set to zero to always filter
+        the dense grid.
+
+        Returns
+        -------
+        float
+            Sparse filter threshold, see `hfilterengine.prefer_sparse`.
+        """
+        return self._sparse_threshold
+
+    @sparse_threshold.setter
+    def sparse_threshold(self, value):
+        self._sparse_threshold = max(float(value), 0.0)
 
     # %% --- Methods -------------------------------------------------------------------
     # %% closeEvent
@@ -308,9 +469,10 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         event: QtGui.QCloseEvent
             The window close event.
         """
+        self.render_scheduler.stop()
+        self.filter_backend = "thread"
         try:
             self.listener_worker.stop()
-            self.filter_worker.stop()
         except AttributeError:
             pass
         self._store_data()
@@ -318,34 +480,112 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         event.accept()
 
     # %% draw
-    def draw(self, heatmap: np.histogram2d):
+    def draw(self, heatmap: np.ndarray, generation: int):
         """
-        Draw updated heatmap on the canvas.
+        Draw updated heatmap on the canvas, unless it is stale.
 
         Arguments
         ---------
-        heatmap: np.histogram2d
-            Filtered histogram data.
+        heatmap: np.ndarray
+            Filtered heatmap array, or None if the filter worker aborted.
+        generation: int
+            Generation number of the render job.
         """
-        self.filter_worker_active = False
-        self.heatmap = heatmap
-        self.canvas.restore_region(self.background)
-        self.axes.draw_artist(self.heatmap)
-        self.canvas.blit(self.axes.bbox)
+        if (not self.render_scheduler.finish(generation)) or (heatmap is None):
+            return
+        self._draw_heatmap(heatmap)
 
     # %% filter_task
-    def filter_task(self):
-        """Init a worker thread to filter data and prepare it for plotting."""
-        data = self.data
-        if self.selection != self.active_window:
-            data = self._data[self.selection]
-        self.filter_worker = hthreadworker.FilterWorker(
-            self.heatmap, data, self.bins, self.axes
-        )
-        self.filter_worker.signals.result.connect(self.draw)
-        self.filter_worker.signals.result.connect(self._check_filter_queue)
-        self.filter_worker_active = True
-        self.threadpool.start(self.filter_worker)
+    def filter_task(self, generation: int):
+        """
+        Filter data and prepare it for plotting, as scheduled by the render scheduler.
+
+        Cached heatmaps are drawn directly, and applications with few clicks are
+        splat in one step. Otherwise worker threads filter the heatmap. When the
+        application or filter changed since the last full-resolution heatmap, it is
+        rendered progressively: a coarse preview with at most `PREVIEW_BINS` columns is
+        filtered first, then levels with half the bin size of the previous one until
+        the full resolution is reached. Every level replaces the previous one, and a
+        stale render job stops the chain. Re-renders after new clicks keep showing the
+        previous heatmap until the full resolution is ready.
+
+        Arguments
+        ---------
+        generation: int
+            Generation number of the render job.
+        """
+        self._cache_live_heatmap()
+        self.live_filter.invalidate()
+        key = (*self.heatmap_key, self._click_count(self.selection))
+        heatmap = self.heatmap_cache.get(key)
+        if heatmap is not None:
+            self._draw_heatmap(heatmap)
+            self.render_scheduler.finish(generation)
+            return
+        levels = [self.bin_size]
+        if (self.heatmap_key[:2] != self._drawn_key) and (
+            not self._prefer_sparse(self.selection)
+        ):
+            while -(-self.screensize[0] // levels[0]) > PREVIEW_BINS:
+                levels.insert(0, levels[0] * 2)
+        self._filter_level(generation, levels)
+
+    # %% get_count_pyramid
+    def get_count_pyramid(self, application: str) -> hhistogram.CountPyramid:
+        """
+        Get the running click count pyramid of an application.
+
+        The pyramid is built on first use from the count grid stored in the database
+        and the unsaved clicks of the session, and then kept up to date by
+        `_update_batch`, one batch of clicks at a time. Changing the bin size derives a
+        new grid from the pyramid without reading the click data again. Pyramids are
+        kept in a memory-bounded LRU cache, so those of applications that were not
+        shown for a while are evicted and built again when needed.
+
+        Arguments
+        ---------
+        application: str
+            Application name.
+
+        Returns
+        -------
+        hhistogram.CountPyramid
+            Click count pyramid of the application.
+        """
+        pyramid = self._count_pyramids.get((application,))
+        if pyramid is None:
+            grid = self.database.get_grid(application, self.screensize)
+            unsaved = self.session_buffer.data.get(application)
+            if unsaved is not None:
+                grid.add_many(unsaved.x, unsaved.y, unsaved.button)
+            pyramid = hhistogram.CountPyramid.from_grid(grid)
+        # Put the pyramid again, as the grids it built since grow its size
+        self._count_pyramids.put((application,), pyramid)
+        return pyramid
+
+    # %% get_clicks
+    def get_clicks(self, application: str) -> hclickarray.ClickArray:
+        """
+        Get the raw clicks of an application.
+
+        The stored clicks are read from the database on every call, so only use this
+        when the count grid is not enough.
+
+        Arguments
+        ---------
+        application: str
+            Application name.
+
+        Returns
+        -------
+        hclickarray.ClickArray
+            Stored and unsaved click data of the application.
+        """
+        clicks = self.database.get_data(application)
+        unsaved = self.session_buffer.data.get(application)
+        if unsaved is not None:
+            clicks.extend(unsaved.x, unsaved.y, unsaved.button)
+        return clicks
 
     # %% listener_stop
     def listener_stop(self):
@@ -356,15 +596,22 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
 
     # %% listener_task
     def listener_task(self):
-        """Init a worker thread to listen for mouse clicks on the system."""
-        self.listener_worker = hthreadworker.ListenerWorker()
-        self.listener_worker.signals.update.connect(self._update_data)
+        """
+        Init a worker thread to listen for mouse clicks on the system.
+
+        The session is recorded to the path in the HEATMOUSE_RECORD environment
+        variable, if it is set.
+        """
+        self.listener_worker = hthreadworker.ListenerWorker(
+            self.backend, recording_path=os.environ.get(hrecording.RECORD_VARIABLE)
+        )
+        self.listener_worker.signals.batch.connect(self._update_batch)
         self.listener_worker.signals.error.connect(self._show_error_message)
         self.threadpool.start(self.listener_worker)
         # Update GUI to listening-mode
         self.selection = "Heat Mouse"
         self.active_window = "Heat Mouse"
-        self.filter_task()
+        self.render_scheduler.request()
         self.stackedWidget.setCurrentIndex(1)
         self.listWidget_ActiveApp.setCurrentRow(0)
         self.start_action.setEnabled(False)
@@ -407,6 +654,26 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         if selection != self.selection:
             self.selection = selection
 
+    # %% prerender
+    def prerender(self, applications: list[str]):
+        """
+        Filter the heatmaps of several applications in parallel into the cache.
+
+        One filter worker is started per application whose heatmap is not cached for
+        the current filter factor, so switching to it later is a cache hit.
+
+        Arguments
+        ---------
+        applications: list[str]
+            Application names.
+        """
+        for application in applications:
+            clicks = self._click_count(application)
+            key = (application, self.bins, self.bin_size, clicks)
+            if key in self.heatmap_cache:
+                continue
+            self.threadpool.start(self._filter_worker(application, key))
+
     # %% resizeEvent
     def resizeEvent(self, event: QtGui.QResizeEvent):
         """
@@ -434,34 +701,309 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
             The selected Gaussian filter value.
         """
         self.bins = value
-        if not self.filter_worker_active:
-            self.filter_task()
-        else:
-            self.awaiting_filter = True
+        self.render_scheduler.invalidate()
+        self.render_scheduler.request()
+
+    # %% update_layer
+    def update_layer(self, value: int):
+        """
+        Show another click layer of the filtered heatmap.
+
+        Every layer is filtered with the heatmap, so the live heatmap and the cached
+        tiles are only sliced again.
+
+        Arguments
+        ---------
+        value: int
+            The selected layer index.
+        """
+        self.layer = value
+        if self.live_filter.image is None:
+            return
+        self.canvas.set_heatmap(
+            self.live_filter.image[self.layer], self.live_filter.key[2]
+        )
+        self.canvas.clear_tiles()
+        self._shown_tiles.clear()
+        self._request_tiles()
 
     # %% --- Protected Methods ---------------------------------------------------------
-    # %% _check_filter_queue
-    def _check_filter_queue(self):
-        """Check if filter task has a request in the queue."""
-        if self.awaiting_filter:
-            self.awaiting_filter = False
-            self.filter_task()
-
-    # %% _init_axes
-    def _init_axes(self):
-        """Initialize the axes."""
-        if self.axes:
-            self.axes.remove()
-        axes = self.figure.add_subplot()
-        axes.get_xaxis().set_visible(False)
-        axes.get_yaxis().set_visible(False)
-        self.background = self.canvas.copy_from_bbox(axes.bbox)
-        self.axes = axes
-
-    # %% _init_figure
-    def _init_figure(self):
-        """Initialize the figure."""
-        self.figure.tight_layout(pad=0.0)
+    # %% _cache_live_heatmap
+    def _cache_live_heatmap(self):
+        """Store the live filtered heatmap in the heatmap cache."""
+        if self.live_filter.image is None:
+            return
+        application = self.live_filter.key[0]
+        key = (*self.live_filter.key, self._click_count(application))
+        if key not in self.heatmap_cache:
+            self.heatmap_cache.put(key, self.live_filter.image.copy())
+
+    # %% _canvas_resized
+    def _canvas_resized(self):
+        """
+        Filter the heatmap again when a canvas resize changes the bin size.
+
+        The first resize gives the canvas its real size, so the pending pre-render
+        starts then.
+        """
+        if self._pending_prerender is not None:
+            applications, self._pending_prerender = self._pending_prerender, None
+            self.prerender(applications)
+        if self.selection is None:
+            return
+        if self.live_filter.key != self.heatmap_key:
+            self.render_scheduler.invalidate()
+            self.render_scheduler.request()
+
+    # %% _click_count
+    def _click_count(self, application: str) -> int:
+        """
+        Get the click count of an application without reading its click data.
+
+        The count comes from the catalog, which counts the stored clicks and every
+        click of the session. It grows with each batch, so it also versions cached
+        heatmaps and tiles.
+
+        Arguments
+        ---------
+        application: str
+            Application name.
+
+        Returns
+        -------
+        int
+            Number of clicks.
+        """
+        return self.catalog.get(application, (0, None))[0]
+
+    # %% _draw_clicks
+    def _draw_clicks(self, x: np.ndarray, y: np.ndarray, buttons: np.ndarray):
+        """
+        Add clicks to the live filtered heatmap and request a redraw.
+
+        Each click is added to the layer of its button and to the layer of all clicks.
+        The dirty regions of clicks are merged until the render scheduler runs the
+        redraw, which is requested once for all the clicks.
+
+        Arguments
+        ---------
+        x: np.ndarray
+            The X-positions on the screen.
+        y: np.ndarray
+            The Y-positions on the screen.
+        buttons: np.ndarray
+            The button codes of the clicks.
+        """
+        bin_size = self.live_filter.key[2]
+        dirty_region = self.dirty_region
+        for x_position, y_position, button in zip(x.tolist(), y.tolist(), buttons):
+            dirty = self.live_filter.add(
+                y_position // bin_size,
+                x_position // bin_size,
+                (hhistogram.ALL_LAYER, button + 1),
+            )
+            if dirty is None:
+                continue
+            if dirty_region is not None:
+                rows, cols = dirty_region
+                dirty = (
+                    slice(
+                        min(rows.start, dirty[0].start), max(rows.stop, dirty[0].stop)
+                    ),
+                    slice(
+                        min(cols.start, dirty[1].start), max(cols.stop, dirty[1].stop)
+                    ),
+                )
+            dirty_region = dirty
+        if dirty_region is self.dirty_region:
+            return
+        self.dirty_region = dirty_region
+        self.render_scheduler.request_redraw()
+
+    # %% _draw_heatmap
+    def _draw_heatmap(self, heatmap: np.ndarray):
+        """
+        Show a filtered heatmap and make it the live heatmap.
+
+        This is the apply step of the filter stage and must run on the GUI thread, as
+        it is the only place the canvas is updated.
+
+        Arguments
+        ---------
+        heatmap: np.ndarray
+            Filtered heatmap array stacked per click layer.
+        """
+        # Cached heatmaps are read-only, and the live filter updates its image in place
+        heatmap = heatmap.copy()
+        self.live_filter.reset(
+            heatmap, self.heatmap_key, hfilterengine.get_kernel(self.sigma)
+        )
+        self.dirty_region = None
+        self._drawn_key = self.heatmap_key[:2]
+        self.canvas.set_heatmap(heatmap[self.layer], self.bin_size)
+        self.canvas.clear_tiles()
+        self._shown_tiles.clear()
+        self._request_tiles()
+
+    # %% _draw_preview
+    def _draw_preview(
+        self, heatmap: np.ndarray, bin_size: int, generation: int, levels: list[int]
+    ):
+        """
+        Show a coarse heatmap of a progressive render job and refine it.
+
+        Arguments
+        ---------
+        heatmap: np.ndarray
+            Filtered coarse heatmap array stacked per click layer, or None if the
+            filter worker aborted.
+        bin_size: int
+            Width and height of a coarse heatmap bin in screen pixels.
+        generation: int
+            Generation number of the render job.
+        levels: list[int]
+            Bin sizes of the remaining levels, from coarse to fine.
+        """
+        if heatmap is None:
+            # The level aborted, so the render job ends without a result
+            self.render_scheduler.finish(generation)
+            return
+        if not self.render_scheduler.is_current(generation):
+            return
+        self.canvas.set_heatmap(heatmap[self.layer], bin_size)
+        self.canvas.clear_tiles()
+        self._shown_tiles.clear()
+        self._filter_level(generation, levels)
+
+    # %% _draw_tile
+    def _draw_tile(self, result: tuple[tuple, np.ndarray]):
+        """
+        Show a filtered tile if it is still visible.
+
+        A tile filtered from older click data is shown until its replacement is
+        ready, and the replacement is requested. A failed tile is only forgotten, so
+        the next view change requests it again.
+
+        Arguments
+        ---------
+        result: tuple[tuple, np.ndarray]
+            Tile result stored as (Key, Tile), with None as the tile if the tile
+            worker failed.
+        """
+        key, tile = result
+        self._tile_jobs.discard(key[:5])
+        if tile is None:
+            return
+        position = key[2:5]
+        if position not in {visible[2:5] for visible in self._visible_tiles}:
+            return
+        if (self.live_filter.key is None) or (key[:2] != self.live_filter.key[:2]):
+            return
+        bin_size, row, col = position
+        span = bin_size * htiling.TILE_SIZE
+        self.canvas.set_tile(
+            position, tile[self.layer], col * span, row * span, bin_size
+        )
+        self._shown_tiles[position] = key
+        if key not in self._visible_tiles:
+            self.render_scheduler.request_redraw()
+
+    # %% _filter_level
+    def _filter_level(self, generation: int, levels: list[int]):
+        """
+        Start filtering the next level of a progressive render job.
+
+        Coarser levels are derived from the count pyramid by the worker. The last
+        level is the full-resolution heatmap, which is cached and drawn as the result
+        of the render job.
+
+        Arguments
+        ---------
+        generation: int
+            Generation number of the render job.
+        levels: list[int]
+            Bin sizes of the remaining levels, from coarse to fine.
+        """
+        bin_size = levels[0]
+        if len(levels) == 1:
+            worker = self._filter_worker(
+                self.selection,
+                (*self.heatmap_key, self._click_count(self.selection)),
+                generation,
+            )
+            worker.signals.result.connect(
+                functools.partial(self.draw, generation=generation)
+            )
+        else:
+            worker = hthreadworker.LevelFilterWorker(
+                self.get_count_pyramid(self.selection),
+                bin_size,
+                generation=generation,
+                is_current=self.render_scheduler.is_current,
+                pool=self._filter_pool,
+                sigma=hfilterengine.FILTER_SIGMA * self.bins / bin_size,
+            )
+            worker.signals.result.connect(
+                functools.partial(
+                    self._draw_preview,
+                    bin_size=bin_size,
+                    generation=generation,
+                    levels=levels[1:],
+                )
+            )
+        self.filter_worker = worker
+        self.threadpool.start(worker)
+
+    # %% _filter_worker
+    def _filter_worker(
+        self, application: str, key: tuple, generation: int = None
+    ) -> hthreadworker.FilterWorker:
+        """
+        Create the worker filtering the heatmap of an application into the cache.
+
+        Applications with few clicks get a worker that splats their clicks, without
+        building their count pyramid. The others get one that filters a copy of their
+        count grid.
+
+        Arguments
+        ---------
+        application: str
+            Application name.
+        key: tuple
+            Heatmap cache key.
+        generation: int
+            Generation number of the render job, or None for a background job.
+            Defaults to None.
+
+        Returns
+        -------
+        hthreadworker.FilterWorker
+            The filter worker, not started yet.
+        """
+        is_current = None if generation is None else self.render_scheduler.is_current
+        if self._prefer_sparse(application):
+            data = self.get_clicks(application)
+            return hthreadworker.SparseFilterWorker(
+                hhistogram.bin_clicks(
+                    data.x, data.y, data.button, self.screensize, self.bin_size
+                ),
+                hhistogram.stack_shape(self.screensize, self.bin_size),
+                self.heatmap_cache,
+                key,
+                generation,
+                is_current,
+                self.sigma,
+            )
+        # Copy the counts so the cached heatmap matches its data version exactly
+        return hthreadworker.FilterWorker(
+            self.get_count_pyramid(application).layers(self.bin_size).copy(),
+            self.heatmap_cache,
+            key,
+            generation,
+            is_current,
+            self._filter_pool,
+            self.sigma,
+        )
 
     # %% _init_gui
     def _init_gui(self):
@@ -473,6 +1015,8 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         icon_loc = str(heatmouse.THIS_DIR.joinpath("images\\heatmouse.png"))
         self.setWindowIcon(QtGui.QIcon(icon_loc))
         self.widget_Canvas.layout().addWidget(self.canvas)
+        self.canvas.resized.connect(self._canvas_resized)
+        self.canvas.view_changed.connect(self.render_scheduler.request_redraw)
         self.stackedWidget.setCurrentIndex(0)
         # Load Toolbar
         icon_loc = str(heatmouse.THIS_DIR.joinpath("images\\play.png"))
@@ -495,6 +1039,14 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         self.spinbox_FilterFactor.valueChanged.connect(self.update_filter)
         self.toolBar.addWidget(self.spinbox_FilterFactor)
         self.toolBar.addSeparator()
+        self.label_Layer = QtWidgets.QLabel("Click\nLayer:  ")
+        self.toolBar.addWidget(self.label_Layer)
+        self.combobox_Layer = QtWidgets.QComboBox()
+        self.combobox_Layer.addItems(hhistogram.LAYERS)
+        self.combobox_Layer.setCurrentIndex(self.layer)
+        self.combobox_Layer.currentIndexChanged.connect(self.update_layer)
+        self.toolBar.addWidget(self.combobox_Layer)
+        self.toolBar.addSeparator()
         self.toolBar.setVisible(False)
         # Update styles
         QtGui.QFontDatabase.addApplicationFont(
@@ -513,10 +1065,11 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         self.listWidget_ActiveApp.setItemDelegate(delegate)
         self.listWidget_ActiveApp.itemClicked.connect(self.on_listWidget_ActiveApp)
         self._populate_applist()
+        # Pre-render the most used applications while the start page is shown, once
+        # the canvas has the size that sets the bin size of the cache keys
+        applications = sorted(self.catalog, key=lambda app: self.catalog[app][0])
+        self._pending_prerender = applications[::-1][:PRERENDER_COUNT]
         self.resizeEvent(None)
-        # Initialize axes and figure
-        self._init_axes()
-        self._init_figure()
 
     # %% _load_ui
     def _load_ui(self):
@@ -530,11 +1083,10 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
         self.listWidget_Apps.clear()
         self.listWidget_ActiveApp.clear()
         item_list = []
-        for application, table in self._data.items():
+        for application, (clicks, icon_loc) in self.catalog.items():
             item = QtWidgets.QListWidgetItem()
             item.setText(application)
-            item.setData(DESC_ROLE, f"Data points: {len(table[0])}")
-            icon_loc = self.database.get_icon(application)
+            item.setData(DESC_ROLE, f"Data points: {clicks}")
             if icon_loc is None:
                 icon_loc = str(heatmouse.THIS_DIR.joinpath("images\\noicon.png"))
             item.setIcon(QtGui.QIcon(icon_loc))
@@ -543,13 +1095,102 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
                 if application == self.selection:
                     self.listWidget_ActiveApp.setCurrentItem(item)
             else:
-                item_list.append((item, len(table[0]), application))
+                item_list.append((item, clicks, application))
         item_list.sort(key=itemgetter(1), reverse=True)
         for item_tup in item_list:
             self.listWidget_Apps.addItem(item_tup[0])
             if item_tup[2] == self.selection:
                 self.listWidget_Apps.setCurrentItem(item_tup[0])
 
+    # %% _prefer_sparse
+    def _prefer_sparse(self, application: str) -> bool:
+        """
+        Check whether the heatmap of an application is splat from its clicks.
+
+        The check only reads the click count, so it never builds the count pyramid.
+
+        Arguments
+        ---------
+        application: str
+            Application name.
+
+        Returns
+        -------
+        bool
+            True if the clicks are few enough to splat them.
+        """
+        return hfilterengine.prefer_sparse(
+            self._click_count(application),
+            hhistogram.stack_shape(self.screensize, self.bin_size),
+            self.sigma,
+            self.sparse_threshold,
+        )
+
+    # %% _redraw
+    def _redraw(self):
+        """Redraw the dirty region of the live heatmap and update the tiles."""
+        if (self.dirty_region is not None) and (self.live_filter.image is not None):
+            self.canvas.update_region(
+                self.live_filter.image[self.layer], *self.dirty_region
+            )
+        self.dirty_region = None
+        self._request_tiles()
+
+    # %% _request_tiles
+    def _request_tiles(self):
+        """
+        Show the tiles the zoomed view needs, filtering the missing ones.
+
+        Tiles come from the count grid of the quadtree level matching the view
+        resolution, and are kept in the tile cache until evicted. At most one tile
+        worker runs per tile position.
+        """
+        key = self.live_filter.key
+        view = self.canvas.view
+        ratio = self.canvas.devicePixelRatioF()
+        pixel_size = view.width() / max(self.canvas.width() * ratio, 1)
+        bin_size = htiling.tile_bin_size(pixel_size)
+        if (key is None) or (self.canvas.zoom == 1) or (bin_size >= key[2]):
+            self._visible_tiles = set()
+            self._shown_tiles.clear()
+            self.canvas.clear_tiles()
+            return
+        application, bins = key[:2]
+        clicks = self._click_count(application)
+        sigma = hfilterengine.FILTER_SIGMA * bins / bin_size
+        halo = hfilterengine.get_kernel(sigma).shape[0] // 2
+        span = bin_size * htiling.TILE_SIZE
+        view = (view.left(), view.top(), view.right(), view.bottom())
+        self._visible_tiles = set()
+        for row, col in htiling.visible_tiles(view, bin_size, self.screensize):
+            tile_key = (application, bins, bin_size, row, col, clicks)
+            self._visible_tiles.add(tile_key)
+            position = tile_key[2:5]
+            if self._shown_tiles.get(position) == tile_key:
+                continue
+            tile = self.tile_cache.get(tile_key)
+            if tile is not None:
+                self.canvas.set_tile(
+                    position, tile[self.layer], col * span, row * span, bin_size
+                )
+                self._shown_tiles[position] = tile_key
+            elif tile_key[:5] not in self._tile_jobs:
+                self._tile_jobs.add(tile_key[:5])
+                pyramid = self.get_count_pyramid(application)
+                counts = htiling.tile_counts(pyramid.layers(bin_size), row, col, halo)
+                worker = hthreadworker.TileWorker(
+                    counts, halo, sigma, self.tile_cache, tile_key
+                )
+                worker.signals.result.connect(self._draw_tile)
+                self.threadpool.start(worker)
+        positions = {tile_key[2:5] for tile_key in self._visible_tiles}
+        self._shown_tiles = {
+            position: tile_key
+            for position, tile_key in self._shown_tiles.items()
+            if position in positions
+        }
+        self.canvas.clear_tiles(positions)
+
     # %% _show_error_message
     def _show_error_message(self, message: str):
         """
@@ -568,57 +1209,69 @@ class HeatMouseMainWindow(QtWidgets.QMainWindow):
 
     # %% _store_data
     def _store_data(self):
-        """Separate new data from existing data and store it in the database."""
-        all_data = copy.deepcopy(self._data)
-        for key, table_data in self.db_data.items():
-            new_data = []
-            for all_col, db_col in zip(all_data[key], table_data):
-                new_data.append(list((Counter(all_col) - Counter(db_col)).elements()))
-            all_data[key] = tuple(new_data)
-        self.database.store_all_data(all_data)
+        """Store the click data captured since the last flush in the database."""
+        self.database.store_all_data(self.session_buffer.flush())
 
     # %% _update_activeapp
     def _update_activeapp(self):
         """Update the data points value for the active application."""
         item = self.listWidget_ActiveApp.item(0)
-        item.setData(DESC_ROLE, f"Data points: {len(self.data[0])}")
+        item.setData(DESC_ROLE, f"Data points: {self.catalog[self.active_window][0]}")
 
-    # %% _update_data
-    def _update_data(self, values: tuple[str, tuple[int, int, str]]):
+    # %% _update_batch
+    def _update_batch(self, batch: list[tuple[str, tuple[int, int, str]]]):
         """
-        Update the data property with new click data.
+        Update the click counts and heatmaps with a batch of new click data.
+
+        Consecutive clicks of the same application are added in one vectorized step.
+        The active application entry is updated once, and the selection is redrawn at
+        most once per batch.
 
         Arguments
         ---------
-        values: tuple[str, tuple[int, int, str]]
-            Click event values and application name to be stored in the database.
-        """
-        event = values[1]
-        if (
-            (event[0] > self.screensize[0])
-            or (event[1] > self.screensize[1])
-            or (values[0] is None)
-        ):
-            return
-        self.active_window = values[0]
-        if self.data is None:
-            return
-        self.data[0].append(event[0])
-        self.data[1].append(event[1])
-        self.data[2].append(event[2])
-        self._update_activeapp()
-        if (not self.filter_worker_active) and (self.selection == self.active_window):
-            self.filter_task()
-        elif self.selection == self.active_window:
-            self.awaiting_filter = True
+        batch: list[tuple[str, tuple[int, int, str]]]
+            Click events stored as [(Application, (X, Y, Button)), ...].
+        """
+        render = False
+        for application, events in itertools.groupby(batch, key=itemgetter(0)):
+            x, y, clicks = zip(*(event for _, event in events))
+            x = np.asarray(x, dtype=hclickarray.COORD_DTYPE)
+            y = np.asarray(y, dtype=hclickarray.COORD_DTYPE)
+            inside = (x <= self.screensize[0]) & (y <= self.screensize[1])
+            if (application is None) or (not inside.any()):
+                continue
+            self.active_window = application
+            if self.active_window is None:
+                continue
+            x, y = x[inside], y[inside]
+            buttons = hclickarray.encode_buttons(np.asarray(clicks)[inside])
+            count, icon = self.catalog[self.active_window]
+            self.catalog[self.active_window] = (count + len(x), icon)
+            pyramid = self._count_pyramids.get((self.active_window,))
+            if pyramid is not None:
+                pyramid.add_many(x, y, buttons)
+            self.session_buffer.extend(self.active_window, x, y, buttons)
+            if self.selection != self.active_window:
+                continue
+            if (not render) and (not self.render_scheduler.busy):
+                if self.live_filter.is_valid(self.heatmap_key):
+                    self._draw_clicks(x, y, buttons)
+                    continue
+            render = True
+        if self.active_window is not None:
+            self._update_activeapp()
+        if render:
+            self.render_scheduler.request()
 
     # %% _window_change
     def _window_change(self):
         """Update the data, GUI, and plot window upon active window change."""
-        if self.database.get_icon(self.active_window) is None:
-            icon = hactiveicon.get_active_window_icon(self.active_window)
-            self.database.store_icon(self.active_window, icon)
-            self.data
+        if self.active_window is not None:
+            clicks, icon = self.catalog.get(self.active_window, (0, None))
+            if icon is None:
+                icon = self.backend.window_icon(self.active_window)
+                self.database.store_icon(self.active_window, icon)
+            self.catalog[self.active_window] = (clicks, icon)
         self._populate_applist()
         self.label_Title.setText(self.selection)
-        self.canvas.resize_event()
+        self.canvas.update()
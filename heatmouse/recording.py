@@ -0,0 +1,344 @@
+"""
+The session recording class used by Heat Mouse to reproduce sessions.
+
+A recording stores the time, application, position and button of every click of a
+session in order. On disk it is a compressed NumPy archive with one array per column.
+Times are stored as microsecond delays between consecutive clicks and applications
+as indices into a list of names, so a click takes a few bytes once compressed.
+
+Classes
+-------
+SessionRecording
+    Ordered, NumPy-backed recording of the clicks of a session.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import numpy as np
+
+import heatmouse.clickarray as hclickarray
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% APPLICATION_DTYPE
+APPLICATION_DTYPE = np.uint16
+# %% DELAY_DTYPE
+DELAY_DTYPE = np.dtype("<u8")
+# %% RECORD_VARIABLE
+RECORD_VARIABLE = "HEATMOUSE_RECORD"
+# %% RECORDING_VERSION
+RECORDING_VERSION = 1
+# %% TIME_RESOLUTION
+TIME_RESOLUTION = 1e-6
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% SessionRecording
+class SessionRecording:
+    """
+    Ordered, NumPy-backed recording of the clicks of a session.
+
+    Properties
+    ----------
+    application : np.ndarray
+        Get the application indices of the recorded clicks.
+    applications : list[str]
+        Get the names of the recorded applications.
+    clicks : hclickarray.ClickArray
+        Get the recorded clicks, with their timestamps.
+    screensize : tuple[int, int]
+        Get the screen size of the recorded session.
+
+    Methods
+    -------
+    append
+        Add a click to the recording.
+    from_columns
+        Create a recording from column data.
+    load
+        Load a recording from a file.
+    save
+        Save the recording to a file.
+
+    Protected Methods
+    -----------------
+    _code
+        Get the application index of an application name, adding new names.
+    _codes
+        Get the application indices of application names, adding new names.
+    _reserve
+        Grow the application array so it can hold at least `size` clicks.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self, screensize: tuple[int, int]):
+        self._application = np.empty(hclickarray.MIN_CAPACITY, dtype=APPLICATION_DTYPE)
+        self._applications: list[str] = []
+        self._clicks = hclickarray.ClickArray(timestamps=True)
+        self._indices: dict[str:int] = {}
+        self._screensize = tuple(int(size) for size in screensize)
+
+    # %% __len__
+    def __len__(self) -> int:
+        return len(self._clicks)
+
+    # %% __repr__
+    def __repr__(self) -> str:
+        return (
+            f"SessionRecording(size={len(self)}, "
+            f"applications={len(self._applications)})"
+        )
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% application
+    @property
+    def application(self) -> np.ndarray:
+        """
+        Get the application indices of the recorded clicks.
+
+        Returns
+        -------
+        np.ndarray
+            Zero-copy view of the indices into `applications`.
+        """
+        return self._application[: len(self)]
+
+    # %% applications
+    @property
+    def applications(self) -> list[str]:
+        """
+        Get the names of the recorded applications.
+
+        Returns
+        -------
+        list[str]
+            Application names, in order of their first click.
+        """
+        return self._applications
+
+    # %% clicks
+    @property
+    def clicks(self) -> hclickarray.ClickArray:
+        """
+        Get the recorded clicks, with their timestamps.
+
+        Returns
+        -------
+        hclickarray.ClickArray
+            Recorded clicks.
+        """
+        return self._clicks
+
+    # %% screensize
+    @property
+    def screensize(self) -> tuple[int, int]:
+        """
+        Get the screen size of the recorded session.
+
+        Returns
+        -------
+        tuple[int, int]
+            Screensize tuple stored as (X, Y).
+        """
+        return self._screensize
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% append
+    def append(
+        self,
+        timestamp: float,
+        application: str,
+        x_position: int,
+        y_position: int,
+        click: str,
+    ):
+        """
+        Add a click to the recording.
+
+        Arguments
+        ---------
+        timestamp: float
+            The time of the click in seconds.
+        application: str
+            Application name.
+        x_position: int
+            The X-position on the screen.
+        y_position: int
+            The Y-position on the screen.
+        click: str
+            The button pressed on the mouse.
+        """
+        self._reserve(len(self) + 1)
+        self._application[len(self)] = self._code(application)
+        self._clicks.append(x_position, y_position, click, timestamp)
+
+    # %% from_columns
+    @classmethod
+    def from_columns(
+        cls,
+        screensize: tuple[int, int],
+        timestamp: np.ndarray,
+        application: list[str],
+        x: np.ndarray,
+        y: np.ndarray,
+        button: np.ndarray,
+    ) -> "SessionRecording":
+        """
+        Create a recording from column data.
+
+        Arguments
+        ---------
+        screensize: tuple[int, int]
+            Screensize tuple stored as (X, Y).
+        timestamp: np.ndarray
+            The times of the clicks in seconds.
+        application: list[str]
+            The application names of the clicks.
+        x: np.ndarray
+            The X-positions on the screen.
+        y: np.ndarray
+            The Y-positions on the screen.
+        button: np.ndarray
+            The button codes.
+
+        Returns
+        -------
+        SessionRecording
+            The new recording.
+        """
+        recording = cls(screensize)
+        recording._reserve(len(x))
+        recording._application[: len(x)] = recording._codes(application)
+        recording._clicks.extend(
+            np.asarray(x, dtype=hclickarray.COORD_DTYPE),
+            np.asarray(y, dtype=hclickarray.COORD_DTYPE),
+            np.asarray(button, dtype=hclickarray.BUTTON_DTYPE),
+            np.asarray(timestamp, dtype=hclickarray.TIME_DTYPE),
+        )
+        return recording
+
+    # %% load
+    @classmethod
+    def load(cls, path: str) -> "SessionRecording":
+        """
+        Load a recording from a file.
+
+        Arguments
+        ---------
+        path: str
+            Path of the recording file.
+
+        Returns
+        -------
+        SessionRecording
+            The loaded recording.
+        """
+        with np.load(path) as archive:
+            version = int(archive["version"])
+            if version != RECORDING_VERSION:
+                raise ValueError(f'Unsupported recording version: "{version}"')
+            recording = cls(archive["screensize"].tolist())
+            recording._codes(archive["applications"].tolist())
+            application = archive["application"]
+            recording._reserve(len(application))
+            recording._application[: len(application)] = application
+            delay = archive["delay"].astype(np.int64)
+            recording._clicks.extend(
+                archive["x"],
+                archive["y"],
+                archive["button"],
+                float(archive["start"]) + np.cumsum(delay) * TIME_RESOLUTION,
+            )
+        return recording
+
+    # %% save
+    def save(self, path: str):
+        """
+        Save the recording to a file.
+
+        Arguments
+        ---------
+        path: str
+            Path of the recording file.
+        """
+        timestamp = self._clicks.timestamp
+        start = float(timestamp[0]) if len(self) else 0.0
+        ticks = np.round((timestamp - start) / TIME_RESOLUTION).astype(np.int64)
+        # The wall clock may step backwards between clicks
+        ticks = np.maximum.accumulate(ticks)
+        with open(path, "wb") as file:
+            np.savez_compressed(
+                file,
+                version=np.array(RECORDING_VERSION),
+                screensize=np.array(self._screensize),
+                start=np.array(start),
+                delay=np.diff(ticks, prepend=0).astype(DELAY_DTYPE),
+                applications=np.array(self._applications, dtype=str),
+                application=self.application,
+                x=self._clicks.x,
+                y=self._clicks.y,
+                button=self._clicks.button,
+            )
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _code
+    def _code(self, application: str) -> int:
+        """
+        Get the application index of an application name, adding new names.
+
+        Arguments
+        ---------
+        application: str
+            Application name.
+
+        Returns
+        -------
+        int
+            Index into `applications`.
+        """
+        code = self._indices.get(application)
+        if code is None:
+            code = self._indices[application] = len(self._applications)
+            self._applications.append(application)
+        return code
+
+    # %% _codes
+    def _codes(self, applications: list[str]) -> np.ndarray:
+        """
+        Get the application indices of application names, adding new names.
+
+        Arguments
+        ---------
+        applications: list[str]
+            Application names.
+
+        Returns
+        -------
+        np.ndarray
+            Indices into `applications`.
+        """
+        names, first, inverse = np.unique(
+            np.asarray(applications, dtype=str), return_index=True, return_inverse=True
+        )
+        codes = np.empty(len(names), dtype=APPLICATION_DTYPE)
+        for index in np.argsort(first, kind="stable").tolist():
+            codes[index] = self._code(str(names[index]))
+        return codes[inverse.ravel()]
+
+    # %% _reserve
+    def _reserve(self, size: int):
+        """
+        Grow the application array so it can hold at least `size` clicks.
+
+        Arguments
+        ---------
+        size: int
+            Required capacity.
+        """
+        capacity = len(self._application)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        application = np.empty(capacity, dtype=APPLICATION_DTYPE)
+        application[: len(self)] = self.application
+        self._application = application
@@ -0,0 +1,282 @@
+"""
+The render scheduler class used by Heat Mouse to pace heatmap updates.
+
+Classes
+-------
+RenderScheduler
+    Coalesces heatmap render requests, caps the frame rate and drops stale frames.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import time
+from typing import Callable
+
+from PyQt5 import QtCore
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% DEFAULT_MAX_FPS
+DEFAULT_MAX_FPS = 30
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% RenderScheduler
+class RenderScheduler(QtCore.QObject):
+    """
+    Coalesces heatmap render requests, caps the frame rate and drops stale frames.
+
+    Two kinds of work are scheduled. A render job recomputes the filtered heatmap in
+    a worker thread, and a redraw only repaints the heatmap that is already shown.
+    Requests that arrive while work is pending are merged into one, and work starts
+    at most `max_fps` times per second. Only one render job is current at a time.
+
+    Every render job is tagged with a generation number. Starting a job or calling
+    `invalidate` makes earlier generations stale, so their results are dropped and
+    workers can abort early. Lives on the GUI thread.
+
+    Properties
+    ----------
+    busy : bool
+        Get whether the current render job is still running.
+    dropped_frames : int
+        Get the number of stale render results that were dropped.
+    generation : int
+        Get the generation number of the current render job.
+    max_fps : int
+        Get or set the maximum number of frames per second.
+    queue_depth : int
+        Get the number of requests merged into the pending work.
+
+    Methods
+    -------
+    finish
+        Report the result of a render job and check that it is current.
+    invalidate
+        Make the running render job stale.
+    is_current
+        Check whether a generation belongs to the current render job.
+    request
+        Request a render job.
+    request_redraw
+        Request a redraw of the shown heatmap.
+    stats
+        Get the scheduler statistics.
+    stop
+        Stop scheduling work and make the running render job stale.
+
+    Protected Methods
+    -----------------
+    _dispatch
+        Start the pending work if the frame rate cap allows it.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(
+        self,
+        render: Callable[[int], None],
+        redraw: Callable[[], None],
+        max_fps: int = DEFAULT_MAX_FPS,
+        parent: QtCore.QObject = None,
+    ):
+        super().__init__(parent)
+        self._render = render
+        self._redraw = redraw
+        self._max_fps = max_fps
+        self._busy = False
+        self._generation = 0
+        self._last_frame = None
+        self._pending_render = False
+        self._pending_redraw = False
+        self._queue_depth = 0
+        self._stopped = False
+        self._coalesced = 0
+        self._dropped_frames = 0
+        self._frames = 0
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._dispatch)
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% busy
+    @property
+    def busy(self) -> bool:
+        """
+        Get whether the current render job is still running.
+
+        Returns
+        -------
+        bool
+            True if a render job is running.
+        """
+        return self._busy
+
+    # %% dropped_frames
+    @property
+    def dropped_frames(self) -> int:
+        """
+        Get the number of stale render results that were dropped.
+
+        Returns
+        -------
+        int
+            Number of dropped frames.
+        """
+        return self._dropped_frames
+
+    # %% generation
+    @property
+    def generation(self) -> int:
+        """
+        Get the generation number of the current render job.
+
+        Returns
+        -------
+        int
+            Generation number.
+        """
+        return self._generation
+
+    # %% max_fps
+    @property
+    def max_fps(self) -> int:
+        """
+        Get or set the maximum number of frames per second.
+
+        Returns
+        -------
+        int
+            Maximum frame rate.
+        """
+        return self._max_fps
+
+    @max_fps.setter
+    def max_fps(self, value):
+        self._max_fps = max(int(value), 1)
+
+    # %% queue_depth
+    @property
+    def queue_depth(self) -> int:
+        """
+        Get the number of requests merged into the pending work.
+
+        Returns
+        -------
+        int
+            Number of pending requests.
+        """
+        return self._queue_depth
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% finish
+    def finish(self, generation: int) -> bool:
+        """
+        Report the result of a render job and check that it is current.
+
+        Arguments
+        ---------
+        generation: int
+            Generation number of the finished render job.
+
+        Returns
+        -------
+        bool
+            True if the result should be drawn, False if it is stale.
+        """
+        current = self.is_current(generation)
+        if current:
+            self._busy = False
+            self._frames += 1
+        else:
+            self._dropped_frames += 1
+        self._dispatch()
+        return current
+
+    # %% invalidate
+    def invalidate(self):
+        """Make the running render job stale."""
+        self._generation += 1
+        self._busy = False
+
+    # %% is_current
+    def is_current(self, generation: int) -> bool:
+        """
+        Check whether a generation belongs to the current render job.
+
+        Safe to call from worker threads.
+
+        Arguments
+        ---------
+        generation: int
+            Generation number of a render job.
+
+        Returns
+        -------
+        bool
+            True if the render job is current.
+        """
+        return (generation == self._generation) and (not self._stopped)
+
+    # %% request
+    def request(self):
+        """Request a render job."""
+        self._pending_render = True
+        self._queue_depth += 1
+        self._dispatch()
+
+    # %% request_redraw
+    def request_redraw(self):
+        """Request a redraw of the shown heatmap."""
+        self._pending_redraw = True
+        self._queue_depth += 1
+        self._dispatch()
+
+    # %% stats
+    def stats(self) -> dict[str:int]:
+        """
+        Get the scheduler statistics.
+
+        Returns
+        -------
+        dict[str: int]
+            Statistics stored as {Name: Value}.
+        """
+        return {
+            "frames": self._frames,
+            "queue_depth": self._queue_depth,
+            "coalesced": self._coalesced,
+            "dropped_frames": self._dropped_frames,
+        }
+
+    # %% stop
+    def stop(self):
+        """Stop scheduling work and make the running render job stale."""
+        self._stopped = True
+        self._timer.stop()
+        self.invalidate()
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _dispatch
+    def _dispatch(self):
+        """Start the pending work if the frame rate cap allows it."""
+        if self._stopped or self._busy:
+            return
+        if not (self._pending_render or self._pending_redraw):
+            return
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            wait = self._last_frame + 1 / self._max_fps - now
+            if wait > 0:
+                if not self._timer.isActive():
+                    self._timer.start(int(wait * 1000) + 1)
+                return
+        self._last_frame = now
+        self._coalesced += max(self._queue_depth - 1, 0)
+        self._queue_depth = 0
+        self._pending_redraw = False
+        if self._pending_render:
+            self._pending_render = False
+            self._generation += 1
+            self._busy = True
+            self._render(self._generation)
+        else:
+            self._redraw()
@@ -0,0 +1,121 @@
+"""
+The session buffer class used by Heat Mouse to track unsaved click data.
+
+Classes
+-------
+SessionBuffer
+    Tracks the click data captured since the last flush to the database.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import numpy as np
+
+import heatmouse.clickarray as hclickarray
+
+
+# %% --- Classes -----------------------------------------------------------------------
+# %% SessionBuffer
+class SessionBuffer:
+    """
+    Tracks the click data captured since the last flush to the database.
+
+    Properties
+    ----------
+    data : dict[str : hclickarray.ClickArray]
+        Get the unsaved click data.
+
+    Methods
+    -------
+    append
+        Add a click to the buffer.
+    extend
+        Add several clicks of an application to the buffer.
+    flush
+        Return the unsaved click data and empty the buffer.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(self):
+        self._data: dict[str : hclickarray.ClickArray] = {}
+
+    # %% __len__
+    def __len__(self) -> int:
+        return sum(len(table) for table in self._data.values())
+
+    # %% --- Properties ----------------------------------------------------------------
+    # %% data
+    @property
+    def data(self) -> dict[str : hclickarray.ClickArray]:
+        """
+        Get the unsaved click data.
+
+        Returns
+        -------
+        dict[str : hclickarray.ClickArray]
+            Dictionary stored as: {Application-Name: Click-Data}
+        """
+        return self._data
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% append
+    def append(self, application: str, x_position: int, y_position: int, click: str):
+        """
+        Add a click to the buffer.
+
+        Arguments
+        ---------
+        application: str
+            Application name.
+        x_position: int
+            The X-position on the screen.
+        y_position: int
+            The Y-position on the screen.
+        click: str
+            The button pressed on the mouse.
+        """
+        table = self._data.get(application)
+        if table is None:
+            table = self._data[application] = hclickarray.ClickArray()
+        table.append(x_position, y_position, click)
+
+    # %% extend
+    def extend(
+        self,
+        application: str,
+        x_position: np.ndarray,
+        y_position: np.ndarray,
+        button: np.ndarray,
+    ):
+        """
+        Add several clicks of an application to the buffer.
+
+        Arguments
+        ---------
+        application: str
+            Application name.
+        x_position: np.ndarray
+            The X-positions on the screen.
+        y_position: np.ndarray
+            The Y-positions on the screen.
+        button: np.ndarray
+            The button codes.
+        """
+        table = self._data.get(application)
+        if table is None:
+            table = self._data[application] = hclickarray.ClickArray()
+        table.extend(x_position, y_position, button)
+
+    # %% flush
+    def flush(self) -> dict[str : hclickarray.ClickArray]:
+        """
+        Return the unsaved click data and empty the buffer.
+
+        Returns
+        -------
+        dict[str : hclickarray.ClickArray]
+            Dictionary stored as: {Application-Name: Click-Data}
+        """
+        data = self._data
+        self._data = {}
+        return data
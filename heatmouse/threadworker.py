@@ -5,22 +5,43 @@ Classes
 -------
 FilterWorker
     The Gaussian filter worker thread.
+LevelFilterWorker
+    The Gaussian filter worker thread for a level of a count pyramid.
 ListenerWorker
     The mouse listener worker thread.
+SparseFilterWorker
+    The Gaussian filter worker thread for applications with few clicks.
+TileWorker
+    The heatmap tile filter worker thread.
 WorkerSignals
     Defines the signals available from a running worker thread.
 """
 
 # %% --- Imports -----------------------------------------------------------------------
+import concurrent.futures
 import threading
+import time
+from typing import Callable
 
 import numpy as np
-from astropy.convolution import convolve
-from astropy.convolution.kernels import Gaussian2DKernel
 from PyQt5 import QtCore
 
 import heatmouse.activewindow as hactivewindow
+import heatmouse.capture as hcapture
+import heatmouse.clickarray as hclickarray
+import heatmouse.filterengine as hfilterengine
+import heatmouse.filterpool as hfilterpool
+import heatmouse.heatmapcache as hheatmapcache
+import heatmouse.histogram as hhistogram
 import heatmouse.listener as hlistener
+import heatmouse.recording as hrecording
+import heatmouse.tiling as htiling
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% BATCH_INTERVAL
+BATCH_INTERVAL = 0.05
+# %% BATCH_SIZE
+BATCH_SIZE = 256
 
 
 # %% --- Classes -----------------------------------------------------------------------
@@ -29,67 +50,218 @@ class FilterWorker(QtCore.QRunnable):
     """
     The Gaussian filter worker thread.
 
+    Only computes the filtered heatmap array and emits it. The worker never touches
+    widgets, so several workers may run at once. Given a filter pool, the worker hands
+    the filter to a worker process and only waits for it. A worker started with a
+    generation number aborts as soon as `is_current` reports that its render job is
+    stale, and then emits None as its result. A worker whose filter fails emits None
+    as well.
+
     Methods
     -------
     run
         Run the Gaussian filter worker thread.
+
+    Protected Methods
+    -----------------
+    _emit
+        Emit the result and finished signals.
+    _filter
+        Filter the counts into a heatmap array.
+    _is_stale
+        Check whether the render job of the worker is stale.
     """
 
     # %% --- Dunder Methods ------------------------------------------------------------
     # %% __init__
-    def __init__(self, heatmap, data, bins, axes):
+    def __init__(
+        self,
+        counts: np.ndarray,
+        cache: hheatmapcache.HeatmapCache = None,
+        key: tuple = None,
+        generation: int = None,
+        is_current: Callable[[int], bool] = None,
+        pool: hfilterpool.FilterPool = None,
+        sigma: float = hfilterengine.FILTER_SIGMA,
+    ):
         super().__init__()
         self.signals = WorkerSignals()
-        self.data = data
-        self.heatmap = heatmap
-        self.bins = bins
-        self.axes = axes
+        self.counts = counts
+        self.cache = cache
+        self.key = key
+        self.generation = generation
+        self.is_current = is_current
+        self.pool = pool
+        self.sigma = sigma
 
     # %% --- Methods -------------------------------------------------------------------
     # %% run
     @QtCore.pyqtSlot()
     def run(self):
         """Run the Gaussian filter worker thread."""
-        heatmap, _, _ = np.histogram2d(
-            self.data[1],
-            self.data[0],
-            bins=self.bins,
-        )
-        if self.heatmap is None:
-            self.heatmap = self.axes.imshow(
-                convolve(heatmap, Gaussian2DKernel(2, 2)),
-                cmap="viridis",
-                extent=[0, len(self.bins[1]), 0, len(self.bins[0])],
-            )
-        else:
-            self.heatmap.set_array(convolve(heatmap, Gaussian2DKernel(2, 2)))
+        if self._is_stale():
+            self._emit(None)
+            return
+        try:
+            heatmap = self._filter()
+        except (concurrent.futures.CancelledError, RuntimeError):
+            # The filter pool was shut down
+            self._emit(None)
+            return
+        except Exception as e:
+            # Still emit a result, so the render job does not stay busy
+            print(f"Error filtering heatmap: {str(e)}")
+            self._emit(None)
+            return
+        if self.cache is not None:
+            self.cache.put(self.key, heatmap)
+        if self._is_stale():
+            self._emit(None)
+            return
+        self._emit(heatmap)
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _emit
+    def _emit(self, result):
+        """
+        Emit the result and finished signals.
 
+        Arguments
+        ---------
+        result
+            Filtered heatmap array, or None if the worker aborted.
+        """
         try:
-            self.signals.result.emit(self.heatmap)
+            self.signals.result.emit(result)
             self.signals.finished.emit()
         except RuntimeError:
             pass
 
+    # %% _filter
+    def _filter(self) -> np.ndarray:
+        """
+        Filter the counts into a heatmap array.
+
+        Returns
+        -------
+        np.ndarray
+            Filtered heatmap array.
+        """
+        if self.pool is None:
+            return hfilterengine.filter_counts(self.counts, sigma=self.sigma)
+        return self.pool.filter(self.counts, self.sigma)
+
+    # %% _is_stale
+    def _is_stale(self) -> bool:
+        """
+        Check whether the render job of the worker is stale.
+
+        Returns
+        -------
+        bool
+            True if the worker should abort.
+        """
+        if self.is_current is None:
+            return False
+        return not self.is_current(self.generation)
+
+
+# %% LevelFilterWorker
+class LevelFilterWorker(FilterWorker):
+    """
+    The Gaussian filter worker thread for a level of a count pyramid.
+
+    Copies the counts of the level from the pyramid before filtering them, so a level
+    the pyramid does not keep yet is derived on the worker thread instead of the GUI
+    thread. Otherwise behaves like `FilterWorker`.
+
+    Protected Methods
+    -----------------
+    _filter
+        Copy the counts of the level and filter them into a heatmap array.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(
+        self,
+        pyramid: hhistogram.CountPyramid,
+        bin_size: int,
+        cache: hheatmapcache.HeatmapCache = None,
+        key: tuple = None,
+        generation: int = None,
+        is_current: Callable[[int], bool] = None,
+        pool: hfilterpool.FilterPool = None,
+        sigma: float = hfilterengine.FILTER_SIGMA,
+    ):
+        super().__init__(None, cache, key, generation, is_current, pool, sigma)
+        self.pyramid = pyramid
+        self.bin_size = bin_size
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _filter
+    def _filter(self) -> np.ndarray:
+        """
+        Copy the counts of the level and filter them into a heatmap array.
+
+        Returns
+        -------
+        np.ndarray
+            Filtered heatmap array.
+        """
+        self.counts = self.pyramid.copy_layers(self.bin_size)
+        return super()._filter()
+
 
 # %% ListenerWorker
 class ListenerWorker(QtCore.QRunnable):
     """
     The mouse listener worker thread.
 
+    Events are emitted in batches as lists of (Application, Event) tuples. A batch
+    starts with the first event after an idle wait and collects the events that
+    follow it for up to `batch_interval` seconds or `batch_size` events, so a burst
+    of clicks costs one cross-thread signal instead of one per click. Events are
+    drained from the event ring of the listener in bulk as they arrive. Given a
+    recording path, the events are also recorded with the time they were received and
+    saved to the path when the worker ends.
+
     Methods
     -------
     stop
         Stop the listener worker.
     run
         Run the listener worker thread.
+
+    Protected Methods
+    -----------------
+    _next_batch
+        Wait for the next batch of events.
+    _tag
+        Tag an event with the active application, and record it.
     """
 
     # %% --- Dunder Methods ------------------------------------------------------------
     # %% __init__
-    def __init__(self):
+    def __init__(
+        self,
+        backend: hcapture.CaptureBackend = None,
+        batch_interval: float = BATCH_INTERVAL,
+        batch_size: int = BATCH_SIZE,
+        recording_path: str = None,
+    ):
         super().__init__()
+        if backend is None:
+            backend = hcapture.get_backend()
         self.signals = WorkerSignals()
-        self.key_listener = hlistener.KeyListener()
+        self.backend = backend
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self.recording_path = recording_path
+        self.recording: hrecording.SessionRecording = None
+        if recording_path is not None:
+            self.recording = hrecording.SessionRecording(backend.screensize())
+        self.key_listener = hlistener.KeyListener(backend)
         self.event_thread = threading.Thread(target=self.key_listener.run)
 
     # %% --- Methods -------------------------------------------------------------------
@@ -103,16 +275,181 @@ class ListenerWorker(QtCore.QRunnable):
     def run(self):
         """Run the listener worker thread."""
         try:
-            active_window = hactivewindow.ActiveWindow()
+            active_window = hactivewindow.ActiveWindow(self.backend.window_provider())
             self.event_thread.daemon = True
             self.event_thread.start()
-            while self.event_thread.is_alive():
-                event = self.key_listener.get_next_event(timeout=1)
-                if event:
-                    self.signals.update.emit((active_window.window, event))
+            event_ring = self.key_listener.event_ring
+            # Keep draining after a finite click source ends
+            while not (event_ring.closed and event_ring.empty()):
+                batch = self._next_batch(active_window)
+                if batch:
+                    self.signals.batch.emit(batch)
+            active_window.close()
+            if self.recording is not None:
+                self.recording.save(self.recording_path)
         except Exception as e:
             self.signals.error.emit(e)
 
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _next_batch
+    def _next_batch(
+        self, active_window: hactivewindow.ActiveWindow, timeout: float = 1
+    ) -> list[tuple[str, tuple[int, int, str]]]:
+        """
+        Wait for the next batch of events.
+
+        Arguments
+        ---------
+        active_window: hactivewindow.ActiveWindow
+            Active window object tagging each event with its application.
+        timeout: float
+            Time in seconds to wait for the first event. Defaults to 1.
+
+        Returns
+        -------
+        list[tuple[str, tuple[int, int, str]]]
+            Batch stored as [(Application, (X, Y, Button)), ...], empty if no event
+            arrived in time.
+        """
+        event_ring = self.key_listener.event_ring
+        if not event_ring.wait(timeout):
+            return []
+        batch = []
+        deadline = time.monotonic() + self.batch_interval
+        while True:
+            x, y, buttons = event_ring.drain(self.batch_size - len(batch))
+            buttons = [hclickarray.BUTTONS[button] for button in buttons.tolist()]
+            for event in zip(x.tolist(), y.tolist(), buttons):
+                batch.append(self._tag(active_window, event))
+            remaining = deadline - time.monotonic()
+            if (len(batch) >= self.batch_size) or (remaining <= 0):
+                break
+            if not event_ring.wait(remaining):
+                break
+        return batch
+
+    # %% _tag
+    def _tag(
+        self, active_window: hactivewindow.ActiveWindow, event: tuple[int, int, str]
+    ) -> tuple[str, tuple[int, int, str]]:
+        """
+        Tag an event with the active application, and record it.
+
+        Arguments
+        ---------
+        active_window: hactivewindow.ActiveWindow
+            Active window object giving the application of the event.
+        event: tuple[int, int, str]
+            Click event stored as (X, Y, Button).
+
+        Returns
+        -------
+        tuple[str, tuple[int, int, str]]
+            Event stored as (Application, (X, Y, Button)).
+        """
+        application = active_window.window
+        if (self.recording is not None) and (application is not None):
+            self.recording.append(time.time(), application, *event)
+        return application, event
+
+
+# %% SparseFilterWorker
+class SparseFilterWorker(FilterWorker):
+    """
+    The Gaussian filter worker thread for applications with few clicks.
+
+    Splats the kernel at every click instead of filtering a dense count grid, and
+    otherwise behaves like `FilterWorker`. The splat is cheap, so it never uses a
+    filter pool.
+
+    Protected Methods
+    -----------------
+    _filter
+        Splat the clicks into a heatmap array.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(
+        self,
+        index: np.ndarray,
+        shape: tuple[int, int, int],
+        cache: hheatmapcache.HeatmapCache = None,
+        key: tuple = None,
+        generation: int = None,
+        is_current: Callable[[int], bool] = None,
+        sigma: float = hfilterengine.FILTER_SIGMA,
+    ):
+        super().__init__(None, cache, key, generation, is_current, None, sigma)
+        self.index = index
+        self.shape = shape
+
+    # %% --- Protected Methods ---------------------------------------------------------
+    # %% _filter
+    def _filter(self) -> np.ndarray:
+        """
+        Splat the clicks into a heatmap array.
+
+        Returns
+        -------
+        np.ndarray
+            Filtered heatmap array.
+        """
+        engine = hfilterengine.get_engine(hfilterengine.SparseEngine.name, self.sigma)
+        return engine.splat(self.index, self.shape)
+
+
+# %% TileWorker
+class TileWorker(QtCore.QRunnable):
+    """
+    The heatmap tile filter worker thread.
+
+    Filters the counts of one quadtree tile, stores the tile in the tile cache and
+    emits it as (Key, Tile). A worker whose filter fails emits None as its tile, so
+    the tile can be requested again.
+
+    Methods
+    -------
+    run
+        Run the heatmap tile filter worker thread.
+    """
+
+    # %% --- Dunder Methods ------------------------------------------------------------
+    # %% __init__
+    def __init__(
+        self,
+        counts: np.ndarray,
+        halo: int,
+        sigma: float,
+        cache: hheatmapcache.HeatmapCache,
+        key: tuple,
+    ):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.counts = counts
+        self.halo = halo
+        self.sigma = sigma
+        self.cache = cache
+        self.key = key
+
+    # %% --- Methods -------------------------------------------------------------------
+    # %% run
+    @QtCore.pyqtSlot()
+    def run(self):
+        """Run the heatmap tile filter worker thread."""
+        try:
+            tile = htiling.filter_tile(self.counts, self.halo, self.sigma)
+        except Exception as e:
+            print(f"Error filtering heatmap tile: {str(e)}")
+            tile = None
+        else:
+            self.cache.put(self.key, tile)
+        try:
+            self.signals.result.emit((self.key, tile))
+            self.signals.finished.emit()
+        except RuntimeError:
+            pass
+
 
 # %% WorkerSignals
 class WorkerSignals(QtCore.QObject):
@@ -120,6 +457,8 @@ class WorkerSignals(QtCore.QObject):
     Defines the signals available from a running worker thread.
 
     Supported signals are:
+    batch
+        `list` data collected during processing, emitted at once
     error
         `tuple` (exctype, value, traceback.format_exc() )
     finished
@@ -130,6 +469,7 @@ class WorkerSignals(QtCore.QObject):
         `tuple` data updated during processing, anything
     """
 
+    batch = QtCore.pyqtSignal(list)
     error = QtCore.pyqtSignal(tuple)
     finished = QtCore.pyqtSignal()
     result = QtCore.pyqtSignal(object)
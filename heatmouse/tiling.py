@@ -0,0 +1,147 @@
+"""
+The quadtree tiling functions used by Heat Mouse to render zoomed heatmaps.
+
+Level bin sizes are powers of two, so each tile splits into four tiles of the next
+finer level. A tile covers `TILE_SIZE` by `TILE_SIZE` bins of its level, and tiles at
+the bottom and right edges of the screen are cropped to the count grid. Stacked count
+grids are tiled along their last two axes, keeping every layer.
+
+Functions
+---------
+filter_tile
+    Filter the counts of a tile and crop away the halo.
+tile_bin_size
+    Get the bin size of the quadtree level for a view resolution.
+tile_counts
+    Get the counts of a tile with a zero-padded halo.
+visible_tiles
+    Get the tiles of a quadtree level that overlap a view.
+"""
+
+# %% --- Imports -----------------------------------------------------------------------
+import math
+
+import numpy as np
+
+import heatmouse.filterengine as hfilterengine
+
+# %% --- Constants ---------------------------------------------------------------------
+# %% TILE_SIZE
+TILE_SIZE = 256
+
+
+# %% --- Functions ---------------------------------------------------------------------
+# %% filter_tile
+def filter_tile(counts: np.ndarray, halo: int, sigma: float) -> np.ndarray:
+    """
+    Filter the counts of a tile and crop away the halo.
+
+    The halo holds the neighbouring counts within the kernel radius, so the filtered
+    tile matches the same region of a fully filtered grid.
+
+    Arguments
+    ---------
+    counts: np.ndarray
+        Tile counts with a halo, from `tile_counts`.
+    halo: int
+        Width of the halo in bins.
+    sigma: float
+        Standard deviation of the Gaussian filter in bins.
+
+    Returns
+    -------
+    np.ndarray
+        Filtered tile.
+    """
+    heatmap = hfilterengine.filter_counts(counts, sigma=sigma)
+    rows, cols = heatmap.shape[-2:]
+    return heatmap[..., halo : rows - halo, halo : cols - halo].copy()
+
+
+# %% tile_bin_size
+def tile_bin_size(pixel_size: float) -> int:
+    """
+    Get the bin size of the quadtree level for a view resolution.
+
+    Arguments
+    ---------
+    pixel_size: float
+        Screen pixels per device pixel of the view.
+
+    Returns
+    -------
+    int
+        Largest power-of-two bin size that is not coarser than a device pixel.
+    """
+    return 2 ** int(math.floor(math.log2(max(pixel_size, 1))))
+
+
+# %% tile_counts
+def tile_counts(counts: np.ndarray, row: int, col: int, halo: int) -> np.ndarray:
+    """
+    Get the counts of a tile with a zero-padded halo.
+
+    Arguments
+    ---------
+    counts: np.ndarray
+        Count grid of the tile level, or a stack of grids along the leading axes.
+    row: int
+        Tile row.
+    col: int
+        Tile column.
+    halo: int
+        Width of the halo in bins.
+
+    Returns
+    -------
+    np.ndarray
+        New array of the tile counts, surrounded by `halo` bins on every side.
+    """
+    *layers, rows, cols = counts.shape
+    row0, col0 = row * TILE_SIZE, col * TILE_SIZE
+    row1 = min(row0 + TILE_SIZE, rows)
+    col1 = min(col0 + TILE_SIZE, cols)
+    tile = np.zeros(
+        (*layers, row1 - row0 + 2 * halo, col1 - col0 + 2 * halo), dtype=counts.dtype
+    )
+    src_row0, src_col0 = max(row0 - halo, 0), max(col0 - halo, 0)
+    src_row1 = min(row1 + halo, rows)
+    src_col1 = min(col1 + halo, cols)
+    tile[
+        ...,
+        src_row0 - (row0 - halo) : src_row1 - (row0 - halo),
+        src_col0 - (col0 - halo) : src_col1 - (col0 - halo),
+    ] = counts[..., src_row0:src_row1, src_col0:src_col1]
+    return tile
+
+
+# %% visible_tiles
+def visible_tiles(
+    view: tuple[float, float, float, float],
+    bin_size: int,
+    screensize: tuple[int, int],
+) -> list[tuple[int, int]]:
+    """
+    Get the tiles of a quadtree level that overlap a view.
+
+    Arguments
+    ---------
+    view: tuple[float, float, float, float]
+        View in screen pixels stored as (Left, Top, Right, Bottom).
+    bin_size: int
+        Bin size of the quadtree level.
+    screensize: tuple[int, int]
+        Screensize tuple stored as (X, Y).
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        Tiles stored as (Row, Column).
+    """
+    span = bin_size * TILE_SIZE
+    rows = -(-screensize[1] // span)
+    cols = -(-screensize[0] // span)
+    left, top, right, bottom = view
+    row0, row1 = max(int(top // span), 0), min(math.ceil(bottom / span), rows)
+    col0, col1 = max(int(left // span), 0), min(math.ceil(right / span), cols)
+    return [(row, col) for row in range(row0, row1) for col in range(col0, col1)]
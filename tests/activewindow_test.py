@@ -0,0 +1,66 @@
+import pytest
+
+from heatmouse import activewindow
+
+
+def test_active_window_caches_windows():
+    """Test that a window's process is looked up once and its title after the TTL."""
+    provider = activewindow.FakeWindowProvider()
+    provider.activate(1, 10, "Notes - Editor", "editor.exe")
+    window = activewindow.ActiveWindow(provider, ttl=60)
+    assert [window.window for _ in range(5)] == ["Editor"] * 5
+    assert provider.calls["process_name"] == 1
+    assert provider.calls["title"] == 1
+    assert provider.calls["foreground"] == 5
+    provider.activate(2, 20, "Home", "explorer.exe")
+    assert window.window == "File Explorer"
+    provider.activate(1, 10, "Other - Renamed")
+    assert window.window == "Editor"
+    window = activewindow.ActiveWindow(provider, ttl=0)
+    assert window.window == "Renamed"
+    assert window.window == "Renamed"
+    assert provider.calls["process_name"] == 3
+
+
+def test_active_window_foreground_hook():
+    """Test that a hooked provider is only queried after a foreground change."""
+    provider = activewindow.FakeWindowProvider(hook=True)
+    provider.activate(1, 10, "A - First", "first.exe")
+    window = activewindow.ActiveWindow(provider, ttl=60)
+    assert [window.window for _ in range(3)] == ["First"] * 3
+    assert provider.calls["foreground"] == 1
+    provider.activate(2, 20, "B - Second", "second.exe")
+    assert [window.window for _ in range(3)] == ["Second"] * 3
+    assert provider.calls["foreground"] == 2
+    window.close()
+    window.window
+    assert provider.calls["foreground"] == 3
+
+
+def test_active_window_change_during_lookup():
+    """Test that a foreground change during a lookup is not hidden by its result."""
+    provider = activewindow.FakeWindowProvider(hook=True)
+    provider.activate(1, 10, "A - First", "first.exe")
+    window = activewindow.ActiveWindow(provider, ttl=60)
+    foreground = provider.foreground
+
+    def racing_foreground():
+        key = foreground()
+        provider.activate(2, 20, "B - Second", "second.exe")
+        return key
+
+    provider.foreground = racing_foreground
+    assert window.window == "First"
+    provider.foreground = foreground
+    assert window.window == "Second"
+
+
+def test_window_provider_requires_methods():
+    """Test that a provider missing a provider method fails when it is created."""
+
+    class IncompleteProvider(activewindow.WindowProvider):
+        def foreground(self):
+            return (0, 0)
+
+    with pytest.raises(TypeError):
+        IncompleteProvider()
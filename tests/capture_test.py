@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from heatmouse import activewindow, capture, listener, recording, threadworker
+
+
+def test_get_backend():
+    """Test that backends are found by name and unknown names are rejected."""
+    assert isinstance(capture.get_backend("synthetic"), capture.SyntheticBackend)
+    with pytest.raises(ValueError):
+        capture.get_backend("unknown")
+
+
+def test_get_backend_never_guesses_synthetic(monkeypatch):
+    """Test that a desktop without a backend is an error unless one is chosen."""
+    monkeypatch.setattr(capture.sys, "platform", "darwin")
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.delenv(capture.BACKEND_VARIABLE, raising=False)
+    with pytest.raises(RuntimeError):
+        capture.get_backend()
+    monkeypatch.setenv(capture.BACKEND_VARIABLE, "synthetic")
+    assert isinstance(capture.get_backend(), capture.SyntheticBackend)
+
+
+def test_get_backend_rejects_incomplete_backend():
+    """Test that a backend missing a backend method fails when it is created."""
+
+    class IncompleteBackend(capture.CaptureBackend):
+        name = "incomplete"
+
+        def screensize(self):
+            return (640, 360)
+
+    with pytest.raises(TypeError):
+        capture.get_backend(IncompleteBackend.name)
+
+
+def test_synthetic_clicks_are_deterministic():
+    """Test that a seed always gives the same stream of clicks."""
+    streams = []
+    for seed in (1, 1, 2):
+        backend = capture.SyntheticBackend((100, 50), rate=None, clicks=300, seed=seed)
+        key_listener = listener.KeyListener(backend)
+        key_listener.run()
+        streams.append(list(zip(*key_listener.event_ring.drain())))
+    assert len(streams[0]) == 300
+    assert streams[0] == streams[1]
+    assert streams[0] != streams[2]
+    assert all((0 <= x < 100) and (0 <= y < 50) for x, y, _ in streams[0])
+
+
+def test_synthetic_applications_switch_per_click():
+    """Test that the foreground application changes every few clicks."""
+    backend = capture.SyntheticBackend(
+        applications=("First", "Second"), rate=None, clicks=10, switch_every=3
+    )
+    worker = threadworker.ListenerWorker(backend, batch_size=10)
+    worker.key_listener.run()
+    active_window = activewindow.ActiveWindow(backend.window_provider())
+    batch = worker._next_batch(active_window, timeout=0)
+    applications = [application for application, _ in batch]
+    assert applications == ["First"] * 3 + ["Second"] * 3 + ["First"] * 3 + ["Second"]
+
+
+def test_replay_reproduces_recorded_session(tmp_path):
+    """Test that replaying a recorded session gives the recorded events."""
+    path = tmp_path.joinpath("session.npz")
+    backend = capture.SyntheticBackend(rate=None, clicks=200, switch_every=7)
+    worker = threadworker.ListenerWorker(backend, batch_size=1000, recording_path=path)
+    worker.key_listener.run()
+    active_window = activewindow.ActiveWindow(backend.window_provider())
+    recorded = worker._next_batch(active_window, timeout=0)
+    worker.recording.save(path)
+    replay = threadworker.ListenerWorker(
+        capture.ReplayBackend(path, speed=None), batch_size=1000
+    )
+    replay.key_listener.run()
+    active_window = activewindow.ActiveWindow(replay.backend.window_provider())
+    assert replay._next_batch(active_window, timeout=0) == recorded
+    assert replay.backend.screensize() == backend.screensize()
+
+
+def test_replay_speed():
+    """Test that replayed clicks keep their recorded delays divided by the speed."""
+    session = recording.SessionRecording.from_columns(
+        (640, 480), [0.0, 0.2, 0.4], ["App"] * 3, [1, 2, 3], [4, 5, 6], [0, 0, 0]
+    )
+    key_listener = listener.KeyListener(capture.ReplayBackend(session, speed=10))
+    key_listener.run()
+    assert len(key_listener.event_ring) == 3
+    delays = np.diff(key_listener.mouse_listener.emitted)
+    assert (delays >= 0.019).all()
@@ -0,0 +1,25 @@
+import numpy as np
+
+from heatmouse import clickarray
+
+
+def test_click_array_append():
+    """Test that appends grow the array and keep earlier views intact."""
+    clicks = clickarray.ClickArray()
+    clicks.append(1, 2, "LeftClick")
+    view = clicks.x
+    for index in range(clickarray.MIN_CAPACITY * 2):
+        clicks.append(index, index, "RightClick")
+    assert len(clicks) == clickarray.MIN_CAPACITY * 2 + 1
+    assert view.tolist() == [1]
+    assert clicks.x.dtype == clickarray.COORD_DTYPE
+    assert clicks.buttons[:2] == ["LeftClick", "RightClick"]
+
+
+def test_click_array_from_columns():
+    """Test that button names round-trip through their codes."""
+    clicks = clickarray.ClickArray.from_columns(
+        [1, 2, 3], [4, 5, 6], ["MiddleClick", "LeftClick", "Button.x1"]
+    )
+    np.testing.assert_array_equal(clicks.y, [4, 5, 6])
+    assert clicks.buttons == ["MiddleClick", "LeftClick", "OtherClick"]
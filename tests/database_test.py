@@ -0,0 +1,78 @@
+import numpy as np
+
+from heatmouse import clickarray, database, histogram
+
+
+def test_database_grid_round_trip(tmp_path):
+    """Test that the stored grid matches binning the raw clicks and stays updated."""
+    db = database.Database(tmp_path.joinpath("heatmouse.db"))
+    rng = np.random.default_rng(0)
+    first = clickarray.ClickArray()
+    first.extend(rng.integers(-5, 40, 200), rng.integers(0, 30, 200), [0, 1] * 100)
+    db.store_data("App", first)
+    grid = db.get_grid("App", (32, 24))
+    expected = histogram.CountGrid.from_clicks(
+        first.x, first.y, (32, 24), buttons=first.button
+    )
+    np.testing.assert_array_equal(grid.layers, expected.layers)
+    assert grid.total == expected.total
+    second = clickarray.ClickArray()
+    second.extend(rng.integers(-5, 40, 50), rng.integers(0, 24, 50), [2] * 50)
+    db.store_all_data({"App": second, "Other": second})
+    expected.add_many(second.x, second.y, second.button)
+    grid = db.get_grid("App", (32, 24))
+    np.testing.assert_array_equal(grid.layers, expected.layers)
+    db.cursor.execute("SELECT total FROM grids;")
+    # Clicks off the screen are left out of the stored total
+    assert db.cursor.fetchall() == [(expected.total,)]
+    assert expected.total < 250
+    assert db.get_grid("Missing", (32, 24)).total == 0
+    db.connection.close()
+
+
+def test_database_grid_rebuilt_for_new_screensize(tmp_path):
+    """Test that a grid stored for another screensize is rebuilt from the clicks."""
+    db = database.Database(tmp_path.joinpath("heatmouse.db"))
+    data = clickarray.ClickArray.from_columns(
+        [1, 20, 40], [2, 10, 20], ["LeftClick", "RightClick", "LeftClick"]
+    )
+    db.store_data("App", data)
+    assert db.get_grid("App", (32, 24)).total == 2
+    grid = db.get_grid("App", (64, 48))
+    assert grid.shape == (48, 64)
+    assert grid.total == 3
+    assert grid.layers[1, 20, 40] == 1
+    db.connection.close()
+
+
+def test_database_catalog(tmp_path):
+    """Test that the catalog counts on-screen clicks with and without a stored grid."""
+    db = database.Database(tmp_path.joinpath("heatmouse.db"))
+    data = clickarray.ClickArray.from_columns(
+        [1, 2, 3, 40], [1, 2, 3, 2], ["LeftClick"] * 4
+    )
+    db.store_all_data({"App": data, "Other": data})
+    assert db.get_catalog((32, 24)) == {"App": (3, None), "Other": (3, None)}
+    db.get_grid("App", (32, 24))
+    db.store_data("App", data)
+    icon = tmp_path.joinpath("icon.png")
+    icon.touch()
+    db.store_icon("App", str(icon))
+    db.store_icon("Other", str(tmp_path.joinpath("missing.png")))
+    assert db.get_catalog((32, 24)) == {"App": (6, str(icon)), "Other": (3, None)}
+    assert db.get_catalog((64, 48)) == {"App": (8, str(icon)), "Other": (4, None)}
+    db.connection.close()
+
+
+def test_database_icon_with_quote(tmp_path):
+    """Test that icons of application names with quotes are stored and read."""
+    db = database.Database(tmp_path.joinpath("heatmouse.db"))
+    icon = tmp_path.joinpath("baldur's gate.png")
+    icon.touch()
+    db.store_icon("Baldur's Gate", str(icon))
+    assert db.get_icon("Baldur's Gate") == str(icon)
+    icon.unlink()
+    assert db.get_icon("Baldur's Gate") is None
+    db.cursor.execute("SELECT COUNT(*) FROM icons;")
+    assert db.cursor.fetchone() == (0,)
+    db.connection.close()
@@ -0,0 +1,54 @@
+import threading
+
+from heatmouse import eventring
+
+
+def test_event_ring_drain():
+    """Test that events come out in order, in bulk and across the wrap-around."""
+    ring = eventring.EventRing(4)
+    assert ring.capacity == 4
+    for x in range(3):
+        assert ring.put(x, -x, "LeftClick")
+    assert ring.get(timeout=0) == (0, 0, "LeftClick")
+    for x in range(3, 5):
+        assert ring.put(x, -x, "RightClick")
+    x, y, buttons = ring.drain(3)
+    assert x.tolist() == [1, 2, 3]
+    assert y.tolist() == [-1, -2, -3]
+    assert buttons.tolist() == [0, 0, 1]
+    x, y, buttons = ring.drain()
+    assert x.tolist() == [4]
+    assert ring.empty()
+    assert ring.get(timeout=0) is None
+
+
+def test_event_ring_counts_drops():
+    """Test that a full ring drops and counts new events instead of growing."""
+    ring = eventring.EventRing(5)
+    assert ring.capacity == 8
+    added = [ring.put(x, 0, "Unknown") for x in range(10)]
+    assert added == [True] * 8 + [False] * 2
+    assert ring.dropped == 2
+    x, _, buttons = ring.drain()
+    assert x.tolist() == list(range(8))
+    assert set(buttons.tolist()) == {3}
+
+
+def test_event_ring_wakes_consumer():
+    """Test that a waiting consumer wakes on new data and on close."""
+    ring = eventring.EventRing()
+    received = []
+
+    def consume():
+        while not (ring.closed and ring.empty()):
+            if ring.wait(timeout=5):
+                received.extend(ring.drain()[0].tolist())
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for x in range(1000):
+        ring.put(x, 0, "LeftClick")
+    ring.close()
+    consumer.join(timeout=5)
+    assert not consumer.is_alive()
+    assert received == list(range(1000))
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from heatmouse import filterengine
+
+
+@pytest.mark.parametrize("name", ["separable", "fft", "ndimage", "sparse"])
+def test_filter_engine_matches_astropy(name):
+    """Test that every filter engine agrees with the astropy reference."""
+    if (name == "ndimage") and (filterengine.ndimage is None):
+        pytest.skip("SciPy is not installed.")
+    counts = np.random.default_rng(0).poisson(0.5, (37, 53)).astype(np.int32)
+    expected = filterengine.get_engine("astropy").filter(counts)
+    result = filterengine.get_engine(name).filter(counts)
+    np.testing.assert_allclose(result, expected, atol=1e-12)
+
+
+def test_filter_counts_in_parallel_threads():
+    """Test that filtering several count grids in parallel threads gives plain arrays."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    rng = np.random.default_rng(1)
+    grids = [rng.poisson(0.5, (40 + i, 60)).astype(np.int32) for i in range(4)]
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(filterengine.filter_counts, grids))
+    for counts, result in zip(grids, results):
+        assert type(result) is np.ndarray
+        np.testing.assert_allclose(
+            result, filterengine.get_engine("astropy").filter(counts), atol=1e-12
+        )
+
+
+def test_filter_engine_scaled_sigma():
+    """Test that engines for a smaller standard deviation use the matching kernel."""
+    counts = np.random.default_rng(2).poisson(0.5, (27, 48)).astype(np.int32)
+    kernel = filterengine.get_kernel(0.5)
+    assert kernel.shape[0] < filterengine.FILTER_KERNEL.array.shape[0]
+    expected = filterengine.get_engine("astropy", 0.5).filter(counts)
+    np.testing.assert_allclose(
+        filterengine.filter_counts(counts, sigma=0.5), expected, atol=1e-12
+    )
+
+
+@pytest.mark.parametrize("name", ["separable", "fft", "ndimage", "sparse"])
+def test_filter_engine_stacked_layers(name):
+    """Test that a stack of count grids is filtered like each grid on its own."""
+    if (name == "ndimage") and (filterengine.ndimage is None):
+        pytest.skip("SciPy is not installed.")
+    counts = np.random.default_rng(3).poisson(0.5, (3, 29, 41)).astype(np.int32)
+    result = filterengine.get_engine(name).filter(counts)
+    assert result.shape == counts.shape
+    for layer, layer_counts in zip(result, counts):
+        expected = filterengine.get_engine("astropy").filter(layer_counts)
+        np.testing.assert_allclose(layer, expected, atol=1e-12)
+
+
+def test_sparse_engine_splats_clicks():
+    """Test that splatting binned clicks matches filtering their count grid."""
+    from heatmouse import histogram
+
+    rng = np.random.default_rng(4)
+    x = rng.integers(-5, 105, 200)
+    y = rng.integers(0, 70, 200)
+    buttons = rng.integers(0, 3, 200)
+    grid = histogram.CountGrid.from_clicks(x, y, (100, 70), 3, buttons)
+    index = histogram.bin_clicks(x, y, buttons, (100, 70), 3)
+    result = filterengine.get_engine("sparse").splat(
+        index, histogram.stack_shape((100, 70), 3)
+    )
+    expected = filterengine.get_engine("astropy").filter(grid.layers)
+    np.testing.assert_allclose(result, expected, atol=1e-12)
+    assert filterengine.prefer_sparse(10, grid.layers.shape)
+    assert not filterengine.prefer_sparse(10**6, grid.layers.shape)
+
+
+def test_filter_engine_requires_filter():
+    """Test that an engine without a filter method fails when it is created."""
+
+    class IncompleteEngine(filterengine.FilterEngine):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        IncompleteEngine()
@@ -0,0 +1,14 @@
+import numpy as np
+
+from heatmouse import filterengine, filterpool
+
+
+def test_filter_pool_matches_filter_counts():
+    """Test that filtering in a worker process through shared memory is exact."""
+    counts = np.random.default_rng(0).poisson(0.5, (37, 53)).astype(np.int32)
+    pool = filterpool.FilterPool(1)
+    try:
+        result = pool.filter(counts)
+    finally:
+        pool.shutdown(wait=True)
+    np.testing.assert_array_equal(result, filterengine.filter_counts(counts))
@@ -0,0 +1,30 @@
+import numpy as np
+
+from heatmouse import heatmapcache, histogram
+
+
+def test_heatmap_cache_evicts_least_recently_used():
+    """Test that the cache stays within its byte limit and counts its evictions."""
+    cache = heatmapcache.HeatmapCache(max_bytes=2 * 800)
+    cache.put(("App", 4, 1), np.zeros(100))
+    cache.put(("App", 4, 2), np.zeros(100))
+    assert cache.get(("App", 4, 1)) is not None
+    cache.put(("Other", 4, 1), np.zeros(100))
+    assert cache.get(("App", 4, 2)) is None
+    assert cache.nbytes == 2 * 800
+    assert cache.stats()["evictions"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_heatmap_cache_holds_count_pyramids():
+    """Test that pyramids are cached by the size they had when last put."""
+    pyramid = histogram.CountPyramid((64, 32))
+    cache = heatmapcache.HeatmapCache(max_bytes=2 * pyramid.nbytes)
+    cache.put(("App",), pyramid)
+    assert cache.get(("App",)) is pyramid
+    pyramid.layers(2)
+    cache.put(("App",), pyramid)
+    assert cache.nbytes == pyramid.nbytes
+    cache.put(("Other",), histogram.CountPyramid((64, 32)))
+    assert cache.get(("App",)) is None
+    assert cache.nbytes == pyramid.base.layers.nbytes
@@ -0,0 +1,21 @@
+import numpy as np
+
+from heatmouse import heatmapcanvas
+
+
+def test_heatmap_canvas_maps_levels_through_lut():
+    """Test that the heatmap range maps to the first and last colormap entries."""
+    canvas = heatmapcanvas.HeatmapCanvas()
+    heatmap = np.zeros((3, 4))
+    heatmap[1, 2] = 2.0
+    canvas.set_heatmap(heatmap)
+    first, last = heatmapcanvas.VIRIDIS_LUT[[0, -1]]
+    assert canvas.levels == (0.0, 2.0)
+    assert canvas.image.pixelColor(0, 0).getRgb()[:3] == tuple(first)
+    assert canvas.image.pixelColor(2, 1).getRgb()[:3] == tuple(last)
+    heatmap[0, 0] = 1.0
+    canvas.update_region(heatmap, slice(0, 1), slice(0, 1))
+    assert canvas.levels == (0.0, 2.0)
+    assert canvas.image.pixelColor(0, 0).getRgb()[:3] == tuple(
+        heatmapcanvas.VIRIDIS_LUT[128]
+    )
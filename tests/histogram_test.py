@@ -0,0 +1,102 @@
+import numpy as np
+
+from heatmouse import histogram
+
+
+def test_count_grid_add():
+    """Test that single and bulk adds give the same integer-binned counts."""
+    x = np.array([0, 3, 4, 9, 10, -1])
+    y = np.array([0, 1, 5, 7, 2, 2])
+    grid = histogram.CountGrid.from_clicks(x, y, (10, 8), 4)
+    single = histogram.CountGrid((10, 8), 4)
+    for x_position, y_position in zip(x, y):
+        single.add(x_position, y_position)
+    assert grid.shape == (2, 3)
+    assert grid.total == 5
+    np.testing.assert_array_equal(grid.counts, [[2, 0, 1], [0, 1, 1]])
+    np.testing.assert_array_equal(single.counts, grid.counts)
+
+
+def test_count_pyramid_matches_direct_binning():
+    """Test that block-summed grids match binning the raw clicks directly."""
+    rng = np.random.default_rng(0)
+    x = rng.integers(0, 100, 500)
+    y = rng.integers(0, 70, 500)
+    pyramid = histogram.CountPyramid.from_clicks(x, y, (100, 70))
+    for bin_size in (1, 2, 3, 4, 7, 8, 12, 100):
+        expected = histogram.CountGrid.from_clicks(x, y, (100, 70), bin_size)
+        np.testing.assert_array_equal(pyramid.counts(bin_size), expected.counts)
+    pyramid.add(99, 69)
+    expected = histogram.CountGrid.from_clicks(
+        np.append(x, 99), np.append(y, 69), (100, 70), 12
+    )
+    np.testing.assert_array_equal(pyramid.counts(12), expected.counts)
+    assert pyramid.total == 501
+
+
+def test_count_pyramid_layers():
+    """Test that the layers count each button and the first layer counts them all."""
+    rng = np.random.default_rng(1)
+    x = rng.integers(0, 100, 500)
+    y = rng.integers(0, 70, 500)
+    buttons = rng.integers(0, 3, 500)
+    pyramid = histogram.CountPyramid.from_clicks(x, y, (100, 70), buttons)
+    pyramid.add(5, 5, 1)
+    x, y, buttons = np.append(x, 5), np.append(y, 5), np.append(buttons, 1)
+    for bin_size in (1, 4, 12):
+        layers = pyramid.layers(bin_size)
+        assert layers.shape[0] == len(histogram.LAYERS)
+        for button in range(3):
+            pressed = buttons == button
+            expected = histogram.CountGrid.from_clicks(
+                x[pressed], y[pressed], (100, 70), bin_size
+            )
+            np.testing.assert_array_equal(layers[button + 1], expected.counts)
+        np.testing.assert_array_equal(layers[histogram.ALL_LAYER], layers[1:].sum(0))
+
+
+def test_count_grid_sparse_round_trip():
+    """Test that a count grid is rebuilt exactly from its non-empty bins."""
+    x = np.array([0, 3, 3, 9])
+    y = np.array([0, 1, 1, 7])
+    grid = histogram.CountGrid.from_clicks(x, y, (10, 8), buttons=[0, 1, 1, 3])
+    index, counts = grid.to_sparse()
+    assert counts.tolist() == [1, 2, 1]
+    rebuilt = histogram.CountGrid.from_sparse(index, counts, (10, 8))
+    np.testing.assert_array_equal(rebuilt.layers, grid.layers)
+    assert rebuilt.total == grid.total
+    pyramid = histogram.CountPyramid.from_grid(rebuilt)
+    np.testing.assert_array_equal(
+        pyramid.counts(2), histogram.CountGrid.from_clicks(x, y, (10, 8), 2).counts
+    )
+
+
+def test_count_pyramid_add_many_updates_kept_grids():
+    """Test that batched adds update the base and every kept grid like single adds."""
+    rng = np.random.default_rng(1)
+    pyramid = histogram.CountPyramid((100, 70))
+    single = histogram.CountPyramid((100, 70))
+    for bin_size in (2, 4, 6):
+        pyramid.layers(bin_size)
+        single.layers(bin_size)
+    x = rng.integers(-5, 105, 40)
+    y = rng.integers(0, 70, 40)
+    buttons = rng.integers(0, 3, 40)
+    pyramid.add_many(x, y, buttons)
+    for x_position, y_position, button in zip(x, y, buttons):
+        single.add(x_position, y_position, button)
+    assert pyramid.total == single.total
+    for bin_size in (1, 2, 4, 6):
+        np.testing.assert_array_equal(pyramid.layers(bin_size), single.layers(bin_size))
+
+
+def test_count_pyramid_copy_layers():
+    """Test that copied layers match the kept grid and do not change with it."""
+    pyramid = histogram.CountPyramid.from_clicks(
+        np.array([0, 5, 9]), np.array([0, 3, 7]), (10, 8), np.array([0, 1, 2])
+    )
+    copy = pyramid.copy_layers(2)
+    np.testing.assert_array_equal(copy, pyramid.layers(2))
+    pyramid.add(1, 1, 0)
+    assert copy[histogram.ALL_LAYER].sum() == 3
+    assert pyramid.layers(2)[histogram.ALL_LAYER].sum() == 4
@@ -0,0 +1,18 @@
+import numpy as np
+from astropy.convolution import convolve
+from astropy.convolution.kernels import Gaussian2DKernel
+
+from heatmouse import livefilter
+
+
+def test_live_filter_matches_convolution():
+    """Test that kernel patches add up to a full convolution, edges included."""
+    kernel = Gaussian2DKernel(2, 2)
+    counts = np.zeros((30, 40))
+    live = livefilter.LiveFilter(kernel.array)
+    live.reset(np.zeros(counts.shape), ("App", 1))
+    for row, col in [(0, 0), (15, 20), (29, 39), (3, 37)]:
+        counts[row, col] += 1
+        assert live.add(row, col) is not None
+    assert live.is_valid(("App", 1))
+    np.testing.assert_allclose(live.image, convolve(counts, kernel), atol=1e-12)
@@ -0,0 +1,29 @@
+import functools
+
+from heatmouse import clickarray, database, mainwindow, threadworker
+
+
+def test_main_window_splats_sparse_application_without_pyramid(tmp_path, monkeypatch):
+    """Test that an application with few clicks is filtered without a count pyramid."""
+    path = tmp_path.joinpath("heatmouse.db")
+    db = database.Database(path)
+    db.store_data(
+        "App",
+        clickarray.ClickArray.from_columns([1, 20, 40], [2, 10, 20], ["LeftClick"] * 3),
+    )
+    db.connection.close()
+    monkeypatch.setattr(
+        mainwindow.hdatabase, "Database", functools.partial(database.Database, path)
+    )
+    monkeypatch.setattr(
+        mainwindow.HeatMouseMainWindow, "screensize", property(lambda self: (640, 360))
+    )
+    window = mainwindow.HeatMouseMainWindow()
+    key = ("App", window.bins, window.bin_size, 3)
+    worker = window._filter_worker("App", key)
+    assert isinstance(worker, threadworker.SparseFilterWorker)
+    worker.run()
+    assert key in window.heatmap_cache
+    assert ("App",) not in window._count_pyramids
+    window.close()
+    window.database.connection.close()
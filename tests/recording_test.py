@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from heatmouse import recording
+
+
+def test_session_recording_round_trip(tmp_path):
+    """Test that a saved recording loads with the same clicks, times and names."""
+    path = tmp_path.joinpath("session.npz")
+    session = recording.SessionRecording((1920, 1080))
+    session.append(100.25, "Editor", 1, 2, "LeftClick")
+    session.append(100.5, "Browser", 3, 4, "RightClick")
+    session.append(101.0, "Editor", 5, 6, "MiddleClick")
+    session.save(path)
+    loaded = recording.SessionRecording.load(path)
+    assert loaded.screensize == (1920, 1080)
+    assert loaded.applications == ["Editor", "Browser"]
+    assert loaded.application.tolist() == [0, 1, 0]
+    assert loaded.clicks.x.tolist() == [1, 3, 5]
+    assert loaded.clicks.y.tolist() == [2, 4, 6]
+    assert loaded.clicks.buttons == ["LeftClick", "RightClick", "MiddleClick"]
+    assert np.allclose(loaded.clicks.timestamp, [100.25, 100.5, 101.0], atol=1e-6)
+
+
+def test_session_recording_from_columns(tmp_path):
+    """Test that column data keeps applications in order of their first click."""
+    path = tmp_path.joinpath("session.npz")
+    session = recording.SessionRecording.from_columns(
+        (640, 480), [0.0, 0.1, 0.2], ["B", "A", "B"], [1, 2, 3], [4, 5, 6], [0, 1, 2]
+    )
+    assert session.applications == ["B", "A"]
+    assert session.application.tolist() == [0, 1, 0]
+    recording.SessionRecording((640, 480)).save(path)
+    assert len(recording.SessionRecording.load(path)) == 0
+
+
+def test_session_recording_version(tmp_path):
+    """Test that recordings of an unknown version are rejected."""
+    path = tmp_path.joinpath("session.npz")
+    recording.SessionRecording((640, 480)).save(path)
+    with np.load(path) as archive:
+        columns = dict(archive)
+    columns["version"] = np.array(recording.RECORDING_VERSION + 1)
+    with open(path, "wb") as file:
+        np.savez_compressed(file, **columns)
+    with pytest.raises(ValueError):
+        recording.SessionRecording.load(path)
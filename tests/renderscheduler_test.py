@@ -0,0 +1,18 @@
+from heatmouse import renderscheduler
+
+
+def test_render_scheduler_coalesces_and_drops_stale_frames():
+    """Test that requests during a render are merged and stale results are dropped."""
+    renders = []
+    scheduler = renderscheduler.RenderScheduler(renders.append, lambda: None)
+    scheduler.request()
+    scheduler.request()
+    scheduler.request()
+    assert renders == [1]
+    assert scheduler.busy and (scheduler.queue_depth == 2)
+    scheduler.invalidate()
+    assert not scheduler.is_current(1)
+    assert not scheduler.finish(1)
+    assert scheduler.dropped_frames == 1
+    scheduler.stop()
+    assert not scheduler.is_current(scheduler.generation)
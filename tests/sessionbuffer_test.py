@@ -0,0 +1,28 @@
+from heatmouse import sessionbuffer
+
+
+def test_session_buffer_flush():
+    """Test that flushing returns only the clicks captured since the last flush."""
+    buffer = sessionbuffer.SessionBuffer()
+    buffer.append("App", 1, 2, "LeftClick")
+    buffer.append("App", 3, 4, "RightClick")
+    assert len(buffer) == 2
+    data = buffer.flush()
+    assert list(data) == ["App"]
+    assert data["App"].x.tolist() == [1, 3]
+    assert data["App"].y.tolist() == [2, 4]
+    assert data["App"].buttons == ["LeftClick", "RightClick"]
+    assert len(buffer) == 0
+    buffer.append("Other", 5, 6, "MiddleClick")
+    assert list(buffer.flush()) == ["Other"]
+
+
+def test_session_buffer_extend():
+    """Test that extending adds several clicks of an application at once."""
+    buffer = sessionbuffer.SessionBuffer()
+    buffer.append("App", 1, 2, "LeftClick")
+    buffer.extend("App", [3, 5], [4, 6], [1, 2])
+    assert len(buffer) == 3
+    data = buffer.flush()
+    assert data["App"].x.tolist() == [1, 3, 5]
+    assert data["App"].buttons == ["LeftClick", "RightClick", "MiddleClick"]
@@ -0,0 +1,62 @@
+import types
+
+import numpy as np
+
+from heatmouse import capture, filterengine, heatmapcache, histogram, threadworker
+
+
+def test_listener_worker_batches_events():
+    """Test that queued events are drained in batches limited by the batch size."""
+    worker = threadworker.ListenerWorker(
+        capture.SyntheticBackend(), batch_interval=0.05, batch_size=3
+    )
+    for x in range(5):
+        worker.key_listener.event_ring.put(x, 0, "LeftClick")
+    active_window = types.SimpleNamespace(window="App")
+    first = worker._next_batch(active_window)
+    assert first == [("App", (x, 0, "LeftClick")) for x in range(3)]
+    second = worker._next_batch(active_window, timeout=0)
+    assert [event[0] for _, event in second] == [3, 4]
+    assert worker._next_batch(active_window, timeout=0) == []
+
+
+def test_level_filter_worker_derives_level():
+    """Test that the level worker filters the level it derives from the pyramid."""
+    rng = np.random.default_rng(0)
+    pyramid = histogram.CountPyramid.from_clicks(
+        rng.integers(0, 64, 50), rng.integers(0, 48, 50), (64, 48)
+    )
+    results = []
+    worker = threadworker.LevelFilterWorker(pyramid, 4, sigma=2.0)
+    worker.signals.result.connect(results.append)
+    worker.run()
+    assert 4 in pyramid._levels
+    np.testing.assert_allclose(
+        results[0], filterengine.filter_counts(pyramid.layers(4), sigma=2.0)
+    )
+
+
+def test_filter_worker_emits_none_on_error():
+    """Test that a failing filter still emits a result, so the job is not left busy."""
+    results = []
+    worker = threadworker.FilterWorker(np.zeros((2, 3)))
+    worker._filter = lambda: 1 / 0
+    worker.signals.result.connect(results.append)
+    worker.run()
+    assert results == [None]
+
+
+def test_tile_worker_emits_none_on_error(monkeypatch):
+    """Test that a failing tile filter still emits its key, so it can be retried."""
+
+    def fail(counts, halo, sigma):
+        raise ValueError("filter failed")
+
+    monkeypatch.setattr(threadworker.htiling, "filter_tile", fail)
+    cache = heatmapcache.HeatmapCache()
+    results = []
+    worker = threadworker.TileWorker(np.zeros((5, 4, 4)), 1, 1.0, cache, ("App",))
+    worker.signals.result.connect(results.append)
+    worker.run()
+    assert results == [(("App",), None)]
+    assert ("App",) not in cache
@@ -0,0 +1,27 @@
+import numpy as np
+
+from heatmouse import filterengine, tiling
+
+
+def test_filter_tile_matches_full_filter():
+    """Test that a filtered tile with a halo matches the fully filtered grid."""
+    counts = np.random.default_rng(0).poisson(0.5, (300, 600)).astype(np.int32)
+    sigma = filterengine.FILTER_SIGMA
+    halo = filterengine.get_kernel(sigma).shape[0] // 2
+    expected = filterengine.filter_counts(counts, sigma=sigma)
+    for row, col in ((0, 0), (0, 2), (1, 1)):
+        tile = tiling.filter_tile(
+            tiling.tile_counts(counts, row, col, halo), halo, sigma
+        )
+        rows = slice(row * tiling.TILE_SIZE, (row + 1) * tiling.TILE_SIZE)
+        cols = slice(col * tiling.TILE_SIZE, (col + 1) * tiling.TILE_SIZE)
+        np.testing.assert_allclose(tile, expected[rows, cols], atol=1e-12)
+
+
+def test_visible_tiles():
+    """Test that only the tiles overlapping the view are visible."""
+    assert tiling.tile_bin_size(0.4) == 1
+    assert tiling.tile_bin_size(5.9) == 4
+    tiles = tiling.visible_tiles((300, 100, 700, 200), 1, (1920, 1080))
+    assert tiles == [(0, 1), (0, 2)]
+    assert tiling.visible_tiles((0, 0, 1920, 1080), 8, (1920, 1080)) == [(0, 0)]